@@ -54,5 +54,9 @@ LLM_TOP_K = int(os.getenv("LLM_TOP_K", "40"))
 LLM_TOP_P = float(os.getenv("LLM_TOP_P", "0.95"))
 LLM_REPEAT_PENALTY = float(os.getenv("LLM_REPEAT_PENALTY", "1.1"))
 
+# Configuración LLM de reformulación de preguntas (vacío = mismo modelo que OLLAMA_MODEL)
+LLM_REWRITE_MODEL = os.getenv("LLM_REWRITE_MODEL", "")
+LLM_REWRITE_NUM_PREDICT = int(os.getenv("LLM_REWRITE_NUM_PREDICT", "256"))
+
 if not MILVUS_URI or not MILVUS_TOKEN:
     raise RuntimeError("Configura MILVUS_URI y MILVUS_TOKEN (.env o variables de entorno).")
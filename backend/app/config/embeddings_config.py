@@ -0,0 +1,219 @@
+"""
+Configuración del motor de embeddings (BGE-M3 con sentence-transformers).
+
+Parámetros principales:
+    1. **Pool de inferencia**: Hilos dedicados al forward pass del modelo,
+       separados del event loop y del pool de Milvus.
+    2. **Cola acotada**: Solicitudes admitidas a la vez en el pool; el resto
+       espera en el event loop sin bloquearlo.
+    3. **Hilos intra-op**: Hilos de PyTorch por forward pass.
+    4. **Micro-batching**: Agrupa consultas concurrentes en un solo forward pass.
+    5. **Caché de consultas**: Embeddings de consultas repetidas en memoria y Redis.
+    6. **Backend de inferencia**: PyTorch u ONNX Runtime (opcionalmente int8).
+    7. **Lotes de ingesta**: Chunks de documentos agrupados por longitud y con tope de memoria.
+    8. **Servicio compartido**: API y workers de Celery usan un único modelo cargado
+       en un servidor local de embeddings (HTTP o socket Unix).
+
+Flujo:
+    ```
+    await embeddings.aembed_query(texto)
+                ↓
+    Semáforo del event loop (EMBEDDING_QUEUE_SIZE)
+                ↓
+    ThreadPoolExecutor "embeddings" (EMBEDDING_MAX_WORKERS hilos)
+                ↓
+    SentenceTransformer.encode (EMBEDDING_TORCH_THREADS hilos intra-op)
+    ```
+
+    PyTorch libera el GIL durante el forward pass: el event loop sigue
+    atendiendo requests y streams mientras el modelo corre.
+
+Dimensionamiento:
+    * CPU: EMBEDDING_MAX_WORKERS x EMBEDDING_TORCH_THREADS <= núcleos físicos
+      (p. ej. 1 worker x 8 hilos para latencia, 2 x 4 para throughput)
+    * GPU: 1 worker (las llamadas se serializan en el dispositivo)
+
+Variables de entorno:
+    * EMBEDDING_MAX_WORKERS: Hilos de inferencia (default 1)
+    * EMBEDDING_QUEUE_SIZE: Solicitudes en el pool a la vez por event loop (default 16)
+    * EMBEDDING_TORCH_THREADS: Hilos intra-op de PyTorch / ONNX Runtime (default 0 = valor por defecto)
+    * EMBEDDING_ENCODE_BATCH_SIZE: Textos por forward pass en encode (default 32)
+    * EMBEDDING_TIMEOUT: Segundos máximos de espera por solicitud (default 120, 0 = sin límite)
+    * EMBEDDING_MICROBATCH_ENABLED: Micro-batching de aembed_query (default true)
+    * EMBEDDING_MICROBATCH_MAX_WAIT_MS: Ventana de agrupación en ms (default 5)
+    * EMBEDDING_MICROBATCH_MAX_SIZE: Consultas máximas por lote (default 32)
+    * EMBEDDING_CACHE_ENABLED: Caché de embeddings de consultas (default true)
+    * EMBEDDING_CACHE_MAX_ENTRIES: Entradas en memoria por proceso (default 2048)
+    * EMBEDDING_CACHE_TTL_SECONDS: Vigencia en memoria (default 3600)
+    * EMBEDDING_CACHE_REDIS_ENABLED: Nivel compartido en Redis (default true)
+    * EMBEDDING_CACHE_REDIS_TTL_SECONDS: Vigencia en Redis (default 86400)
+    * EMBEDDING_BACKEND: torch | onnx (default torch)
+    * EMBEDDING_ONNX_QUANTIZATION: none | int8 (default none)
+    * EMBEDDING_ONNX_QUANT_CONFIG: avx512_vnni | avx512 | avx2 | arm64 (default avx2)
+    * EMBEDDING_ONNX_PROVIDER: Execution provider de ONNX Runtime (default CPUExecutionProvider)
+    * EMBEDDING_MAX_SEQ_LENGTH: Tokens máximos por texto del modelo (default 0 = leer del modelo)
+    * EMBEDDING_DOC_BATCH_SIZE: Chunks por lote de ingesta (default 16)
+    * EMBEDDING_DOC_MAX_BATCH_CHARS: Caracteres con padding por lote de ingesta (default 64000, 0 = sin tope)
+    * EMBEDDING_SERVICE_URL: Servicio de embeddings compartido (default vacío = modelo en el proceso)
+    * EMBEDDING_SERVICE_TIMEOUT: Segundos máximos por solicitud al servicio (default 120)
+
+Example:
+    ```python
+    from app.config.embeddings_config import embeddings_config
+
+    workers = embeddings_config.EMBEDDING_MAX_WORKERS  # 1
+    ```
+
+See Also:
+    - app.embeddings.inference_executor: Pool de inferencia
+    - app.embeddings.embeddings: Motor de embeddings
+    - app.embeddings.micro_batcher: Micro-batching de consultas
+    - app.embeddings.query_cache: Caché de embeddings de consultas
+    - app.embeddings.onnx_backend: Backend ONNX Runtime
+    - app.embeddings.document_batcher: Lotes por longitud en la ingesta
+    - app.embeddings.embedding_server: Servicio de embeddings compartido
+    - app.embeddings.embedding_client: Cliente del servicio
+"""
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+class EmbeddingsConfig:
+    """
+    Configuración del motor de embeddings.
+
+    Todos los valores pueden sobrescribirse por variables de entorno.
+    """
+
+    # ========================================
+    # POOL DE INFERENCIA
+    # ========================================
+
+    EMBEDDING_MAX_WORKERS = int(os.getenv("EMBEDDING_MAX_WORKERS", "1"))
+    """Hilos dedicados a ejecutar el modelo (cada uno corre un forward pass a la vez)."""
+
+    EMBEDDING_QUEUE_SIZE = int(os.getenv("EMBEDDING_QUEUE_SIZE", "16"))
+    """Solicitudes enviadas al pool a la vez por event loop.
+
+    Acota la cola del pool: con el límite alcanzado las corrutinas esperan en
+    el event loop (sin bloquearlo) hasta que se libere un lugar.
+    """
+
+    EMBEDDING_TORCH_THREADS = int(os.getenv("EMBEDDING_TORCH_THREADS", "0"))
+    """Hilos intra-op por forward pass. 0 = valor por defecto del backend.
+
+    PyTorch: torch.set_num_threads en cada hilo del pool.
+    ONNX Runtime: intra_op_num_threads de la sesión.
+    """
+
+    EMBEDDING_ENCODE_BATCH_SIZE = int(os.getenv("EMBEDDING_ENCODE_BATCH_SIZE", "32"))
+    """Textos por forward pass en SentenceTransformer.encode."""
+
+    EMBEDDING_TIMEOUT = float(os.getenv("EMBEDDING_TIMEOUT", "120"))
+    """Segundos máximos de espera por solicitud, incluida la cola (0 = sin límite).
+
+    Al vencer, la corrutina recibe asyncio.TimeoutError; el forward pass en
+    curso no se interrumpe (PyTorch no admite cancelación).
+    """
+
+    # ========================================
+    # MICRO-BATCHING DE CONSULTAS
+    # ========================================
+
+    EMBEDDING_MICROBATCH_ENABLED = os.getenv("EMBEDDING_MICROBATCH_ENABLED", "true").lower() == "true"
+    """Agrupa las llamadas concurrentes a aembed_query en un único encode."""
+
+    EMBEDDING_MICROBATCH_MAX_WAIT_MS = float(os.getenv("EMBEDDING_MICROBATCH_MAX_WAIT_MS", "5"))
+    """Espera máxima (ms) de la primera consulta antes de despachar el lote.
+
+    Es la latencia extra en el peor caso con una sola consulta; bajo carga los
+    lotes se llenan antes. Con EMBEDDING_MAX_WORKERS lotes codificándose, las
+    consultas nuevas esperan a que termine uno y se despachan juntas.
+    """
+
+    EMBEDDING_MICROBATCH_MAX_SIZE = int(os.getenv("EMBEDDING_MICROBATCH_MAX_SIZE", "32"))
+    """Consultas máximas por lote; al alcanzarlo el lote se despacha de inmediato."""
+
+    # ========================================
+    # CACHÉ DE EMBEDDINGS DE CONSULTAS
+    # ========================================
+
+    EMBEDDING_CACHE_ENABLED = os.getenv("EMBEDDING_CACHE_ENABLED", "true").lower() == "true"
+    """Reutiliza el embedding de consultas repetidas (clave: modelo + texto normalizado)."""
+
+    EMBEDDING_CACHE_MAX_ENTRIES = int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", "2048"))
+    """Entradas máximas del nivel en memoria (LRU). 2048 vectores de 1024 dims ≈ 8 MB."""
+
+    EMBEDDING_CACHE_TTL_SECONDS = int(os.getenv("EMBEDDING_CACHE_TTL_SECONDS", "3600"))
+    """Vigencia de una entrada en memoria."""
+
+    EMBEDDING_CACHE_REDIS_ENABLED = os.getenv("EMBEDDING_CACHE_REDIS_ENABLED", "true").lower() == "true"
+    """Nivel compartido entre procesos en Redis (DB de cachés, vectores float16)."""
+
+    EMBEDDING_CACHE_REDIS_TTL_SECONDS = int(os.getenv("EMBEDDING_CACHE_REDIS_TTL_SECONDS", "86400"))
+    """Vigencia de una entrada en Redis."""
+
+    # ========================================
+    # BACKEND DE INFERENCIA
+    # ========================================
+
+    EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "torch").lower()
+    """Backend del modelo: torch (PyTorch) u onnx (ONNX Runtime en CPU).
+
+    onnx requiere sentence-transformers>=3.2 y optimum[onnxruntime]; sin ellos
+    se usa PyTorch. La primera carga exporta el modelo a {modelo}/onnx/.
+    """
+
+    EMBEDDING_ONNX_QUANTIZATION = os.getenv("EMBEDDING_ONNX_QUANTIZATION", "none").lower()
+    """Cuantización del modelo ONNX: none (float32) o int8 (dinámica, ~4x más chico)."""
+
+    EMBEDDING_ONNX_QUANT_CONFIG = os.getenv("EMBEDDING_ONNX_QUANT_CONFIG", "avx2").lower()
+    """Instrucciones objetivo de la cuantización int8: avx512_vnni, avx512, avx2 o arm64."""
+
+    EMBEDDING_ONNX_PROVIDER = os.getenv("EMBEDDING_ONNX_PROVIDER", "CPUExecutionProvider")
+    """Execution provider de ONNX Runtime."""
+
+    EMBEDDING_MAX_SEQ_LENGTH = int(os.getenv("EMBEDDING_MAX_SEQ_LENGTH", "0"))
+    """Tokens máximos por texto que el modelo representa (el resto se trunca).
+
+    0 = valor del modelo (sentence_bert_config.json). Lo usa el chunking de la
+    ingesta para que ningún chunk supere la longitud del modelo.
+    """
+
+    # ========================================
+    # LOTES DE INGESTA DE DOCUMENTOS
+    # ========================================
+
+    EMBEDDING_DOC_BATCH_SIZE = int(os.getenv("EMBEDDING_DOC_BATCH_SIZE", "16"))
+    """Chunks por lote al vectorizar un documento; cada lote se inserta en Milvus antes del siguiente."""
+
+    EMBEDDING_DOC_MAX_BATCH_CHARS = int(os.getenv("EMBEDDING_DOC_MAX_BATCH_CHARS", "64000"))
+    """Tope de caracteres por lote contando padding (chunk más largo x chunks). 0 = sin tope.
+
+    Acota la memoria del forward pass con chunks largos: con chunks de ~7.000
+    caracteres el lote se corta en 9 aunque EMBEDDING_DOC_BATCH_SIZE sea mayor.
+    """
+
+    # ========================================
+    # SERVICIO DE EMBEDDINGS COMPARTIDO
+    # ========================================
+
+    EMBEDDING_SERVICE_URL = os.getenv("EMBEDDING_SERVICE_URL", "").strip()
+    """URL del servicio de embeddings (python -m app.embeddings.embedding_server).
+
+    Vacío: cada proceso carga su propio modelo. Con valor, get_embeddings
+    devuelve un cliente del servicio y el proceso no carga el modelo.
+    Formatos: http://host:puerto o unix:///ruta/al/socket.
+    """
+
+    EMBEDDING_SERVICE_TIMEOUT = float(os.getenv("EMBEDDING_SERVICE_TIMEOUT", "120"))
+    """Segundos máximos por solicitud al servicio (incluye la cola del servidor)."""
+
+
+# ========================================
+# INSTANCIA GLOBAL
+# ========================================
+
+embeddings_config = EmbeddingsConfig()
@@ -14,7 +14,8 @@ Parámetros principales:
     1. **Umbrales de similitud**: Filtran chunks por relevancia semántica
     2. **Top-K**: Cantidad de chunks recuperados del vectorstore
     3. **Fallback**: Estrategia de recuperación cuando búsqueda inicial falla
-    4. **Historial**: Límite de mensajes enviados al LLM
+    4. **Modo de búsqueda**: Densa o híbrida (densa + BM25)
+    5. **Historial**: Límite de mensajes enviados al LLM
 
 Arquitectura RAG:
     ```
@@ -209,6 +210,43 @@ class RAGConfig:
     FALLBACK_THRESHOLD_MULTIPLIER = 0.7
     """Factor para relajar el umbral en fallback (70% del original)."""
     
+    # ========================================
+    # MODO DE BÚSQUEDA (DENSA / HÍBRIDA)
+    # ========================================
+    
+    SEARCH_MODE = "hybrid"
+    """Modo de búsqueda por defecto de search_by_text: "dense" o "hybrid".
+    
+    hybrid fusiona la búsqueda densa (BGE-M3) con BM25 sobre el texto:
+    - Recupera coincidencias exactas que los embeddings densos pierden:
+      números de artículo, números de expediente, nombres de las partes
+    - Un primer intento con más resultados relevantes evita fallbacks
+      (búsquedas densas repetidas con umbral relajado)
+    
+    Requiere una colección creada con ENABLE_BM25=true (campo texto_sparse);
+    en colecciones sin el campo se usa automáticamente la búsqueda densa.
+    """
+    
+    HYBRID_RANKER = "rrf"
+    """Fusión de resultados: "rrf" (Reciprocal Rank Fusion) o "weighted".
+    
+    - rrf: Solo usa posiciones, robusto ante escalas distintas (coseno vs BM25)
+    - weighted: Promedio ponderado de scores normalizados por Milvus
+    """
+    
+    HYBRID_RRF_K = 60
+    """Constante k de RRF: score = Σ 1 / (k + posición)."""
+    
+    HYBRID_DENSE_WEIGHT = 0.7
+    """Peso de la búsqueda densa en modo weighted (BM25 = 1 - peso)."""
+    
+    HYBRID_CANDIDATES_MULTIPLIER = 2
+    """Candidatos por sub-búsqueda = top_k * multiplicador (antes de fusionar).
+    
+    El umbral de similitud se aplica solo a la búsqueda densa (radius);
+    los resultados BM25 entran por coincidencia léxica.
+    """
+    
     # ========================================
     # HISTORIAL DE CONVERSACIÓN
     # ========================================
@@ -231,6 +269,121 @@ class RAGConfig:
     - Más bajo (10-15): Optimizar velocidad y reducir uso de tokens
     """
 
+    
+    # ========================================
+    # REFORMULACIÓN DE PREGUNTAS (CONTEXTUALIZE)
+    # ========================================
+    
+    CONTEXTUALIZE_MODE = "auto"
+    """Cuándo reformular la pregunta con el LLM antes de la búsqueda general.
+    
+    - "auto": Solo si hay historial Y la pregunta parece depender de él
+      (pronombres, referencias posicionales, elipsis, preguntas muy cortas)
+    - "always": Siempre que haya historial (comportamiento anterior)
+    - "never": Nunca; se busca con la pregunta tal cual
+    
+    Sin historial nunca se reformula. Cada reformulación omitida ahorra una
+    llamada completa al LLM antes de que la búsqueda pueda empezar.
+    """
+    
+    CONTEXTUALIZE_SHORT_QUESTION_WORDS = 4
+    """Preguntas con esta cantidad de palabras o menos se consideran elípticas.
+    
+    Ejemplos: "¿y el segundo?", "más detalles", "¿cuál fue la sentencia?"
+    """
+    
+    CONTEXTUALIZE_LONG_MESSAGE_CHARS = 1500
+    """Mensajes más largos se reformulan siempre que haya historial.
+    
+    Suelen ser plantillas o documentos pegados seguidos de una solicitud:
+    el prompt de contextualización extrae solo la solicitud para la búsqueda.
+    """
+
+    
+    SPECULATIVE_RETRIEVAL = True
+    """Buscar con la pregunta original mientras el LLM la reformula.
+    
+    Cuando hay que reformular, la búsqueda especulativa arranca en paralelo
+    con la llamada al LLM. Al llegar la pregunta reformulada:
+    - Si es casi idéntica (SPECULATIVE_REUSE_SIMILARITY) se reutilizan los
+      resultados especulativos: la latencia de búsqueda queda oculta
+    - Si no, se descartan y se busca con la pregunta reformulada
+    
+    Costo: una búsqueda en Milvus adicional en los turnos descartados.
+    """
+    
+    SPECULATIVE_REUSE_SIMILARITY = 0.90
+    """Similitud coseno mínima (embeddings de ambas preguntas) para reutilizar.
+    
+    La reformulación agrega sinónimos y contexto del historial: con un valor
+    muy alto casi nunca se reutiliza; con uno bajo se responde con documentos
+    de la pregunta sin resolver sus referencias ("ese caso").
+    """
+
+    
+    # ========================================
+    # PRESUPUESTO DE CONTEXTO (CONTEXT PACKING)
+    # ========================================
+    
+    CONTEXT_PACKING = True
+    """Ajustar los chunks recuperados al presupuesto de tokens del LLM.
+    
+    Presupuesto = LLM_NUM_CTX - LLM_NUM_PREDICT (respuesta) - prompt del
+    sistema - historial - pregunta - CONTEXT_SAFETY_MARGIN_TOKENS.
+    
+    Los chunks se incluyen por score descendente mientras quepan; el primero
+    que no cabe se trunca en un fin de oración si le quedan al menos
+    CONTEXT_MIN_TRUNCATED_TOKENS, y el resto se descarta. Si ni eso cabe se
+    descartan primero los turnos más antiguos del historial, y el chunk más
+    relevante se incluye siempre. TOP_K_GENERAL y
+    TOP_K_EXPEDIENTE pasan a ser el máximo de candidatos, no una estimación
+    del tamaño del contexto.
+    """
+    
+    CONTEXT_TOKENIZER_ENCODING = "o200k_harmony"
+    """Codificación de tiktoken del LLM (o200k_harmony = gpt-oss).
+    
+    Si tiktoken o la codificación no están disponibles se estima 1 token
+    cada 4 caracteres.
+    """
+    
+    CONTEXT_SAFETY_MARGIN_TOKENS = 1024
+    """Tokens reservados por diferencias de conteo y plantillas del modelo."""
+    
+    CONTEXT_MIN_TRUNCATED_TOKENS = 200
+    """Espacio mínimo para incluir un chunk truncado (menos: se descarta)."""
+
+    
+    # ========================================
+    # CACHÉ DE RESULTADOS DE RECUPERACIÓN
+    # ========================================
+    
+    RETRIEVAL_CACHE_ENABLED = True
+    """Cachear los documentos recuperados por DynamicJusticIARetriever.
+    
+    Clave: consulta normalizada + top_k + umbral + filtro de expediente +
+    modo de búsqueda + modelo de embeddings + versión del corpus. Un hit no
+    toca el modelo de embeddings ni Milvus (ni los reintentos de fallback).
+    """
+    
+    RETRIEVAL_CACHE_MAX_ENTRIES = 512
+    """Consultas en memoria por proceso (LRU)."""
+    
+    RETRIEVAL_CACHE_TTL_SECONDS = 600
+    """Vigencia en memoria del proceso."""
+    
+    RETRIEVAL_CACHE_REDIS_TTL_SECONDS = 3600
+    """Vigencia en Redis (nivel compartido entre procesos y usuarios)."""
+    
+    CORPUS_VERSION_REFRESH_SECONDS = 5
+    """Cada cuánto se relee la versión del corpus de Redis (corpus:version).
+    
+    La ingesta incrementa la versión cuando un documento entra o sale del
+    estado Procesado; las entradas de versiones anteriores dejan de usarse.
+    Es también el retraso máximo con el que un documento nuevo aparece en
+    consultas cacheadas.
+    """
+
 
 # ========================================
 # INSTANCIA GLOBAL
@@ -0,0 +1,281 @@
+"""
+Configuración centralizada de operaciones vectoriales sobre Milvus.
+
+Agrupa los parámetros de rendimiento de las búsquedas en la colección vectorial
+que antes estaban fijos en el código de app.vectorstore.vectorstore.
+
+Parámetros principales:
+    1. **Búsqueda de expedientes similares**: Tamaño de lote de vectores por
+       llamada a Milvus y modo de agregación de scores por expediente.
+    2. **Partition key**: Particionado por expediente en colecciones nuevas.
+    3. **Índice ANN**: Perfil de índice, esfuerzo de búsqueda por tipo de solicitud,
+       precisión de los vectores y re-ranking de índices cuantizados.
+    4. **BM25**: Campo léxico opcional para búsqueda híbrida densa + léxica.
+    5. **Acceso asíncrono**: Pool de hilos dedicado, límite de concurrencia y
+       timeouts por llamada (app.vectorstore.milvus_executor).
+    6. **Caché de IDs procesados**: Canal de notificaciones y vigencia del
+       conjunto usado por el filtro legacy de estado.
+
+Búsqueda por lotes:
+    ```
+    Expediente de referencia → N chunks (embeddings)
+                ↓
+    ceil(N / SIMILAR_SEARCH_BATCH_SIZE) llamadas a client.search
+                ↓
+    Agregación por expediente (max | mean | top_n_sum)
+    ```
+
+    La latencia escala con la cantidad de lotes, no con la cantidad de chunks.
+
+Modos de agregación:
+    * max: Mejor coincidencia individual (comportamiento histórico)
+    * mean: Promedio de la mejor coincidencia por cada chunk de referencia
+      (los chunks sin coincidencia cuentan como 0)
+    * top_n_sum: Se toma la mejor coincidencia de cada chunk de referencia y
+      se suman las N más altas de esas por expediente, normalizada entre N
+      para mantener el rango [0, 1]
+
+Variables de entorno:
+    * SIMILAR_SEARCH_BATCH_SIZE: Vectores de consulta por llamada (default 16)
+    * SIMILAR_AGGREGATION_MODE: max | mean | top_n_sum (default max)
+    * SIMILAR_AGGREGATION_TOP_N: N para top_n_sum (default 3)
+    * ENABLE_PARTITION_KEY: Partition key en colecciones nuevas (default false)
+    * PARTITION_KEY_FIELD: numero_expediente | id_expediente (default numero_expediente)
+    * NUM_PARTITIONS: Particiones por hash (default 64)
+    * VECTOR_INDEX_PROFILE: hnsw | ivf_flat | ivf_sq8 | ivf_pq | diskann (default hnsw)
+    * VECTOR_INDEX_BUILD_PARAMS: JSON con parámetros de construcción (opcional)
+    * VECTOR_SEARCH_LEVELS: JSON con valores default/high (opcional)
+    * VECTOR_INDEX_REFRESH_SECONDS: Relectura del índice activo en segundos (default 60)
+    * VECTOR_INDEX_REBUILD_TIMEOUT: Límite de una reconstrucción en segundos (default 7200)
+    * VECTOR_DTYPE: float32 | float16 | bfloat16 en colecciones nuevas (default float32)
+    * VECTOR_RERANK_MULTIPLIER: Candidatos por resultado en índices cuantizados (default 4)
+    * ENABLE_BM25: Campo BM25 en colecciones nuevas (default false)
+    * MILVUS_MAX_WORKERS: Hilos del pool de Milvus (default 8)
+    * MILVUS_MAX_CONCURRENT_CALLS: Llamadas simultáneas por event loop (default 8)
+    * MILVUS_CALL_TIMEOUT: Timeout de búsquedas en segundos (default 30)
+    * MILVUS_WRITE_TIMEOUT: Timeout de escrituras en segundos (default 300)
+    * SIMILAR_REFERENCE_MAX_CHUNKS: Chunks de referencia usados (default 500)
+    * CHUNK_ITERATOR_BATCH_SIZE: Chunks por lote en recorridos completos (default 256)
+    * CHUNK_MAX_TOKENS: Tokens por chunk en la ingesta (default 0 = límite del modelo)
+    * CHUNK_MAX_CHARS: Tope de caracteres por chunk (default 7000)
+    * CHUNK_OVERLAP_TOKENS: Solapamiento mínimo en tokens (default 128)
+    * CHUNK_OVERLAP_CHARS: Solapamiento mínimo en caracteres (default 500)
+    * PROCESSED_IDS_CHANNEL: Canal pub/sub de estados (default documentos:estado)
+    * PROCESSED_IDS_REFRESH_SECONDS: Refresco completo (default 600)
+    * PROCESSED_IDS_FALLBACK_TTL_SECONDS: Vigencia sin listener (default 30)
+    * PROCESSED_SYNC_RETRIES: Intentos de sincronizar el estado en Milvus (default 3)
+    * PROCESSED_SYNC_RETRY_DELAY_SECONDS: Espera base entre intentos (default 2)
+    * PROCESSED_RECONCILE_INTERVAL_SECONDS: Reconciliación con la BD (default 900, 0 = desactivada)
+
+Example:
+    ```python
+    from app.config.vectorstore_config import vectorstore_config
+
+    batch_size = vectorstore_config.SIMILAR_SEARCH_BATCH_SIZE  # 16
+    modo = vectorstore_config.SIMILAR_AGGREGATION_MODE  # "max"
+    ```
+
+See Also:
+    - app.vectorstore.vectorstore: Usa esta configuración en las búsquedas
+    - app.config.rag_config: Parámetros de recuperación del sistema RAG
+"""
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+class VectorStoreConfig:
+    """
+    Configuración unificada de las operaciones vectoriales.
+
+    Todos los valores pueden sobrescribirse por variables de entorno.
+    """
+
+    # ========================================
+    # BÚSQUEDA DE EXPEDIENTES SIMILARES
+    # ========================================
+
+    SIMILAR_SEARCH_BATCH_SIZE = int(os.getenv("SIMILAR_SEARCH_BATCH_SIZE", "16"))
+    """Cantidad de vectores de consulta enviados en cada llamada a client.search.
+
+    Un expediente de 100 chunks pasa de 100 round trips a 7 con el valor por defecto.
+    Valores muy altos aumentan el tamaño de la respuesta (limit * batch resultados).
+    """
+
+    SIMILAR_AGGREGATION_MODE = os.getenv("SIMILAR_AGGREGATION_MODE", "max").lower()
+    """Modo de combinación de scores por expediente: max, mean o top_n_sum."""
+
+    SIMILAR_AGGREGATION_TOP_N = int(os.getenv("SIMILAR_AGGREGATION_TOP_N", "3"))
+    """Chunks de referencia (con su mejor coincidencia) que suma el modo top_n_sum."""
+
+    AGGREGATION_MODES = ("max", "mean", "top_n_sum")
+    """Modos de agregación soportados."""
+
+    SIMILAR_REFERENCE_MAX_CHUNKS = int(os.getenv("SIMILAR_REFERENCE_MAX_CHUNKS", "500"))
+    """Máximo de chunks del expediente de referencia usados como consultas (0 = sin límite).
+
+    Cada chunk es un vector de consulta: acota la latencia con expedientes enormes.
+    Se registra un warning cuando el expediente de referencia se trunca.
+    """
+
+    # ========================================
+    # RECORRIDO DE CHUNKS
+    # ========================================
+
+    CHUNK_ITERATOR_BATCH_SIZE = int(os.getenv("CHUNK_ITERATOR_BATCH_SIZE", "256"))
+    """Chunks por lote al recorrer expedientes y documentos completos (iter_chunks)."""
+
+    # ========================================
+    # CHUNKING DE LA INGESTA
+    # ========================================
+
+    CHUNK_MAX_TOKENS = int(os.getenv("CHUNK_MAX_TOKENS", "0"))
+    """Tokens de contenido por chunk (tokenizer del modelo de embeddings).
+
+    0 = longitud máxima de secuencia del modelo menos los tokens especiales:
+    ningún chunk se trunca al vectorizar. Un valor mayor al del modelo se acota.
+    """
+
+    CHUNK_MAX_CHARS = int(os.getenv("CHUNK_MAX_CHARS", "7000"))
+    """Tope de caracteres por chunk (campo texto de Milvus: VARCHAR de 8192)."""
+
+    CHUNK_OVERLAP_TOKENS = int(os.getenv("CHUNK_OVERLAP_TOKENS", "128"))
+    """Solapamiento mínimo entre chunks consecutivos en tokens (acotado a 1/4 del chunk)."""
+
+    CHUNK_OVERLAP_CHARS = int(os.getenv("CHUNK_OVERLAP_CHARS", "500"))
+    """Solapamiento mínimo en caracteres (único solapamiento si no hay tokenizer).
+
+    Con tokenizer rige cuando el tope CHUNK_MAX_CHARS corta antes que los tokens.
+    """
+
+    # ========================================
+    # PARTITION KEY
+    # ========================================
+
+    ENABLE_PARTITION_KEY = os.getenv("ENABLE_PARTITION_KEY", "false").lower() == "true"
+    """Crea la colección con partition key por expediente.
+
+    Solo tiene efecto al crear la colección; para colecciones existentes usar
+    python -m app.vectorstore.migracion.
+    """
+
+    PARTITION_KEY_FIELD = os.getenv("PARTITION_KEY_FIELD", "numero_expediente")
+    """Campo usado como partition key: numero_expediente o id_expediente."""
+
+    NUM_PARTITIONS = int(os.getenv("NUM_PARTITIONS", "64"))
+    """Particiones físicas entre las que Milvus reparte los expedientes (hash)."""
+
+    # ========================================
+    # ÍNDICE ANN
+    # ========================================
+
+    VECTOR_INDEX_PROFILE = os.getenv("VECTOR_INDEX_PROFILE", "hnsw").lower()
+    """Perfil de índice del campo embedding: hnsw, ivf_flat, ivf_sq8, ivf_pq o diskann.
+
+    Se aplica al crear la colección o al reconstruir el índice
+    (POST /vectorstore/index/rebuild). Ver app.vectorstore.index_profiles.
+    """
+
+    VECTOR_INDEX_BUILD_PARAMS = os.getenv("VECTOR_INDEX_BUILD_PARAMS", "")
+    """JSON opcional que reemplaza los parámetros de construcción del perfil.
+
+    Ejemplo: {"M": 32, "efConstruction": 400} para HNSW, {"nlist": 2048} para IVF.
+    """
+
+    VECTOR_SEARCH_LEVELS = os.getenv("VECTOR_SEARCH_LEVELS", "")
+    """JSON opcional con el valor de búsqueda por nivel de esfuerzo.
+
+    Ejemplo para HNSW: {"default": 96, "high": 384} (valores de ef).
+    """
+
+    VECTOR_INDEX_REFRESH_SECONDS = int(os.getenv("VECTOR_INDEX_REFRESH_SECONDS", "60"))
+    """Cada cuánto cada proceso relee de Milvus el tipo de índice activo.
+
+    Una reconstrucción hecha desde otro worker cambia los parámetros de
+    búsqueda; hasta la siguiente relectura se usan los del índice anterior.
+    """
+
+    VECTOR_INDEX_REBUILD_TIMEOUT = int(os.getenv("VECTOR_INDEX_REBUILD_TIMEOUT", "7200"))
+    """Segundos máximos de una reconstrucción del índice (corre en segundo plano)."""
+
+    # ========================================
+    # PRECISIÓN DE VECTORES
+    # ========================================
+
+    VECTOR_DTYPE = os.getenv("VECTOR_DTYPE", "float32").lower()
+    """Tipo del campo embedding en colecciones nuevas: float32, float16 o bfloat16.
+
+    16 bits reducen a la mitad la memoria de los vectores y el tiempo de carga.
+    Colecciones existentes: migrar con python -m app.vectorstore.migracion --vector-dtype.
+    """
+
+    VECTOR_RERANK_MULTIPLIER = int(os.getenv("VECTOR_RERANK_MULTIPLIER", "4"))
+    """Candidatos por resultado pedidos a un índice cuantizado (ivf_sq8, ivf_pq).
+
+    Los candidatos se re-ordenan por similitud coseno exacta contra el embedding
+    almacenado antes de recortar a top_k. 1 = sin re-ranking.
+    """
+
+    # ========================================
+    # BÚSQUEDA LÉXICA (BM25)
+    # ========================================
+
+    ENABLE_BM25 = os.getenv("ENABLE_BM25", "false").lower() == "true"
+    """Crea la colección con el campo texto_sparse (Function BM25 sobre texto).
+
+    Solo tiene efecto al crear la colección. Habilita SEARCH_MODE="hybrid"
+    (rag_config); en colecciones sin el campo la búsqueda sigue siendo densa.
+    """
+
+    # ========================================
+    # ACCESO ASÍNCRONO A MILVUS
+    # ========================================
+
+    MILVUS_MAX_WORKERS = int(os.getenv("MILVUS_MAX_WORKERS", "8"))
+    """Hilos del pool dedicado a llamadas síncronas de pymilvus."""
+
+    MILVUS_MAX_CONCURRENT_CALLS = int(os.getenv("MILVUS_MAX_CONCURRENT_CALLS", "8"))
+    """Llamadas simultáneas a Milvus por event loop; el resto espera sin bloquear."""
+
+    MILVUS_CALL_TIMEOUT = float(os.getenv("MILVUS_CALL_TIMEOUT", "30"))
+    """Timeout en segundos de búsquedas y queries."""
+
+    MILVUS_WRITE_TIMEOUT = float(os.getenv("MILVUS_WRITE_TIMEOUT", "300"))
+    """Timeout en segundos de inserciones, upserts y creación de la colección."""
+
+    # ========================================
+    # CACHÉ DE IDS PROCESADOS
+    # ========================================
+
+    PROCESSED_IDS_CHANNEL = os.getenv("PROCESSED_IDS_CHANNEL", "documentos:estado")
+    """Canal Redis pub/sub donde la ingesta publica los cambios de estado."""
+
+    PROCESSED_IDS_REFRESH_SECONDS = int(os.getenv("PROCESSED_IDS_REFRESH_SECONDS", "600"))
+    """Intervalo del refresco completo desde SQL Server con el listener activo."""
+
+    PROCESSED_IDS_FALLBACK_TTL_SECONDS = int(os.getenv("PROCESSED_IDS_FALLBACK_TTL_SECONDS", "30"))
+    """Vigencia del conjunto cuando el listener pub/sub no está conectado."""
+
+    # ========================================
+    # SINCRONIZACIÓN DEL ESTADO EN MILVUS
+    # ========================================
+
+    PROCESSED_SYNC_RETRIES = int(os.getenv("PROCESSED_SYNC_RETRIES", "3"))
+    """Intentos de actualizar el campo "procesado" después del commit de la ingesta."""
+
+    PROCESSED_SYNC_RETRY_DELAY_SECONDS = float(os.getenv("PROCESSED_SYNC_RETRY_DELAY_SECONDS", "2"))
+    """Espera base entre intentos (crece linealmente con cada intento)."""
+
+    PROCESSED_RECONCILE_INTERVAL_SECONDS = int(os.getenv("PROCESSED_RECONCILE_INTERVAL_SECONDS", "900"))
+    """Intervalo de la reconciliación del campo "procesado" con la BD (Celery beat).
+
+    Corrige los documentos que la ingesta no pudo sincronizar. 0 = desactivada.
+    """
+
+
+# ========================================
+# INSTANCIA GLOBAL
+# ========================================
+
+vectorstore_config = VectorStoreConfig()
@@ -0,0 +1,61 @@
+"""
+Clientes Redis compartidos por proceso.
+
+Centraliza la creación de conexiones Redis para los cachés y notificaciones
+del backend, reutilizando un cliente (y su pool de conexiones) por base de datos.
+
+Distribución de bases de datos Redis:
+    * DB 0: Broker Celery
+    * DB 1: Backend Celery (resultados)
+    * DB 2: Conversaciones (conversation_history_redis)
+    * DB 3: Cachés compartidos (REDIS_DB_CACHE)
+
+Note:
+    * Pub/sub de Redis no depende de la base de datos seleccionada
+    * Timeouts de 5 segundos: un Redis caído no bloquea las búsquedas
+    * Thread-safe: la creación de clientes está protegida con un lock
+
+Example:
+    >>> from app.db.redis_client import get_redis_client
+    >>> redis_client = get_redis_client()
+    >>> redis_client.set("clave", "valor", ex=60)
+
+Ver también:
+    * app.services.ingesta.async_processing.progress_tracker: Progreso de tareas
+    * app.services.RAG.conversation_history_redis: Historial de conversaciones
+"""
+import threading
+import redis
+
+from app.config.config import REDIS_URL
+
+# Base de datos Redis para cachés compartidos entre procesos
+REDIS_DB_CACHE = 3
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_redis_client(db: int = REDIS_DB_CACHE, decode_responses: bool = True) -> redis.Redis:
+    """
+    Obtiene un cliente Redis singleton para la base de datos indicada.
+
+    Args:
+        db: Número de base de datos Redis
+        decode_responses: True para recibir str, False para bytes
+
+    Returns:
+        redis.Redis: Cliente con pool de conexiones propio
+    """
+    key = (db, decode_responses)
+    with _clients_lock:
+        if key not in _clients:
+            _clients[key] = redis.Redis.from_url(
+                REDIS_URL,
+                db=db,
+                decode_responses=decode_responses,
+                socket_timeout=5,
+                socket_connect_timeout=5,
+                health_check_interval=30,
+            )
+        return _clients[key]
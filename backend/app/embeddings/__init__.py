@@ -7,6 +7,14 @@ con adaptador para LangChain.
 Módulos:
     * embeddings.py: Servicio principal con lazy loading
     * langchain_adapter.py: Adaptador para interfaz LangChain
+    * inference_executor.py: Pool de inferencia dedicado (no bloquea el event loop)
+    * micro_batcher.py: Agrupación de consultas concurrentes
+    * query_cache.py: Caché de embeddings de consultas (memoria + Redis)
+    * onnx_backend.py: Backend ONNX Runtime (opcionalmente int8)
+    * document_batcher.py: Lotes por longitud para la ingesta de documentos
+    * embedding_server.py / embedding_client.py: Servicio de embeddings compartido entre procesos
+    * tokenizer.py: Tokenizer y longitud máxima del modelo (chunking por tokens)
+    * benchmark.py: Paridad y benchmark de backends
 
 Modelo:
     * Nombre: Dariolopez/bge-m3-es-legal-tmp-6
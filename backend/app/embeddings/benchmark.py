@@ -0,0 +1,182 @@
+"""
+Paridad y benchmark de backends de inferencia del modelo de embeddings.
+
+Compara el backend PyTorch (referencia) con ONNX Runtime (float32 o int8)
+sobre los mismos textos antes de cambiar EMBEDDING_BACKEND en producción.
+
+Mediciones por backend:
+    * Carga: segundos hasta tener el modelo listo (arranque en frío)
+    * RSS: incremento de memoria residente del proceso al cargar el modelo
+    * Latencia por consulta: media y p95 de encode(texto) individual
+    * Throughput: textos por segundo con encode por lotes
+
+Paridad (contra PyTorch):
+    * Similitud coseno entre vectores del mismo texto: mínima y media
+    * Acuerdo de top-k: con cada texto como consulta, fracción del top-k por
+      similitud sobre el resto de textos que coincide entre ambos backends
+
+Uso:
+    ```
+    python -m app.embeddings.benchmark --backend onnx --quantization int8
+    python -m app.embeddings.benchmark --backend onnx --texts-file consultas.txt --top-k 5
+    ```
+
+Note:
+    * Los modelos se cargan en el mismo proceso, uno tras otro: el RSS es el
+      incremento medido en cada carga (orientativo)
+    * Ejecutar con EMBEDDING_TORCH_THREADS igual al de producción
+    * Sin --texts-file usa consultas jurídicas de ejemplo
+
+Ver también:
+    * app.embeddings.onnx_backend: Exportación y carga ONNX
+    * app.embeddings.embeddings.load_model: Selección del backend
+"""
+import argparse
+import logging
+import time
+from typing import Dict, List
+
+import numpy as np
+import psutil
+
+from app.embeddings.embeddings import load_model
+
+logger = logging.getLogger(__name__)
+
+_SAMPLE_TEXTS = [
+    "¿Qué es la prescripción de la acción penal?",
+    "Plazo para interponer recurso de casación en materia civil",
+    "Requisitos de la prisión preventiva según el Código Procesal Penal",
+    "Pensión alimentaria a favor de hijos menores de edad",
+    "Despido con responsabilidad patronal y cálculo de prestaciones",
+    "Nulidad absoluta del acto administrativo por falta de motivación",
+    "Daño moral subjetivo en procesos de responsabilidad civil extracontractual",
+    "Medidas cautelares en procesos contencioso-administrativos",
+    "Violencia doméstica: medidas de protección y su duración",
+    "Usucapión de bienes inmuebles y posesión a título de dueño",
+    "Recurso de amparo por violación al derecho de petición",
+    "Estafa mediante engaño y perjuicio patrimonial",
+    "Divorcio por mutuo consentimiento y convenio de bienes gananciales",
+    "Horas extra y jornada laboral ordinaria máxima",
+    "Competencia territorial del juzgado en materia de familia",
+    "Apelación de sentencia por errónea valoración de la prueba",
+]
+
+
+def _rss_mb() -> float:
+    return psutil.Process().memory_info().rss / (1024 * 1024)
+
+
+def _load(backend: str, quantization: str):
+    rss_before = _rss_mb()
+    start = time.perf_counter()
+    model = load_model(backend=backend, quantization=quantization)
+    load_seconds = time.perf_counter() - start
+    return model, load_seconds, _rss_mb() - rss_before
+
+
+def _measure(model, texts: List[str], batch_size: int) -> Dict[str, float]:
+    model.encode(texts[:2], show_progress_bar=False)  # warm-up
+
+    latencies = []
+    for text in texts:
+        start = time.perf_counter()
+        model.encode(text, show_progress_bar=False)
+        latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    model.encode(texts, batch_size=batch_size, show_progress_bar=False)
+    batch_seconds = time.perf_counter() - start
+
+    return {
+        "latency_ms_mean": float(np.mean(latencies) * 1000),
+        "latency_ms_p95": float(np.percentile(latencies, 95) * 1000),
+        "throughput_per_s": len(texts) / batch_seconds if batch_seconds else 0.0,
+    }
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
+
+
+def _topk_agreement(reference: np.ndarray, candidate: np.ndarray, top_k: int) -> float:
+    """Fracción promedio del top-k (excluyendo el propio texto) compartida entre backends."""
+    n = len(reference)
+    k = min(top_k, n - 1)
+    if k <= 0:
+        return 1.0
+
+    ref_sim = reference @ reference.T
+    cand_sim = candidate @ candidate.T
+    np.fill_diagonal(ref_sim, -np.inf)
+    np.fill_diagonal(cand_sim, -np.inf)
+
+    ref_top = np.argsort(-ref_sim, axis=1)[:, :k]
+    cand_top = np.argsort(-cand_sim, axis=1)[:, :k]
+    return float(np.mean([len(set(r) & set(c)) / k for r, c in zip(ref_top, cand_top)]))
+
+
+def run_benchmark(
+    backend: str, quantization: str, texts: List[str], batch_size: int = 32, top_k: int = 5
+) -> Dict[str, Dict[str, float]]:
+    """
+    Mide PyTorch y el backend indicado sobre los mismos textos.
+
+    Args:
+        backend: Backend a evaluar (onnx)
+        quantization: none | int8
+        texts: Textos de prueba
+        batch_size: Tamaño de lote para el throughput
+        top_k: k del acuerdo de top-k
+
+    Returns:
+        {"torch": métricas, backend: métricas + paridad}
+    """
+    results = {}
+    vectors = {}
+    for name, quant in (("torch", "none"), (backend, quantization)):
+        model, load_seconds, rss_mb = _load(name, quant)
+        # load_model vuelve a PyTorch si ONNX no está disponible: reportar lo cargado
+        metrics = {"loaded_backend": getattr(model, "backend", "torch"), "load_seconds": load_seconds, "rss_mb": rss_mb}
+        metrics.update(_measure(model, texts, batch_size))
+        vectors[name] = _normalize(np.asarray(
+            model.encode(texts, batch_size=batch_size, show_progress_bar=False), dtype=np.float32
+        ))
+        results[name] = metrics
+        del model
+
+    cosine = np.sum(vectors["torch"] * vectors[backend], axis=1)
+    results[backend]["cosine_min"] = float(np.min(cosine))
+    results[backend]["cosine_mean"] = float(np.mean(cosine))
+    results[backend][f"top{top_k}_agreement"] = _topk_agreement(vectors["torch"], vectors[backend], top_k)
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Paridad y benchmark de backends de embeddings")
+    parser.add_argument("--backend", default="onnx", choices=["onnx"], help="Backend a evaluar contra PyTorch")
+    parser.add_argument("--quantization", default="none", choices=["none", "int8"], help="Cuantización ONNX")
+    parser.add_argument("--texts-file", default=None, help="Archivo con un texto por línea")
+    parser.add_argument("--batch-size", type=int, default=32, help="Tamaño de lote para throughput")
+    parser.add_argument("--top-k", type=int, default=5, help="k para el acuerdo de top-k")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+
+    texts = _SAMPLE_TEXTS
+    if args.texts_file:
+        with open(args.texts_file, encoding="utf-8") as f:
+            texts = [line.strip() for line in f if line.strip()]
+
+    results = run_benchmark(args.backend, args.quantization, texts, args.batch_size, args.top_k)
+
+    print(f"\n=== BENCHMARK DE EMBEDDINGS ({len(texts)} textos) ===")
+    for name, metrics in results.items():
+        print(f"\n--- {name.upper()} ---")
+        for key, value in metrics.items():
+            print(f"{key}: {value:.4f}" if isinstance(value, float) else f"{key}: {value}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Lotes por longitud para vectorizar documentos durante la ingesta.
+
+Un PDF de cientos de páginas genera cientos de chunks de hasta ~7.000
+caracteres. Codificarlos en un único encode retiene todos los vectores y
+tensores intermedios a la vez, y mezclar chunks cortos con largos desperdicia
+cómputo en padding (cada lote se rellena hasta su texto más largo).
+
+Estrategia:
+    ```
+    chunks del documento (orden original)
+            ↓
+    Orden por longitud descendente (lotes homogéneos, poco padding)
+            ↓
+    Corte de lote al alcanzar EMBEDDING_DOC_BATCH_SIZE textos o cuando
+    texto_más_largo x textos > EMBEDDING_DOC_MAX_BATCH_CHARS
+            ↓
+    Cada lote: encode → insert en Milvus → se libera antes del siguiente
+    ```
+
+    * Los lotes más costosos van primero: un problema de memoria aparece al
+      inicio de la ingesta y no tras insertar medio documento
+    * Los índices devueltos permiten reconstruir el orden original
+
+Example:
+    >>> from app.embeddings.document_batcher import length_bucketed_batches
+    >>> length_bucketed_batches(["a" * 10, "b" * 5000, "c" * 20], batch_size=2, max_batch_chars=8000)
+    [[1], [2, 0]]
+
+Ver también:
+    * app.vectorstore.vectorstore.add_documents: Consumidor
+    * app.config.embeddings_config: Tamaño de lote y tope de caracteres
+"""
+from typing import List, Optional, Sequence
+
+from app.config.embeddings_config import embeddings_config
+
+
+def length_bucketed_batches(
+    texts: Sequence[str],
+    batch_size: Optional[int] = None,
+    max_batch_chars: Optional[int] = None,
+) -> List[List[int]]:
+    """
+    Agrupa textos de longitud similar en lotes acotados.
+
+    Args:
+        texts: Textos a codificar
+        batch_size: Textos máximos por lote (None = EMBEDDING_DOC_BATCH_SIZE)
+        max_batch_chars: Tope de caracteres con padding por lote, es decir
+            longitud del texto más largo x textos (None = EMBEDDING_DOC_MAX_BATCH_CHARS, 0 = sin tope)
+
+    Returns:
+        Lotes de índices sobre texts, ordenados de los textos más largos a los más cortos.
+        Un texto que supera el tope por sí solo forma su propio lote.
+    """
+    batch_size = max(1, batch_size or embeddings_config.EMBEDDING_DOC_BATCH_SIZE)
+    if max_batch_chars is None:
+        max_batch_chars = embeddings_config.EMBEDDING_DOC_MAX_BATCH_CHARS
+
+    order = sorted(range(len(texts)), key=lambda i: len(texts[i]), reverse=True)
+
+    batches: List[List[int]] = []
+    current: List[int] = []
+    longest = 0
+    for index in order:
+        # Orden descendente: el primer texto del lote fija la longitud con padding
+        longest = longest or len(texts[index])
+        full = len(current) >= batch_size
+        over_cap = max_batch_chars > 0 and current and longest * (len(current) + 1) > max_batch_chars
+        if full or over_cap:
+            batches.append(current)
+            current = []
+            longest = len(texts[index])
+        current.append(index)
+
+    if current:
+        batches.append(current)
+    return batches
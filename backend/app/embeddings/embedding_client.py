@@ -0,0 +1,199 @@
+"""
+Cliente del servicio de embeddings compartido.
+
+Con EMBEDDING_SERVICE_URL configurada, get_embeddings devuelve un
+RemoteEmbeddings en lugar de cargar el modelo: la API y cada proceso de
+Celery delegan la inferencia al servidor (app.embeddings.embedding_server),
+que mantiene un único modelo en memoria con micro-batching y caché.
+
+Interfaz:
+    Mismos métodos que EmbeddingsWrapper (aembed_query, aembed_documents,
+    embed_query, embed_documents): los consumidores no cambian.
+
+Transporte:
+    * http://host:puerto → TCP
+    * unix:///ruta/al/socket → socket Unix (mismo nodo, sin pila TCP)
+    * Respuesta: float32 little-endian crudos (4 KB por vector, sin parseo JSON)
+
+Note:
+    * httpx.AsyncClient queda ligado a su event loop: uno por loop (Celery
+      ejecuta tareas en loops propios); el cliente síncrono es compartido
+    * Un error del servicio se propaga como EmbeddingServiceError: no hay
+      carga local de respaldo (duplicaría el modelo que se quiere compartir)
+
+Example:
+    >>> from app.embeddings.embedding_client import RemoteEmbeddings
+    >>> remote = RemoteEmbeddings("unix:///tmp/embeddings.sock")
+    >>> vector = await remote.aembed_query("¿Qué es la prescripción?")
+    >>> len(vector)
+    1024
+
+Ver también:
+    * app.embeddings.embedding_server: Servidor
+    * app.embeddings.embeddings.get_embeddings: Selección local/remoto
+    * app.config.embeddings_config: EMBEDDING_SERVICE_URL
+"""
+import asyncio
+import logging
+import threading
+import time
+import weakref
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+import numpy as np
+
+from app.config.embeddings_config import embeddings_config
+
+logger = logging.getLogger(__name__)
+
+_UNIX_SCHEME = "unix://"
+_UDS_BASE_URL = "http://embeddings"
+
+
+class EmbeddingServiceError(RuntimeError):
+    """El servicio de embeddings no respondió o devolvió un error."""
+
+
+def _parse_url(url: str) -> Tuple[str, Optional[str]]:
+    """Devuelve (base_url, ruta del socket Unix o None)."""
+    if url.startswith(_UNIX_SCHEME):
+        return _UDS_BASE_URL, url[len(_UNIX_SCHEME):]
+    return url.rstrip("/"), None
+
+
+def decode_vectors(response: httpx.Response) -> List[List[float]]:
+    """Convierte el cuerpo float32 de la respuesta en listas de floats."""
+    dim = int(response.headers["X-Embedding-Dim"])
+    return np.frombuffer(response.content, dtype="<f4").reshape(-1, dim).tolist()
+
+
+class RemoteEmbeddings:
+    """
+    Cliente del servicio de embeddings con la interfaz de EmbeddingsWrapper.
+
+    Attributes:
+        url: URL del servicio (http:// o unix://)
+        timeout: Segundos máximos por solicitud
+    """
+
+    def __init__(self, url: str, timeout: float = embeddings_config.EMBEDDING_SERVICE_TIMEOUT):
+        self.url = url
+        self.timeout = timeout
+        self._base_url, self._uds = _parse_url(url)
+
+        self._async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = (
+            weakref.WeakKeyDictionary()
+        )
+        self._sync_client: Optional[httpx.Client] = None
+        self._lock = threading.Lock()
+
+        self._requests = 0
+        self._errors = 0
+        self._latency_total = 0.0
+
+    # ================================
+    # CLIENTES HTTP
+    # ================================
+
+    def _async_client(self) -> httpx.AsyncClient:
+        loop = asyncio.get_running_loop()
+        client = self._async_clients.get(loop)
+        if client is None:
+            transport = httpx.AsyncHTTPTransport(uds=self._uds) if self._uds else None
+            client = httpx.AsyncClient(base_url=self._base_url, transport=transport, timeout=self.timeout)
+            self._async_clients[loop] = client
+        return client
+
+    def _client(self) -> httpx.Client:
+        if self._sync_client is None:
+            with self._lock:
+                if self._sync_client is None:
+                    transport = httpx.HTTPTransport(uds=self._uds) if self._uds else None
+                    self._sync_client = httpx.Client(base_url=self._base_url, transport=transport, timeout=self.timeout)
+        return self._sync_client
+
+    # ================================
+    # SOLICITUDES
+    # ================================
+
+    async def _apost(self, path: str, payload: Dict[str, Any]) -> List[List[float]]:
+        start = time.perf_counter()
+        try:
+            response = await self._async_client().post(path, json=payload)
+            response.raise_for_status()
+        except httpx.HTTPError as e:
+            self._record(start, error=True)
+            raise EmbeddingServiceError(f"Servicio de embeddings ({self.url}{path}): {e}") from e
+        self._record(start)
+        return decode_vectors(response)
+
+    def _post(self, path: str, payload: Dict[str, Any]) -> List[List[float]]:
+        start = time.perf_counter()
+        try:
+            response = self._client().post(path, json=payload)
+            response.raise_for_status()
+        except httpx.HTTPError as e:
+            self._record(start, error=True)
+            raise EmbeddingServiceError(f"Servicio de embeddings ({self.url}{path}): {e}") from e
+        self._record(start)
+        return decode_vectors(response)
+
+    async def aembed_query(self, text: str) -> List[float]:
+        """Embedding de una consulta (micro-batching y caché en el servidor)."""
+        return (await self._apost("/embed/query", {"text": text}))[0]
+
+    async def warm_up(self, text: str = "test") -> None:
+        """Inferencia de prueba en el servidor (/embed/documents no pasa por su caché)."""
+        await self._apost("/embed/documents", {"texts": [text]})
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Embeddings de varios documentos en una sola solicitud."""
+        if not texts:
+            return []
+        return await self._apost("/embed/documents", {"texts": texts})
+
+    def embed_query(self, text: str) -> List[float]:
+        """Versión síncrona de aembed_query."""
+        return self._post("/embed/query", {"text": text})[0]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Versión síncrona de aembed_documents."""
+        if not texts:
+            return []
+        return self._post("/embed/documents", {"texts": texts})
+
+    # ================================
+    # MÉTRICAS
+    # ================================
+
+    def _record(self, start: float, error: bool = False) -> None:
+        with self._lock:
+            self._requests += 1
+            self._errors += int(error)
+            self._latency_total += time.perf_counter() - start
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Solicitudes, errores y latencia promedio vistas por este proceso."""
+        with self._lock:
+            return {
+                "service_url": self.url,
+                "requests": self._requests,
+                "errors": self._errors,
+                "avg_latency_ms": round(self._latency_total / self._requests * 1000, 2) if self._requests else 0.0,
+            }
+
+
+_remote: Optional[RemoteEmbeddings] = None
+_remote_lock = threading.Lock()
+
+
+def get_remote_embeddings() -> RemoteEmbeddings:
+    """Instancia singleton del cliente (EMBEDDING_SERVICE_URL)."""
+    global _remote
+    if _remote is None:
+        with _remote_lock:
+            if _remote is None:
+                _remote = RemoteEmbeddings(embeddings_config.EMBEDDING_SERVICE_URL)
+                logger.info(f"Embeddings remotos: {_remote.url}")
+    return _remote
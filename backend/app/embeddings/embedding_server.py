@@ -0,0 +1,126 @@
+"""
+Servicio de embeddings compartido (HTTP o socket Unix).
+
+La API y cada proceso hijo de Celery (prefork) cargaban su propia copia del
+modelo (~2.3 GB): más RAM por proceso, más tiempo de arranque y menos
+workers por nodo. Este servidor carga el modelo una vez y atiende a todos
+los procesos del nodo, reutilizando EmbeddingsWrapper (pool de inferencia,
+micro-batching de consultas y caché).
+
+Arquitectura:
+    ```
+    API (uvicorn)     worker Celery 1     worker Celery N
+          \\                 |                  /
+           RemoteEmbeddings (EMBEDDING_SERVICE_URL)
+                             ↓
+    embedding_server: EmbeddingsWrapper → micro-batcher → pool de inferencia
+    ```
+
+Endpoints:
+    * POST /embed/query {"text": "..."}: Embedding de una consulta
+    * POST /embed/documents {"texts": [...]}: Embeddings de documentos
+    * GET /health: Modelo cargado
+    * GET /metrics: Métricas del motor (micro-batching, caché)
+
+    Las respuestas de /embed/* son float32 little-endian crudos (un vector
+    tras otro) con la dimensión en el header X-Embedding-Dim.
+
+Uso:
+    ```
+    python -m app.embeddings.embedding_server --uds /tmp/embeddings.sock
+    python -m app.embeddings.embedding_server --host 127.0.0.1 --port 8100
+    ```
+
+    Luego en API y workers: EMBEDDING_SERVICE_URL=unix:///tmp/embeddings.sock
+    (o http://127.0.0.1:8100).
+
+Note:
+    * Un solo proceso uvicorn: varios procesos volverían a duplicar el modelo
+    * Servicio interno sin autenticación: exponer solo en localhost, socket
+      Unix o red privada de contenedores
+    * El servidor siempre usa el modelo local aunque EMBEDDING_SERVICE_URL
+      esté definida en el entorno
+
+Ver también:
+    * app.embeddings.embedding_client: Cliente
+    * app.embeddings.embeddings: EmbeddingsWrapper
+    * app.config.embeddings_config: EMBEDDING_SERVICE_URL
+"""
+import argparse
+import logging
+from typing import List
+
+import numpy as np
+from fastapi import FastAPI
+from fastapi.responses import Response
+from pydantic import BaseModel
+
+from app.embeddings.embeddings import get_embeddings_metrics, get_local_embeddings
+
+logger = logging.getLogger(__name__)
+
+app = FastAPI(title="JusticIA Embeddings", docs_url=None, redoc_url=None)
+
+
+class QueryRequest(BaseModel):
+    text: str
+
+
+class DocumentsRequest(BaseModel):
+    texts: List[str]
+
+
+def _vectors_response(vectors: List[List[float]]) -> Response:
+    array = np.asarray(vectors, dtype="<f4")
+    return Response(
+        content=array.tobytes(),
+        media_type="application/octet-stream",
+        headers={"X-Embedding-Dim": str(array.shape[1] if array.ndim == 2 else 0)},
+    )
+
+
+@app.on_event("startup")
+async def startup_event():
+    """Carga el modelo y hace una inferencia de prueba antes de aceptar solicitudes."""
+    embeddings = await get_local_embeddings()
+    await embeddings.warm_up()
+    logger.info("Servicio de embeddings listo")
+
+
+@app.post("/embed/query")
+async def embed_query(request: QueryRequest) -> Response:
+    embeddings = await get_local_embeddings()
+    return _vectors_response([await embeddings.aembed_query(request.text)])
+
+
+@app.post("/embed/documents")
+async def embed_documents(request: DocumentsRequest) -> Response:
+    embeddings = await get_local_embeddings()
+    return _vectors_response(await embeddings.aembed_documents(request.texts))
+
+
+@app.get("/health")
+async def health():
+    return {"status": "ok", "loaded": get_embeddings_metrics().get("loaded", False)}
+
+
+@app.get("/metrics")
+async def metrics():
+    return get_embeddings_metrics()
+
+
+def main() -> None:
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Servicio de embeddings compartido")
+    parser.add_argument("--host", default="127.0.0.1", help="Host TCP (ignorado con --uds)")
+    parser.add_argument("--port", type=int, default=8100, help="Puerto TCP (ignorado con --uds)")
+    parser.add_argument("--uds", default=None, help="Ruta del socket Unix")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    uvicorn.run(app, host=args.host, port=args.port, uds=args.uds, workers=1, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
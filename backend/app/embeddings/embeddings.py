@@ -10,7 +10,7 @@ Características:
     * Idioma: Español optimizado para legal
     * Lazy loading: Carga bajo demanda
     * Cache local: Pre-descarga en Docker
-    * Async compatible: Wrapper para sentence-transformers
+    * Async compatible: Inferencia en pool de hilos dedicado (no bloquea el event loop)
 
 Modelo BGE-M3:
     * BAAI General Embedding v3 (Multi-lingual)
@@ -19,18 +19,40 @@ Modelo BGE-M3:
     * Normalizado: Similitud coseno directa
     * Tamaño: ~2.3 GB
 
+Backends de inferencia (EMBEDDING_BACKEND):
+    * torch: SentenceTransformer con PyTorch (default)
+    * onnx: ONNX Runtime en CPU, opcionalmente int8 (app.embeddings.onnx_backend)
+    * Paridad y benchmark: python -m app.embeddings.benchmark
+
 Cache local:
     * Ruta: /app/models/{EMBEDDING_MODEL}
     * Pre-descarga: utils/hf_model.py
     * Evita download en runtime (producción)
     * Fallback: HuggingFace si no existe local
+    * Pesos en safetensors (app.utils.hf_model.ensure_safetensors): carga más
+      rápida, sin deserializar con pickle. Cada proceso tiene su propia copia
+      de los pesos; para un solo modelo por nodo usar EMBEDDING_SERVICE_URL
 
 Lazy loading:
     * Variable global _embeddings
-    * Se carga en primera llamada
+    * Se carga en primera llamada (en el pool de inferencia, con lock)
     * Persiste en memoria del proceso
     * Compartido entre requests
 
+Inferencia no bloqueante:
+    * encode corre en el pool "embeddings" (app.embeddings.inference_executor)
+    * Cola acotada por event loop (EMBEDDING_QUEUE_SIZE) y timeout por solicitud
+    * Hilos intra-op de PyTorch configurables (EMBEDDING_TORCH_THREADS)
+    * Consultas concurrentes agrupadas en lotes (micro_batcher); métricas
+      con get_embeddings_metrics (GET /vectorstore/embeddings/metrics)
+    * Consultas repetidas servidas desde caché (query_cache: memoria + Redis)
+
+Servicio compartido (EMBEDDING_SERVICE_URL):
+    * get_embeddings devuelve RemoteEmbeddings (app.embeddings.embedding_client)
+      y el proceso no carga el modelo
+    * El modelo vive en app.embeddings.embedding_server, compartido por la API
+      y los workers de Celery del nodo
+
 Example:
     >>> from app.embeddings.embeddings import get_embeddings, get_embedding
     >>> 
@@ -49,6 +71,9 @@ Example:
     >>> 
     >>> # Función de conveniencia
     >>> vector = await get_embedding("Texto a vectorizar")
+    >>> 
+    >>> # Código síncrono (sin event loop)
+    >>> vector = get_embeddings_sync().embed_query("Texto a vectorizar")
 
 Note:
     * Primera carga tarda ~5-10s (cargar modelo 2.3GB)
@@ -61,6 +86,7 @@ Ver también:
     * app.embeddings.langchain_adapter: Adaptador para LangChain
     * app.vectorstore.milvus_storage: Usa embeddings
     * app.config.config: EMBEDDING_MODEL configurado
+    * app.config.embeddings_config: Pool de inferencia
     * utils/hf_model.py: Pre-descarga del modelo
 
 Authors:
@@ -71,58 +97,246 @@ Version:
 """
 from sentence_transformers import SentenceTransformer
 from app.config.config import EMBEDDING_MODEL
+from app.config.embeddings_config import embeddings_config
+from app.embeddings.inference_executor import run_inference, run_inference_sync
+from app.embeddings.micro_batcher import MicroBatcher
+from app.embeddings.query_cache import get_query_cache
+from app.embeddings.embedding_client import get_remote_embeddings
 import os
 import logging
+import threading
+import time
+from pathlib import Path
 
 logger = logging.getLogger(__name__)
 
 _embeddings = None
+_load_lock = threading.Lock()
+_load_seconds = 0.0
 
 class EmbeddingsWrapper:
     """
     Wrapper async para sentence-transformers.
     
-    Hace compatible sentence-transformers (síncrono) con
-    código async de FastAPI.
+    Hace compatible sentence-transformers (síncrono) con código async de
+    FastAPI: cada encode se ejecuta en el pool de inferencia dedicado
+    (app.embeddings.inference_executor) y la corrutina cede el event loop
+    mientras el modelo corre.
+    
+    Las consultas repetidas se resuelven con el caché de embeddings
+    (app.embeddings.query_cache) y las concurrentes se agrupan con un
+    micro-batcher (app.embeddings.micro_batcher) en un solo forward pass.
     
     Attributes:
         model (SentenceTransformer): Modelo sentence-transformers cargado.
+        batcher (MicroBatcher | None): Micro-batcher de aembed_query (None si está deshabilitado).
+        cache (QueryEmbeddingCache | None): Caché de consultas (None si está deshabilitado).
     """
     
     def __init__(self, model):
         self.model = model
+        self.cache = get_query_cache()
+        self.batcher = None
+        if embeddings_config.EMBEDDING_MICROBATCH_ENABLED:
+            self.batcher = MicroBatcher(
+                self._encode,
+                max_wait_ms=embeddings_config.EMBEDDING_MICROBATCH_MAX_WAIT_MS,
+                max_batch_size=embeddings_config.EMBEDDING_MICROBATCH_MAX_SIZE,
+                max_in_flight=embeddings_config.EMBEDDING_MAX_WORKERS,
+            )
+    
+    def _encode(self, texts):
+        """Forward pass síncrono (se ejecuta en un hilo del pool de inferencia)."""
+        return self.model.encode(
+            texts,
+            batch_size=embeddings_config.EMBEDDING_ENCODE_BATCH_SIZE,
+            show_progress_bar=False,
+        ).tolist()
     
     async def aembed_query(self, text: str):
         """Genera embedding para una consulta de texto"""
-        return self.model.encode(text).tolist()
+        if self.cache is not None:
+            cached = await self.cache.aget(text)
+            if cached is not None:
+                return cached
+        
+        if self.batcher is not None:
+            vector = await self.batcher.submit(text)
+        else:
+            vector = await run_inference(self._encode, text)
+        
+        if self.cache is not None:
+            await self.cache.aset(text, vector)
+        return vector
+    
+    async def warm_up(self, text: str = "test"):
+        """
+        Inferencia de prueba directa al modelo.
+        
+        No pasa por el caché de consultas ni por el micro-batcher: con el
+        caché en Redis, aembed_query("test") se resolvería sin ejecutar el
+        modelo desde el segundo arranque.
+        """
+        await run_inference(self._encode, [text])
     
     async def aembed_documents(self, texts: list):
         """Genera embeddings para múltiples documentos"""
-        return self.model.encode(texts).tolist()
+        if not texts:
+            return []
+        return await run_inference(self._encode, texts)
+    
+    def embed_query(self, text: str):
+        """Versión síncrona de aembed_query (hilos sin event loop, LangChain)"""
+        if self.cache is not None:
+            cached = self.cache.get(text)
+            if cached is not None:
+                return cached
+        vector = run_inference_sync(self._encode, text)
+        if self.cache is not None:
+            self.cache.set(text, vector)
+        return vector
+    
+    def embed_documents(self, texts: list):
+        """Versión síncrona de aembed_documents (hilos sin event loop, LangChain)"""
+        if not texts:
+            return []
+        return run_inference_sync(self._encode, texts)
 
-async def get_embeddings():
-    global _embeddings
-    if _embeddings is None:
-        logger.info(f"Cargando modelo de embeddings: {EMBEDDING_MODEL}")
+def _model_source(model_id: str = None) -> str:
+    """Ruta local pre-descargada del modelo o, si no existe, su id de HuggingFace."""
+    model_id = model_id or EMBEDDING_MODEL
+    # Ruta local donde se pre-descarga el modelo (ver utils/hf_model.py)
+    local_model_path = f"/app/models/{model_id.replace('/', '__')}"
+    
+    # Intentar cargar desde ruta local primero (más rápido)
+    if os.path.exists(local_model_path):
+        logger.info(f"Cargando modelo desde cache local: {local_model_path}")
+        return local_model_path
+    
+    # Si no existe localmente, SentenceTransformer lo descarga automáticamente
+    # (esto puede tomar varios minutos la primera vez)
+    logger.warning(f"Modelo no encontrado localmente, descargando desde HuggingFace...")
+    logger.warning(f"Esto puede tomar varios minutos. Considera pre-descargar el modelo.")
+    return model_id
+
+def load_model(backend: str = None, quantization: str = None, model_id: str = None) -> SentenceTransformer:
+    """
+    Carga el modelo con el backend de inferencia indicado.
+    
+    Args:
+        backend: torch | onnx (None = EMBEDDING_BACKEND)
+        quantization: none | int8, solo backend onnx (None = EMBEDDING_ONNX_QUANTIZATION)
+        model_id: Modelo a cargar (None = EMBEDDING_MODEL); la re-vectorización
+            (app.vectorstore.revectorizacion) carga el modelo nuevo
         
-        # Ruta local donde se pre-descarga el modelo (ver utils/hf_model.py)
-        local_model_path = f"/app/models/{EMBEDDING_MODEL.replace('/', '__')}"
+    Returns:
+        SentenceTransformer listo para encode
         
-        # Intentar cargar desde ruta local primero (más rápido)
-        if os.path.exists(local_model_path):
-            logger.info(f"Cargando modelo desde cache local: {local_model_path}")
-            model = SentenceTransformer(local_model_path)
-        else:
-            # Si no existe localmente, SentenceTransformer lo descarga automáticamente
-            # (esto puede tomar varios minutos la primera vez)
-            logger.warning(f"Modelo no encontrado localmente, descargando desde HuggingFace...")
-            logger.warning(f"Esto puede tomar varios minutos. Considera pre-descargar el modelo.")
-            model = SentenceTransformer(EMBEDDING_MODEL)
+    Note:
+        Si el backend ONNX no está disponible (dependencias opcionales) o falla
+        la exportación, se registra un warning y se usa PyTorch.
+    """
+    backend = (backend or embeddings_config.EMBEDDING_BACKEND).lower()
+    source = _model_source(model_id)
+    
+    if backend == "onnx":
+        try:
+            from app.embeddings.onnx_backend import load_onnx_model
+            
+            return load_onnx_model(source, quantization=quantization)
+        except ImportError as e:
+            logger.warning(f"Backend ONNX no disponible ({e}), usando PyTorch")
+        except Exception as e:
+            logger.error(f"Error cargando backend ONNX, usando PyTorch: {e}", exc_info=True)
+    elif backend != "torch":
+        logger.warning(f"Backend de embeddings '{backend}' no soportado, usando PyTorch")
+    
+    return _load_torch_model(source)
+
+def _load_torch_model(source: str) -> SentenceTransformer:
+    """
+    Carga PyTorch (transformers prefiere model.safetensors si existe).
+    
+    Los pesos se copian a la memoria del proceso: safetensors acelera la carga
+    pero no comparte RAM entre procesos (ver EMBEDDING_SERVICE_URL).
+    """
+    if Path(source).is_dir() and not any(Path(source).glob("*.safetensors")):
+        logger.info("Modelo sin pesos .safetensors: carga desde pickle (ver app.utils.hf_model.ensure_safetensors)")
+    return SentenceTransformer(source)
+
+def _load_embeddings() -> EmbeddingsWrapper:
+    """Carga el modelo (síncrono, una sola vez por proceso)."""
+    global _embeddings, _load_seconds
+    with _load_lock:
+        if _embeddings is not None:
+            return _embeddings
+
+        logger.info(
+            f"Cargando modelo de embeddings: {EMBEDDING_MODEL} "
+            f"(backend={embeddings_config.EMBEDDING_BACKEND})"
+        )
+        start = time.perf_counter()
+        model = load_model()
+        if embeddings_config.EMBEDDING_MAX_SEQ_LENGTH > 0:
+            model.max_seq_length = embeddings_config.EMBEDDING_MAX_SEQ_LENGTH
+        _load_seconds = time.perf_counter() - start
         
-        logger.info("Modelo de embeddings cargado exitosamente")
+        logger.info(f"Modelo de embeddings cargado exitosamente en {_load_seconds:.1f}s")
         _embeddings = EmbeddingsWrapper(model)
+        return _embeddings
+
+async def get_local_embeddings() -> EmbeddingsWrapper:
+    """Modelo cargado en este proceso (ignora EMBEDDING_SERVICE_URL; lo usa el servidor de embeddings)."""
+    if _embeddings is None:
+        # La carga (~5-10s) también corre en el pool: no congela el event loop
+        await run_inference(_load_embeddings, timeout=0)
+    return _embeddings
+
+async def get_embeddings():
+    """
+    Motor de embeddings del proceso.
+    
+    Returns:
+        RemoteEmbeddings si EMBEDDING_SERVICE_URL está definida (modelo compartido
+        en app.embeddings.embedding_server); si no, EmbeddingsWrapper con el modelo
+        cargado en este proceso. Ambos exponen aembed_query/aembed_documents y
+        sus versiones síncronas.
+    """
+    if embeddings_config.EMBEDDING_SERVICE_URL:
+        return get_remote_embeddings()
+    return await get_local_embeddings()
+
+def get_embeddings_sync():
+    """
+    Versión síncrona de get_embeddings (thread-safe).
+    
+    Para código síncrono (adaptador LangChain, scripts): no crea event loops
+    ni pools por llamada. Desde corrutinas usar get_embeddings.
+    """
+    if embeddings_config.EMBEDDING_SERVICE_URL:
+        return get_remote_embeddings()
+    if _embeddings is None:
+        return _load_embeddings()
     return _embeddings
 
+def get_embeddings_metrics() -> dict:
+    """Métricas del motor de embeddings del proceso (micro-batching y caché de consultas)."""
+    if embeddings_config.EMBEDDING_SERVICE_URL and _embeddings is None:
+        return {"loaded": False, "mode": "remote", "client": get_remote_embeddings().get_metrics()}
+    if _embeddings is None:
+        return {"loaded": False}
+    return {
+        "loaded": True,
+        "mode": "local",
+        "model": EMBEDDING_MODEL,
+        "backend": _embeddings.model.backend if hasattr(_embeddings.model, "backend") else "torch",
+        "load_seconds": round(_load_seconds, 2),
+        "max_seq_length": getattr(_embeddings.model, "max_seq_length", None),
+        "microbatch_enabled": _embeddings.batcher is not None,
+        "microbatch": _embeddings.batcher.get_metrics() if _embeddings.batcher else None,
+        "query_cache": _embeddings.cache.get_metrics() if _embeddings.cache else None,
+    }
+
 async def get_embedding(text: str) -> list:
     """
     Función de conveniencia para generar embedding de un texto.
@@ -0,0 +1,162 @@
+"""
+Ejecución asíncrona de la inferencia del modelo de embeddings.
+
+SentenceTransformer.encode es síncrono y ocupa la CPU/GPU durante todo el
+forward pass: llamarlo dentro de una corrutina congela el event loop de
+uvicorn. Este módulo ejecuta la inferencia en un pool de hilos dedicado, con
+cola acotada y hilos intra-op configurables.
+
+Flujo:
+    ```
+    await run_inference(model.encode, textos)
+                ↓
+    Semáforo del event loop (EMBEDDING_QUEUE_SIZE)
+                ↓
+    ThreadPoolExecutor "embeddings" (EMBEDDING_MAX_WORKERS hilos)
+                ↓
+    model.encode(...)  ←  PyTorch libera el GIL: el event loop sigue atendiendo
+    ```
+
+Note:
+    * Pool separado del de Milvus y del executor por defecto de asyncio
+    * Un semáforo por event loop (Celery ejecuta tareas en loops propios)
+    * torch.set_num_threads se aplica en cada hilo del pool al iniciarlo
+
+    Código síncrono (adaptador LangChain) usa run_inference_sync: mismo pool,
+    sin crear event loops ni pools por llamada.
+
+Example:
+    >>> from app.embeddings.inference_executor import run_inference, run_inference_sync
+    >>> vector = await run_inference(model.encode, "texto")
+    >>> vector = run_inference_sync(model.encode, "texto")
+
+Ver también:
+    * app.embeddings.embeddings: Único consumidor
+    * app.config.embeddings_config: Parámetros del pool
+"""
+import asyncio
+import logging
+import threading
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable, Optional
+
+from app.config.embeddings_config import embeddings_config
+
+logger = logging.getLogger(__name__)
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+# asyncio.Semaphore queda ligado al loop donde se usa: uno por event loop
+_semaphores: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def _configure_torch_threads() -> None:
+    threads = embeddings_config.EMBEDDING_TORCH_THREADS
+    if threads <= 0:
+        return
+    try:
+        import torch
+
+        torch.set_num_threads(threads)
+        logger.debug(f"Hilo {threading.current_thread().name}: {threads} hilos intra-op de PyTorch")
+    except Exception as e:
+        logger.warning(f"No se pudo configurar hilos de PyTorch: {e}")
+
+
+def get_inference_executor() -> ThreadPoolExecutor:
+    """Pool de hilos de inferencia (se crea en el primer uso)."""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=max(1, embeddings_config.EMBEDDING_MAX_WORKERS),
+                    thread_name_prefix="embeddings",
+                    # OpenMP guarda el número de hilos por hilo: configurar cada worker
+                    initializer=_configure_torch_threads,
+                )
+    return _executor
+
+
+def _get_semaphore() -> asyncio.Semaphore:
+    loop = asyncio.get_running_loop()
+    semaphore = _semaphores.get(loop)
+    if semaphore is None:
+        semaphore = asyncio.Semaphore(max(1, embeddings_config.EMBEDDING_QUEUE_SIZE))
+        _semaphores[loop] = semaphore
+    return semaphore
+
+
+async def run_inference(
+    func: Callable[..., Any],
+    *args,
+    timeout: Optional[float] = None,
+    **kwargs,
+) -> Any:
+    """
+    Ejecuta una llamada síncrona del modelo sin bloquear el event loop.
+
+    Args:
+        func: Función síncrona (p. ej. SentenceTransformer.encode)
+        *args: Argumentos posicionales de func
+        timeout: Segundos máximos incluida la cola (None = EMBEDDING_TIMEOUT, 0 = sin límite)
+        **kwargs: Argumentos nombrados de func
+
+    Returns:
+        Resultado de func
+
+    Raises:
+        asyncio.TimeoutError: Si la solicitud excede el timeout
+        Exception: Cualquier error de func
+    """
+    if timeout is None:
+        timeout = embeddings_config.EMBEDDING_TIMEOUT
+
+    loop = asyncio.get_running_loop()
+
+    async def _run():
+        async with _get_semaphore():
+            return await loop.run_in_executor(get_inference_executor(), partial(func, *args, **kwargs))
+
+    if not timeout:
+        return await _run()
+    try:
+        return await asyncio.wait_for(_run(), timeout=timeout)
+    except asyncio.TimeoutError:
+        logger.error(f"Timeout de embeddings ({timeout}s) en {getattr(func, '__name__', func)}")
+        raise
+
+
+def run_inference_sync(func: Callable[..., Any], *args, timeout: Optional[float] = None, **kwargs) -> Any:
+    """
+    Ejecuta una llamada del modelo en el pool de inferencia y espera el resultado.
+
+    Bloquea el hilo que llama: usar solo desde código síncrono. Comparte el
+    pool (y los hilos intra-op configurados) con run_inference.
+
+    Args:
+        func: Función síncrona (p. ej. SentenceTransformer.encode)
+        *args: Argumentos posicionales de func
+        timeout: Segundos máximos (None = EMBEDDING_TIMEOUT, 0 = sin límite)
+        **kwargs: Argumentos nombrados de func
+
+    Returns:
+        Resultado de func
+
+    Raises:
+        concurrent.futures.TimeoutError: Si la llamada excede el timeout
+    """
+    if timeout is None:
+        timeout = embeddings_config.EMBEDDING_TIMEOUT
+
+    # Ya dentro del pool: ejecutar directo (esperar un hilo del mismo pool puede bloquearlo)
+    if threading.current_thread().name.startswith("embeddings"):
+        return func(*args, **kwargs)
+
+    future = get_inference_executor().submit(func, *args, **kwargs)
+    return future.result(timeout=timeout or None)
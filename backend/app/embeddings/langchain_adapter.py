@@ -9,7 +9,7 @@ Características:
     * Reutilización: Usa get_embeddings() existente
     * Configuración centralizada: EMBEDDING_MODEL
     * Métodos sync + async: embed_query, aembed_query
-    * Thread-safe: Maneja event loops correctamente
+    * Thread-safe: Ruta síncrona compartida, sin event loops por llamada
 
 Beneficios:
     * Integración con LangChain VectorStore
@@ -26,10 +26,10 @@ Interface LangChain:
         * aembed_query(text: str) -> List[float]
         * aembed_documents(texts: List[str]) -> List[List[float]]
 
-Event loop handling:
-    * Detecta si hay event loop activo
-    * Crea nuevo loop en thread separado si necesario
-    * Evita "RuntimeError: This event loop is already running"
+Ruta síncrona:
+    * embed_query / embed_documents usan get_embeddings_sync (carga con lock)
+    * El encode corre en el pool de inferencia compartido (run_inference_sync)
+    * Sin ThreadPoolExecutor ni event loop nuevos por llamada
     * Compatible con FastAPI async + LangChain sync
 
 Example:
@@ -53,7 +53,7 @@ Example:
     >>> vector = await embeddings.aembed_query("¿Qué dice la ley?")
 
 Note:
-    * Métodos sync usan ThreadPoolExecutor para async
+    * Métodos sync bloquean el hilo que llama: desde corrutinas usar aembed_*
     * Lazy loading del servicio de embeddings
     * Primera llamada carga modelo (~5-10s)
     * Compartido con resto del sistema (misma instancia)
@@ -68,12 +68,12 @@ Authors:
     JusticIA Team
 
 Version:
-    1.0.0 - Adaptador con manejo robusto de event loops
+    1.1.0 - Ruta síncrona compartida (sin event loop por llamada)
 """
 
 from typing import List
 from langchain_core.embeddings import Embeddings
-from app.embeddings.embeddings import get_embeddings
+from app.embeddings.embeddings import get_embeddings, get_embeddings_sync
 
 
 class LangChainEmbeddingsAdapter(Embeddings):
@@ -108,29 +108,7 @@ class LangChainEmbeddingsAdapter(Embeddings):
         
         NOTA: LangChain requiere métodos síncronos para embed_documents
         """
-        import asyncio
-        try:
-            # Intentar obtener el loop actual
-            loop = asyncio.get_running_loop()
-            # Usar asyncio.create_task() para ejecutar en el loop actual
-            import concurrent.futures
-            import threading
-            
-            def run_in_thread():
-                new_loop = asyncio.new_event_loop()
-                asyncio.set_event_loop(new_loop)
-                try:
-                    return new_loop.run_until_complete(self.aembed_documents(texts))
-                finally:
-                    new_loop.close()
-            
-            with concurrent.futures.ThreadPoolExecutor() as executor:
-                future = executor.submit(run_in_thread)
-                return future.result()
-                
-        except RuntimeError:
-            # No hay event loop, usar asyncio.run()
-            return asyncio.run(self.aembed_documents(texts))
+        return get_embeddings_sync().embed_documents(texts)
 
     def embed_query(self, text: str) -> List[float]:
         """
@@ -138,29 +116,7 @@ class LangChainEmbeddingsAdapter(Embeddings):
         
         NOTA: LangChain requiere métodos síncronos para embed_query
         """
-        import asyncio
-        try:
-            # Intentar obtener el loop actual
-            loop = asyncio.get_running_loop()
-            # Usar asyncio.create_task() para ejecutar en el loop actual
-            import concurrent.futures
-            import threading
-            
-            def run_in_thread():
-                new_loop = asyncio.new_event_loop()
-                asyncio.set_event_loop(new_loop)
-                try:
-                    return new_loop.run_until_complete(self.aembed_query(text))
-                finally:
-                    new_loop.close()
-            
-            with concurrent.futures.ThreadPoolExecutor() as executor:
-                future = executor.submit(run_in_thread)
-                return future.result()
-                
-        except RuntimeError:
-            # No hay event loop, usar asyncio.run()
-            return asyncio.run(self.aembed_query(text))
+        return get_embeddings_sync().embed_query(text)
     
     async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
         """Versión async para embeds de documentos."""
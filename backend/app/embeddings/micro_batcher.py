@@ -0,0 +1,232 @@
+"""
+Micro-batching dinámico de embeddings de consultas concurrentes.
+
+Con varios usuarios consultando a la vez, cada pregunta generaba su propio
+encode(texto). En CPU el forward pass de BGE-M3 rinde mucho más en lote: el
+micro-batcher agrupa las solicitudes aembed_query que llegan dentro de una
+ventana corta y las codifica en un único batch (sentence-transformers aplica
+padding por lote).
+
+Flujo:
+    ```
+    aembed_query("¿...?")  aembed_query("¿...?")  aembed_query("¿...?")
+                \\                 |                 /
+                 cola del event loop (espera máx EMBEDDING_MICROBATCH_MAX_WAIT_MS)
+                                   ↓
+          lote de hasta EMBEDDING_MICROBATCH_MAX_SIZE textos (sin duplicados)
+                                   ↓
+          run_inference(encode, textos)  ←  pool de inferencia dedicado
+                                   ↓
+          cada vector vuelve al future de su solicitud
+    ```
+
+    * El lote se despacha al llenarse o al vencer la ventana, lo que ocurra primero
+    * Lotes en curso acotados a max_in_flight (EMBEDDING_MAX_WORKERS): con el
+      límite alcanzado las nuevas solicitudes quedan en la cola, y al terminar
+      un lote se despacha el siguiente con hasta max_batch_size de ellas. Bajo
+      carga los lotes crecen solos; sin carga la latencia extra es como máximo
+      la ventana
+    * Un error del modelo se propaga a todas las solicitudes del lote
+
+Métricas (get_metrics):
+    * queue_depth: Solicitudes esperando lote
+    * in_flight: Solicitudes en lotes que se están codificando
+    * batches / requests / avg_batch_size / max_batch_size
+    * batch_size_histogram: Lotes por rango de tamaño
+    * avg_wait_ms: Espera promedio en cola antes de despachar
+
+Example:
+    >>> batcher = MicroBatcher(wrapper._encode, max_wait_ms=5, max_batch_size=32)
+    >>> vector = await batcher.submit("¿Qué dice la sentencia?")
+    >>> batcher.get_metrics()["avg_batch_size"]
+    6.4
+
+Ver también:
+    * app.embeddings.embeddings.EmbeddingsWrapper: Usa el micro-batcher en aembed_query
+    * app.embeddings.inference_executor: Ejecuta cada lote
+    * app.config.embeddings_config: Ventana y tamaño máximo
+"""
+import asyncio
+import logging
+import threading
+import time
+import weakref
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from app.embeddings.inference_executor import run_inference
+
+logger = logging.getLogger(__name__)
+
+# Límites superiores de los rangos del histograma de tamaños de lote
+_HISTOGRAM_BUCKETS = (1, 2, 4, 8, 16, 32, 64)
+
+
+class _LoopQueue:
+    """Solicitudes pendientes de un event loop (los futures quedan ligados a su loop)."""
+
+    def __init__(self):
+        self.items: List[Tuple[str, asyncio.Future, float]] = []
+        self.timer: Optional[asyncio.TimerHandle] = None
+        self.running = 0  # Lotes de este loop codificándose
+
+
+class MicroBatcher:
+    """
+    Agrupa solicitudes de embedding concurrentes en lotes.
+
+    Attributes:
+        max_wait_ms: Espera máxima de la primera solicitud de un lote
+        max_batch_size: Textos máximos por lote
+        max_in_flight: Lotes codificándose a la vez por event loop
+    """
+
+    def __init__(
+        self,
+        encode_fn: Callable[[List[str]], List[Any]],
+        max_wait_ms: float,
+        max_batch_size: int,
+        max_in_flight: int = 1,
+    ):
+        self._encode_fn = encode_fn
+        self.max_wait_ms = max(0.0, max_wait_ms)
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_in_flight = max(1, max_in_flight)
+
+        self._queues: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, _LoopQueue]" = (
+            weakref.WeakKeyDictionary()
+        )
+
+        # Métricas (varios event loops pueden actualizarlas)
+        self._metrics_lock = threading.Lock()
+        self._in_flight = 0
+        self._batches = 0
+        self._requests = 0
+        self._max_batch = 0
+        self._wait_total = 0.0
+        self._histogram = {bucket: 0 for bucket in _HISTOGRAM_BUCKETS}
+        self._histogram_overflow = 0
+
+    async def submit(self, text: str) -> Any:
+        """
+        Encola un texto y espera su embedding.
+
+        Args:
+            text: Texto de la consulta
+
+        Returns:
+            Embedding del texto (mismo formato que encode_fn)
+        """
+        loop = asyncio.get_running_loop()
+        queue = self._queues.get(loop)
+        if queue is None:
+            queue = _LoopQueue()
+            self._queues[loop] = queue
+
+        future = loop.create_future()
+        queue.items.append((text, future, time.perf_counter()))
+
+        # Con el límite de lotes alcanzado, el fin de un lote despacha la cola
+        if queue.running < self.max_in_flight:
+            if len(queue.items) >= self.max_batch_size:
+                self._dispatch(loop, queue)
+            elif queue.timer is None:
+                queue.timer = loop.call_later(self.max_wait_ms / 1000, self._dispatch, loop, queue)
+
+        return await future
+
+    def _dispatch(self, loop: asyncio.AbstractEventLoop, queue: _LoopQueue) -> None:
+        """Saca un lote de la cola y lanza su codificación (se ejecuta en el event loop)."""
+        if queue.timer is not None:
+            queue.timer.cancel()
+            queue.timer = None
+        if queue.running >= self.max_in_flight:
+            return
+
+        batch = queue.items[:self.max_batch_size]
+        del queue.items[:self.max_batch_size]
+
+        # Solicitudes canceladas mientras esperaban (p. ej. cliente desconectado)
+        batch = [item for item in batch if not item[1].done()]
+        if batch:
+            queue.running += 1
+            task = loop.create_task(self._run_batch(batch))
+            task.add_done_callback(lambda _: self._batch_done(loop, queue))
+
+        # Solicitudes restantes: nueva ventana (o despacho inmediato si hay lote lleno)
+        if queue.running >= self.max_in_flight:
+            return
+        if len(queue.items) >= self.max_batch_size:
+            loop.call_soon(self._dispatch, loop, queue)
+        elif queue.items:
+            queue.timer = loop.call_later(self.max_wait_ms / 1000, self._dispatch, loop, queue)
+
+    def _batch_done(self, loop: asyncio.AbstractEventLoop, queue: _LoopQueue) -> None:
+        """Libera el lugar del lote y despacha lo acumulado mientras corría."""
+        queue.running -= 1
+        if queue.items and not loop.is_closed():
+            # Ya esperaron al lote anterior: no se abre otra ventana
+            self._dispatch(loop, queue)
+
+    async def _run_batch(self, batch: List[Tuple[str, asyncio.Future, float]]) -> None:
+        now = time.perf_counter()
+        # Textos repetidos en el mismo lote se codifican una sola vez
+        unique_texts = list(dict.fromkeys(text for text, _, _ in batch))
+        self._record_batch(len(batch), sum(now - queued_at for _, _, queued_at in batch))
+
+        try:
+            vectors = await run_inference(self._encode_fn, unique_texts)
+        except asyncio.CancelledError:
+            for _, future, _ in batch:
+                future.cancel()
+            raise
+        except Exception as e:
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        finally:
+            with self._metrics_lock:
+                self._in_flight -= len(batch)
+
+        by_text = dict(zip(unique_texts, vectors))
+        for text, future, _ in batch:
+            if not future.done():
+                future.set_result(by_text[text])
+
+    def _record_batch(self, size: int, wait_seconds: float) -> None:
+        with self._metrics_lock:
+            self._in_flight += size
+            self._batches += 1
+            self._requests += size
+            self._max_batch = max(self._max_batch, size)
+            self._wait_total += wait_seconds
+            for bucket in _HISTOGRAM_BUCKETS:
+                if size <= bucket:
+                    self._histogram[bucket] += 1
+                    break
+            else:
+                self._histogram_overflow += 1
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Métricas acumuladas del proceso."""
+        with self._metrics_lock:
+            histogram = {}
+            lower = 1
+            for bucket in _HISTOGRAM_BUCKETS:
+                histogram[str(bucket) if lower == bucket else f"{lower}-{bucket}"] = self._histogram[bucket]
+                lower = bucket + 1
+            histogram[f">{_HISTOGRAM_BUCKETS[-1]}"] = self._histogram_overflow
+
+            return {
+                "max_wait_ms": self.max_wait_ms,
+                "max_batch_size": self.max_batch_size,
+                "max_in_flight": self.max_in_flight,
+                "queue_depth": sum(len(queue.items) for queue in list(self._queues.values())),
+                "in_flight": self._in_flight,
+                "batches": self._batches,
+                "requests": self._requests,
+                "avg_batch_size": round(self._requests / self._batches, 2) if self._batches else 0.0,
+                "max_batch_size_seen": self._max_batch,
+                "avg_wait_ms": round(self._wait_total / self._requests * 1000, 2) if self._requests else 0.0,
+                "batch_size_histogram": histogram,
+            }
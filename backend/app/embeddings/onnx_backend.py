@@ -0,0 +1,137 @@
+"""
+Backend ONNX Runtime para el modelo de embeddings (CPU).
+
+Carga BGE-M3 con SentenceTransformer(backend="onnx"): mismo tokenizer,
+pooling y normalización que el backend PyTorch, con el forward pass en ONNX
+Runtime. Opcionalmente usa una variante con cuantización dinámica int8.
+
+Flujo de carga:
+    ```
+    ¿Existe onnx/model.onnx (o la variante int8) junto al modelo?
+        sí → cargar directamente (arranque en frío rápido, sin PyTorch en el forward)
+        no → exportar desde los pesos PyTorch (una sola vez, minutos)
+             → guardar en {modelo}/onnx/ si el directorio es escribible
+             → int8: export_dynamic_quantized_onnx_model → onnx/model_qint8_{config}.onnx
+    ```
+
+Cuantización int8 (EMBEDDING_ONNX_QUANTIZATION=int8):
+    * Pesos de las capas lineales en int8, activaciones cuantizadas en tiempo de ejecución
+    * Modelo ~4x más chico en disco y memoria, menor latencia en CPU con VNNI/AVX2
+    * Pérdida de calidad medible con python -m app.embeddings.benchmark (paridad coseno)
+    * EMBEDDING_ONNX_QUANT_CONFIG: avx512_vnni | avx512 | avx2 | arm64 según la CPU
+
+Dependencias opcionales:
+    * sentence-transformers>=3.2 con optimum[onnxruntime] (ver requirements.txt)
+    * Si faltan, embeddings.py vuelve al backend PyTorch con un warning
+
+Example:
+    >>> from app.embeddings.onnx_backend import load_onnx_model
+    >>> model = load_onnx_model("/app/models/Dariolopez__bge-m3-es-legal-tmp-6", quantization="int8")
+    >>> model.encode("texto").shape
+    (1024,)
+
+Ver también:
+    * app.embeddings.embeddings.load_model: Selección del backend
+    * app.embeddings.benchmark: Paridad y benchmark contra PyTorch
+    * app.config.embeddings_config: EMBEDDING_BACKEND y parámetros ONNX
+"""
+import logging
+import os
+from pathlib import Path
+from typing import Optional
+
+from app.config.embeddings_config import embeddings_config
+
+logger = logging.getLogger(__name__)
+
+ONNX_FILE = "onnx/model.onnx"
+QUANTIZATIONS = ("none", "int8")
+
+
+def quantized_file_name(quant_config: str) -> str:
+    """Nombre del archivo int8 que genera export_dynamic_quantized_onnx_model."""
+    return f"onnx/model_qint8_{quant_config}.onnx"
+
+
+def _session_options():
+    """Opciones de ONNX Runtime: hilos intra-op iguales a los configurados para PyTorch."""
+    threads = embeddings_config.EMBEDDING_TORCH_THREADS
+    if threads <= 0:
+        return None
+    import onnxruntime
+
+    options = onnxruntime.SessionOptions()
+    options.intra_op_num_threads = threads
+    options.inter_op_num_threads = 1
+    return options
+
+
+def _model_kwargs(file_name: str) -> dict:
+    kwargs = {"file_name": file_name, "provider": embeddings_config.EMBEDDING_ONNX_PROVIDER}
+    options = _session_options()
+    if options is not None:
+        kwargs["session_options"] = options
+    return kwargs
+
+
+def _writable_dir(source: str) -> Optional[Path]:
+    path = Path(source)
+    if path.is_dir() and os.access(path, os.W_OK):
+        return path
+    return None
+
+
+def load_onnx_model(source: str, quantization: Optional[str] = None, quant_config: Optional[str] = None):
+    """
+    Carga el modelo con el backend ONNX Runtime, exportándolo si hace falta.
+
+    Args:
+        source: Ruta local del modelo o id de HuggingFace
+        quantization: none | int8 (None = EMBEDDING_ONNX_QUANTIZATION)
+        quant_config: Configuración de cuantización (None = EMBEDDING_ONNX_QUANT_CONFIG)
+
+    Returns:
+        SentenceTransformer con backend "onnx"
+
+    Raises:
+        ValueError: Si la cuantización no es válida
+        ImportError: Si faltan sentence-transformers>=3.2 u optimum[onnxruntime]
+    """
+    from sentence_transformers import SentenceTransformer
+
+    quantization = (quantization or embeddings_config.EMBEDDING_ONNX_QUANTIZATION).lower()
+    quant_config = quant_config or embeddings_config.EMBEDDING_ONNX_QUANT_CONFIG
+    if quantization not in QUANTIZATIONS:
+        raise ValueError(f"Cuantización ONNX '{quantization}' no soportada. Opciones: {', '.join(QUANTIZATIONS)}")
+
+    local_dir = Path(source) if Path(source).is_dir() else None
+    target_file = quantized_file_name(quant_config) if quantization == "int8" else ONNX_FILE
+
+    # Variante ya exportada: carga directa
+    if local_dir is not None and (local_dir / target_file).exists():
+        logger.info(f"Cargando modelo ONNX: {local_dir / target_file}")
+        return SentenceTransformer(str(local_dir), backend="onnx", model_kwargs=_model_kwargs(target_file))
+
+    # Exportar desde PyTorch (sentence-transformers exporta si no encuentra el archivo)
+    logger.warning(f"Modelo ONNX no encontrado, exportando {source} (puede tardar varios minutos)")
+    model = SentenceTransformer(source, backend="onnx", model_kwargs=_model_kwargs(ONNX_FILE))
+
+    save_dir = _writable_dir(source)
+    if save_dir is not None:
+        model.save_pretrained(str(save_dir))
+        logger.info(f"Modelo ONNX guardado en {save_dir / ONNX_FILE}")
+    else:
+        logger.warning("Directorio del modelo no escribible: la exportación se repetirá en el próximo arranque")
+
+    if quantization == "none":
+        return model
+
+    if save_dir is None:
+        logger.warning("Cuantización int8 requiere un directorio escribible: se usa el modelo ONNX float32")
+        return model
+
+    from sentence_transformers import export_dynamic_quantized_onnx_model
+
+    logger.info(f"Cuantizando modelo ONNX a int8 ({quant_config})")
+    export_dynamic_quantized_onnx_model(model, quant_config, str(save_dir))
+    return SentenceTransformer(str(save_dir), backend="onnx", model_kwargs=_model_kwargs(target_file))
@@ -0,0 +1,260 @@
+"""
+Caché de embeddings de consultas (LRU/TTL en proceso + Redis compartido).
+
+Las consultas se repiten: mismos conceptos jurídicos, seguimientos
+reformulados por el prompt de contextualización y los reintentos de
+SearchStrategyManager, que vectorizaban el mismo texto hasta tres veces.
+Con el caché, una consulta repetida no llega al modelo.
+
+Niveles:
+    ```
+    aembed_query(texto)
+            ↓
+    Clave: sha1(modelo + backend + texto normalizado)
+            ↓
+    1. Memoria del proceso: LRU con TTL, vectores np.float32 (~4 KB c/u)
+            ↓ (miss)
+    2. Redis DB 3 (opcional): bytes float16 (2 KB c/u), compartido entre workers
+            ↓ (miss)
+    3. Modelo (micro-batcher) → se guarda en ambos niveles
+    ```
+
+Normalización de la clave:
+    * Unicode NFC y espacios colapsados (no cambia mayúsculas ni tildes:
+      el modelo distingue esas variantes)
+
+Note:
+    * Un hit en Redis se promueve a memoria con la precisión de float16
+      (error en similitud coseno del orden de 1e-3)
+    * Errores de Redis se registran y se tratan como miss
+    * Redis no tiene límite de claves propio: TTL por clave + maxmemory-policy
+      del servidor (allkeys-lru recomendado en la DB de cachés)
+
+Example:
+    >>> from app.embeddings.query_cache import get_query_cache
+    >>> cache = get_query_cache()
+    >>> vector = await cache.aget("¿Qué es la prescripción?")  # None si no está
+    >>> cache.get_metrics()["hit_rate"]
+    0.42
+
+Ver también:
+    * app.embeddings.embeddings.EmbeddingsWrapper: Consumidor
+    * app.db.redis_client: Cliente Redis compartido
+    * app.config.embeddings_config: Tamaños y TTL
+"""
+import asyncio
+import hashlib
+import logging
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from app.config.config import EMBEDDING_MODEL
+from app.config.embeddings_config import embeddings_config
+
+logger = logging.getLogger(__name__)
+
+_REDIS_PREFIX = "emb:q:"
+
+
+def default_model_id() -> str:
+    """Modelo + backend: ONNX int8 produce vectores distintos a los de PyTorch."""
+    backend = embeddings_config.EMBEDDING_BACKEND
+    if backend == "onnx" and embeddings_config.EMBEDDING_ONNX_QUANTIZATION != "none":
+        backend = f"onnx-{embeddings_config.EMBEDDING_ONNX_QUANTIZATION}"
+    return f"{EMBEDDING_MODEL}:{backend}"
+
+
+def normalize_query(text: str) -> str:
+    """Normaliza el texto de una consulta para la clave del caché."""
+    return " ".join(unicodedata.normalize("NFC", text or "").split())
+
+
+class QueryEmbeddingCache:
+    """
+    Caché de dos niveles de embeddings de consultas.
+
+    Attributes:
+        model_id: Identificador del modelo incluido en la clave
+        max_entries: Entradas máximas en memoria (LRU)
+        ttl_seconds: Vigencia en memoria
+        redis_enabled: Usar el nivel compartido en Redis
+        redis_ttl_seconds: Vigencia en Redis
+    """
+
+    def __init__(
+        self,
+        model_id: Optional[str] = None,
+        max_entries: int = embeddings_config.EMBEDDING_CACHE_MAX_ENTRIES,
+        ttl_seconds: int = embeddings_config.EMBEDDING_CACHE_TTL_SECONDS,
+        redis_enabled: bool = embeddings_config.EMBEDDING_CACHE_REDIS_ENABLED,
+        redis_ttl_seconds: int = embeddings_config.EMBEDDING_CACHE_REDIS_TTL_SECONDS,
+    ):
+        self.model_id = model_id or default_model_id()
+        self.max_entries = max(1, max_entries)
+        self.ttl_seconds = ttl_seconds
+        self.redis_enabled = redis_enabled
+        self.redis_ttl_seconds = redis_ttl_seconds
+
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self._hits_memory = 0
+        self._hits_redis = 0
+        self._misses = 0
+        self._evictions = 0
+        self._redis_errors = 0
+
+    def key(self, text: str) -> str:
+        """Clave del caché para un texto (modelo + texto normalizado)."""
+        raw = f"{self.model_id}\n{normalize_query(text)}"
+        return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+    # ================================
+    # CONSULTA
+    # ================================
+
+    async def aget(self, text: str) -> Optional[List[float]]:
+        """Busca el embedding en memoria y luego en Redis (sin bloquear el event loop)."""
+        key = self.key(text)
+        vector = self._get_memory(key)
+        if vector is not None:
+            return vector.tolist()
+
+        if self.redis_enabled:
+            vector = await asyncio.to_thread(self._get_redis, key)
+            if vector is not None:
+                return vector.tolist()
+
+        self._count("_misses")
+        return None
+
+    def get(self, text: str) -> Optional[List[float]]:
+        """Versión síncrona de aget."""
+        key = self.key(text)
+        vector = self._get_memory(key)
+        if vector is None and self.redis_enabled:
+            vector = self._get_redis(key)
+        if vector is None:
+            self._count("_misses")
+            return None
+        return vector.tolist()
+
+    def _get_memory(self, key: str) -> Optional[np.ndarray]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            vector, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            self._hits_memory += 1
+            return vector
+
+    def _get_redis(self, key: str) -> Optional[np.ndarray]:
+        try:
+            from app.db.redis_client import get_redis_client
+
+            raw = get_redis_client(decode_responses=False).get(_REDIS_PREFIX + key)
+        except Exception as e:
+            self._count("_redis_errors")
+            logger.debug(f"Caché de embeddings: error leyendo Redis: {e}")
+            return None
+        if raw is None:
+            return None
+
+        vector = np.frombuffer(raw, dtype=np.float16).astype(np.float32)
+        self._put_memory(key, vector)
+        self._count("_hits_redis")
+        return vector
+
+    # ================================
+    # ESCRITURA
+    # ================================
+
+    async def aset(self, text: str, vector: List[float]) -> None:
+        """Guarda el embedding en memoria y en Redis."""
+        key = self.key(text)
+        array = np.asarray(vector, dtype=np.float32)
+        self._put_memory(key, array)
+        if self.redis_enabled:
+            await asyncio.to_thread(self._set_redis, key, array)
+
+    def set(self, text: str, vector: List[float]) -> None:
+        """Versión síncrona de aset."""
+        key = self.key(text)
+        array = np.asarray(vector, dtype=np.float32)
+        self._put_memory(key, array)
+        if self.redis_enabled:
+            self._set_redis(key, array)
+
+    def _put_memory(self, key: str, vector: np.ndarray) -> None:
+        with self._lock:
+            self._entries[key] = (vector, time.monotonic() + self.ttl_seconds)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+
+    def _set_redis(self, key: str, vector: np.ndarray) -> None:
+        try:
+            from app.db.redis_client import get_redis_client
+
+            get_redis_client(decode_responses=False).set(
+                _REDIS_PREFIX + key, vector.astype(np.float16).tobytes(), ex=self.redis_ttl_seconds
+            )
+        except Exception as e:
+            self._count("_redis_errors")
+            logger.debug(f"Caché de embeddings: error escribiendo Redis: {e}")
+
+    def clear(self) -> None:
+        """Vacía el nivel en memoria (Redis expira por TTL)."""
+        with self._lock:
+            self._entries.clear()
+
+    # ================================
+    # MÉTRICAS
+    # ================================
+
+    def _count(self, counter: str) -> None:
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Hits por nivel, misses y ocupación del nivel en memoria."""
+        with self._lock:
+            hits = self._hits_memory + self._hits_redis
+            lookups = hits + self._misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "redis_enabled": self.redis_enabled,
+                "hits_memory": self._hits_memory,
+                "hits_redis": self._hits_redis,
+                "misses": self._misses,
+                "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+                "evictions": self._evictions,
+                "redis_errors": self._redis_errors,
+            }
+
+
+_cache: Optional[QueryEmbeddingCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_query_cache() -> Optional[QueryEmbeddingCache]:
+    """Instancia singleton del caché (None si EMBEDDING_CACHE_ENABLED=false)."""
+    global _cache
+    if not embeddings_config.EMBEDDING_CACHE_ENABLED:
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = QueryEmbeddingCache()
+    return _cache
@@ -0,0 +1,113 @@
+"""
+Tokenizer del modelo de embeddings y su longitud máxima de secuencia.
+
+El modelo trunca en silencio todo lo que supera max_seq_length tokens: la
+cola de un chunk más largo no queda representada en su vector. El chunking
+de la ingesta usa este módulo para medir los chunks en tokens del mismo
+tokenizer que usa el modelo.
+
+Longitud máxima (get_max_seq_length), en orden:
+    1. EMBEDDING_MAX_SEQ_LENGTH si es mayor que 0
+    2. max_seq_length del modelo si ya está cargado en el proceso
+    3. sentence_bert_config.json del modelo local
+    4. model_max_length del tokenizer (si es un valor real)
+
+Note:
+    * Solo carga el tokenizer (MB), no los pesos: sirve también en procesos
+      que usan el servicio de embeddings compartido
+    * Si el tokenizer no puede cargarse, get_tokenizer devuelve None y el
+      chunking vuelve a medir en caracteres
+
+Example:
+    >>> from app.embeddings.tokenizer import get_tokenizer, get_max_seq_length, count_tokens
+    >>> get_max_seq_length()
+    8192
+    >>> count_tokens(["Recurso de casación"])
+    [6]
+
+Ver también:
+    * app.vectorstore.chunking: Chunking por tokens de la ingesta
+    * app.embeddings.embeddings: Modelo y ruta local
+"""
+import json
+import logging
+import threading
+from pathlib import Path
+from typing import List, Optional
+
+from app.config.embeddings_config import embeddings_config
+
+logger = logging.getLogger(__name__)
+
+# Tokens especiales que el modelo agrega a cada texto (<s> y </s> en XLM-R/BGE-M3)
+SPECIAL_TOKENS = 2
+
+# model_max_length de tokenizers sin límite configurado (VERY_LARGE_INTEGER de transformers)
+_UNBOUNDED_LENGTH = 1_000_000
+
+_tokenizer = None
+_tokenizer_failed = False
+_tokenizer_lock = threading.Lock()
+
+
+def get_tokenizer():
+    """
+    Tokenizer del modelo de embeddings (singleton, thread-safe).
+
+    Returns:
+        PreTrainedTokenizerFast, o None si no pudo cargarse
+    """
+    global _tokenizer, _tokenizer_failed
+    if _tokenizer is not None or _tokenizer_failed:
+        return _tokenizer
+
+    with _tokenizer_lock:
+        if _tokenizer is None and not _tokenizer_failed:
+            try:
+                from transformers import AutoTokenizer
+                from app.embeddings.embeddings import _model_source
+
+                _tokenizer = AutoTokenizer.from_pretrained(_model_source())
+            except Exception as e:
+                _tokenizer_failed = True
+                logger.warning(f"Tokenizer de embeddings no disponible, chunking por caracteres: {e}")
+    return _tokenizer
+
+
+def get_max_seq_length() -> int:
+    """Tokens máximos por texto que el modelo representa (incluye tokens especiales)."""
+    if embeddings_config.EMBEDDING_MAX_SEQ_LENGTH > 0:
+        return embeddings_config.EMBEDDING_MAX_SEQ_LENGTH
+
+    from app.embeddings import embeddings
+
+    if embeddings._embeddings is not None and getattr(embeddings._embeddings.model, "max_seq_length", None):
+        return int(embeddings._embeddings.model.max_seq_length)
+
+    config_path = Path(embeddings._model_source()) / "sentence_bert_config.json"
+    if config_path.exists():
+        try:
+            return int(json.loads(config_path.read_text(encoding="utf-8"))["max_seq_length"])
+        except (KeyError, ValueError) as e:
+            logger.warning(f"sentence_bert_config.json sin max_seq_length válido: {e}")
+
+    tokenizer = get_tokenizer()
+    if tokenizer is not None and 0 < tokenizer.model_max_length < _UNBOUNDED_LENGTH:
+        return int(tokenizer.model_max_length)
+    return 512
+
+
+def count_tokens(texts: List[str], tokenizer=None) -> Optional[List[int]]:
+    """
+    Tokens de cada texto sin tokens especiales (una sola llamada por lote).
+
+    Returns:
+        Lista de conteos, o None si no hay tokenizer
+    """
+    tokenizer = tokenizer or get_tokenizer()
+    if tokenizer is None:
+        return None
+    encoded = tokenizer(
+        list(texts), add_special_tokens=False, return_attention_mask=False, verbose=False
+    )
+    return [len(ids) for ids in encoded["input_ids"]]
@@ -7,6 +7,7 @@ instancia del LLM y proporciona streaming de respuestas para mejor UX.
 
 Funciones principales:
     - get_llm: Obtiene instancia compartida del LLM (Singleton con lock)
+    - get_rewrite_llm: LLM para reformular preguntas (modelo opcional más rápido)
     - consulta_general_streaming: Streaming de respuestas en formato SSE
 
 Configuración:
@@ -17,6 +18,8 @@ Configuración:
     - LLM_NUM_CTX: Ventana de contexto (tokens)
     - LLM_NUM_PREDICT: Máximo de tokens a generar
     - LLM_REQUEST_TIMEOUT: Timeout en segundos
+    - LLM_REWRITE_MODEL: Modelo para reformular preguntas (vacío = OLLAMA_MODEL)
+    - LLM_REWRITE_NUM_PREDICT: Máximo de tokens de la pregunta reformulada
 
 Example:
     >>> llm = await get_llm()
@@ -47,6 +50,8 @@ from app.config.config import (
     LLM_TOP_K,
     LLM_TOP_P,
     LLM_REPEAT_PENALTY,
+    LLM_REWRITE_MODEL,
+    LLM_REWRITE_NUM_PREDICT,
 )
 from fastapi.responses import StreamingResponse
 
@@ -101,6 +106,43 @@ async def get_llm():
             )
         return _llm
 
+_rewrite_llm = None
+_rewrite_llm_lock = asyncio.Lock()
+
+async def get_rewrite_llm():
+    """
+    Obtiene la instancia compartida del LLM de reformulación de preguntas.
+    
+    La reformulación produce una consulta corta para la búsqueda y bloquea
+    el inicio de la recuperación: usa LLM_REWRITE_MODEL si está configurado
+    (un modelo más pequeño o rápido), temperatura 0 y un máximo de
+    LLM_REWRITE_NUM_PREDICT tokens, sin streaming.
+    
+    Returns:
+        ChatOllama: Instancia configurada para reformulación.
+    """
+    global _rewrite_llm
+    async with _rewrite_llm_lock:
+        if _rewrite_llm is None:
+            client_kwargs = {}
+            if OLLAMA_API_KEY:
+                client_kwargs = {"headers": {"Authorization": f"Bearer {OLLAMA_API_KEY}"}}
+
+            _rewrite_llm = ChatOllama(
+                model=LLM_REWRITE_MODEL or OLLAMA_MODEL,
+                base_url=OLLAMA_BASE_URL,
+                temperature=0.0,
+                keep_alive=LLM_KEEP_ALIVE,
+                request_timeout=LLM_REQUEST_TIMEOUT,
+                reasoning=False,
+                client_kwargs=client_kwargs,
+                model_kwargs={
+                    "num_ctx": LLM_NUM_CTX,
+                    "num_predict": LLM_REWRITE_NUM_PREDICT,
+                },
+            )
+        return _rewrite_llm
+
 async def consulta_general_streaming(prompt_completo: str):
     """Streaming simplificado: obtiene el singleton LLM y re-emite los chunks.
     No logging, no filtrado.
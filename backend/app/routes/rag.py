@@ -431,15 +431,20 @@ async def get_conversations_stats(
 ):
     """
     Obtiene estadísticas generales del sistema de conversaciones.
-    Incluye información de Redis si está disponible.
+    Incluye información de Redis si está disponible y las métricas del
+    caché de resultados de recuperación del proceso.
     Solo para debugging/monitoreo.
     """
     try:
         stats = conversation_store.get_stats()
         
+        from app.services.RAG.retrieval_cache import get_retrieval_cache
+        retrieval_cache = get_retrieval_cache()
+        
         return {
             "success": True,
-            "stats": stats
+            "stats": stats,
+            "retrieval_cache": retrieval_cache.get_metrics() if retrieval_cache else None
         }
     
     except Exception as e:
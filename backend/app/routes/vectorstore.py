@@ -0,0 +1,120 @@
+"""
+Endpoints de administración del vectorstore (Milvus).
+
+Endpoints:
+    GET /vectorstore/index: Perfil del índice vectorial activo y perfiles disponibles
+    POST /vectorstore/index/rebuild: Inicia la reconstrucción del índice con otro perfil (202)
+    GET /vectorstore/index/rebuild: Estado de la última reconstrucción
+    GET /vectorstore/embeddings/metrics: Métricas del motor de embeddings (micro-batching, caché)
+    GET /vectorstore/revectorizacion/{coleccion}: Progreso de una re-vectorización con otro modelo
+
+Perfiles de índice (app.vectorstore.index_profiles):
+    * hnsw: Mejor latencia/recall, mayor uso de memoria
+    * ivf_flat / ivf_sq8 / ivf_pq: Menor uso de memoria (cuantizados con re-ranking exacto)
+    * diskann: Corpus muy grandes (índice en disco)
+
+Note:
+    - Solo administradores
+    - La reconstrucción libera la colección: las búsquedas fallan mientras dura
+    - Corre en segundo plano (límite VECTOR_INDEX_REBUILD_TIMEOUT); el estado
+      se comparte por Redis y los demás procesos releen el índice cada
+      VECTOR_INDEX_REFRESH_SECONDS
+    - Una sola reconstrucción a la vez (409 si hay otra en curso); sin Redis
+      no se inicia (503)
+"""
+
+from fastapi import APIRouter, HTTPException, status, Depends
+from redis.exceptions import RedisError
+from app.schemas.vectorstore_schemas import (
+    RebuildIndexRequest,
+    RebuildIndexResponse,
+    IndexInfoResponse,
+)
+from app.vectorstore.vectorstore import (
+    get_index_info,
+    get_vector_index_rebuild_status,
+    start_vector_index_rebuild,
+)
+from app.embeddings.embeddings import get_embeddings_metrics
+from app.vectorstore.revectorizacion import obtener_progreso
+from app.auth.jwt_auth import require_administrador
+import asyncio
+import logging
+
+router = APIRouter()
+logger = logging.getLogger(__name__)
+
+
+@router.get("/index", response_model=IndexInfoResponse)
+async def obtener_indice(
+    current_user: dict = Depends(require_administrador)
+):
+    """Perfil del índice vectorial activo - Solo administradores"""
+    return await get_index_info()
+
+
+@router.post("/index/rebuild", response_model=RebuildIndexResponse, status_code=status.HTTP_202_ACCEPTED)
+async def reconstruir_indice(
+    data: RebuildIndexRequest,
+    current_user: dict = Depends(require_administrador)
+):
+    """Inicia la reconstrucción del índice vectorial con el perfil indicado - Solo administradores"""
+    try:
+        logger.warning(
+            f"Usuario {current_user['user_id']} solicitó reconstruir el índice vectorial "
+            f"(perfil={data.perfil or 'configurado'})"
+        )
+        return await start_vector_index_rebuild(data.perfil)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except RuntimeError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+    except RedisError as e:
+        logger.error(f"Reconstrucción del índice no iniciada, Redis no disponible: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="No se pudo registrar el estado de la reconstrucción (Redis no disponible); no se inició"
+        )
+    except Exception as e:
+        logger.error(f"Error reconstruyendo índice vectorial: {e}", exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Error reconstruyendo el índice vectorial"
+        )
+
+
+@router.get("/index/rebuild", response_model=RebuildIndexResponse)
+async def estado_reconstruccion_indice(
+    current_user: dict = Depends(require_administrador)
+):
+    """Estado de la última reconstrucción del índice vectorial - Solo administradores"""
+    estado = await get_vector_index_rebuild_status()
+    if not estado:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Sin reconstrucción del índice registrada"
+        )
+    return estado
+
+
+@router.get("/embeddings/metrics")
+async def metricas_embeddings(
+    current_user: dict = Depends(require_administrador)
+):
+    """Cola, tamaños de lote y hit rate del caché de embeddings (proceso actual o cliente del servicio compartido) - Solo administradores"""
+    return get_embeddings_metrics()
+
+
+@router.get("/revectorizacion/{coleccion}")
+async def progreso_revectorizacion(
+    coleccion: str,
+    current_user: dict = Depends(require_administrador)
+):
+    """Progreso de la re-vectorización hacia una colección sombra - Solo administradores"""
+    progreso = await asyncio.to_thread(obtener_progreso, coleccion)
+    if not progreso:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Sin re-vectorización registrada para '{coleccion}'"
+        )
+    return progreso
@@ -0,0 +1,30 @@
+from pydantic import BaseModel, Field
+from typing import List, Dict, Any, Optional
+
+
+class RebuildIndexRequest(BaseModel):
+    """Esquema para reconstruir el índice vectorial"""
+    perfil: Optional[str] = Field(None, description="Perfil de índice: hnsw, ivf_flat, ivf_sq8, ivf_pq o diskann (None = VECTOR_INDEX_PROFILE)")
+
+
+class RebuildIndexResponse(BaseModel):
+    """Estado de la reconstrucción del índice vectorial (corre en segundo plano)"""
+    estado: str = Field(..., description="en_curso, completado o error")
+    collection_name: str
+    profile: str
+    index_type: str
+    build_params: Dict[str, Any]
+    inicio_ms: int
+    fin_ms: Optional[int] = None
+    duration_seconds: Optional[float] = None
+    error: Optional[str] = None
+
+
+class IndexInfoResponse(BaseModel):
+    """Perfil del índice vectorial activo y perfiles disponibles"""
+    collection_name: str
+    active_profile: Optional[Dict[str, Any]] = None
+    configured_profile: str
+    vector_dtype: str = "float32"
+    available_profiles: List[str]
+    request_levels: Dict[str, str]
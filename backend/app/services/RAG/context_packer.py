@@ -0,0 +1,291 @@
+"""
+Empaquetado del contexto del prompt según el presupuesto de tokens del LLM.
+
+TOP_K_GENERAL y TOP_K_EXPEDIENTE se ajustaron a mano suponiendo chunks de
+~1,750 tokens, y FormattedRetriever enviaba todos los chunks completos: con
+chunks largos o historial extenso el prompt superaba LLM_NUM_CTX ("reduce
+tokens"), y con chunks cortos el top_k fijo dejaba contexto sin usar.
+
+Presupuesto:
+    ```
+    LLM_NUM_CTX
+      - LLM_NUM_PREDICT (reserva para la respuesta)
+      - prompt del sistema (contado una vez al construir la chain)
+      - historial + pregunta (contados en cada consulta)
+      - CONTEXT_SAFETY_MARGIN_TOKENS
+      = tokens disponibles para los documentos
+    ```
+
+Historial (trim_history):
+    * Si el presupuesto no alcanza para un chunk truncado (LLM_NUM_CTX chico
+      o conversación larga), se descartan los turnos más antiguos del
+      historial antes que el contexto
+
+Empaquetado (pack_documents):
+    1. Ordena los chunks por similarity_score descendente
+    2. Incluye chunks completos mientras quepan (con el header de su expediente)
+    3. El primero que no cabe se trunca en un fin de oración (_truncate_smart)
+       si quedan al menos CONTEXT_MIN_TRUNCATED_TOKENS; el resto se descarta.
+       El chunk más relevante se incluye siempre (truncado a ese mínimo si
+       aun sin historial no hay lugar)
+    4. Reconstruye la agrupación por expediente de FormattedRetriever con los
+       headers recalculados (cantidad de documentos incluidos)
+
+Conteo de tokens:
+    * tiktoken con CONTEXT_TOKENIZER_ENCODING (o200k_harmony para gpt-oss),
+      cargado la primera vez que se usa
+    * Sin tiktoken o sin la codificación: 1 token cada 4 caracteres
+
+Example:
+    >>> from app.services.rag.context_packer import create_context_packer
+    >>> qa_chain = create_context_packer(ANSWER_PROMPT) | create_stuff_documents_chain(llm, ANSWER_PROMPT)
+    >>> # inputs["context"] e inputs["chat_history"] llegan al prompt recortados al presupuesto
+
+Ver también:
+    * app.services.rag.formatted_retriever: Formato y agrupación de entrada
+    * app.services.rag.chunk_context_builder: _truncate_smart
+    * app.config.rag_config: CONTEXT_PACKING y parámetros del presupuesto
+    * app.config.config: LLM_NUM_CTX, LLM_NUM_PREDICT
+"""
+import logging
+import math
+import threading
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from langchain_core.documents import Document
+from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.runnables import Runnable, RunnableLambda
+
+from app.config.config import LLM_NUM_CTX, LLM_NUM_PREDICT
+from app.config.rag_config import rag_config
+from app.constants.metadata_fields import MetadataFields as MF
+
+from .chunk_context_builder import _truncate_smart
+from .document_formatter import create_expediente_header
+
+logger = logging.getLogger(__name__)
+
+# Caracteres por token cuando no hay tokenizer
+_CHARS_PER_TOKEN = 4
+
+# Separador entre documentos de create_stuff_documents_chain ("\n\n")
+_DOCUMENT_SEPARATOR_TOKENS = 2
+
+_encoding = None
+_encoding_failed = False
+_encoding_lock = threading.Lock()
+
+
+def _get_encoding():
+    """Codificación de tiktoken del LLM (None si no está disponible)."""
+    global _encoding, _encoding_failed
+    if _encoding is not None or _encoding_failed:
+        return _encoding
+
+    with _encoding_lock:
+        if _encoding is None and not _encoding_failed:
+            try:
+                import tiktoken
+
+                _encoding = tiktoken.get_encoding(rag_config.CONTEXT_TOKENIZER_ENCODING)
+            except Exception as e:
+                _encoding_failed = True
+                logger.warning(f"Tokenizer del LLM no disponible, se estiman tokens por caracteres: {e}")
+    return _encoding
+
+
+def count_llm_tokens(text: str) -> int:
+    """Tokens del texto para el LLM (estimación por caracteres sin tiktoken)."""
+    if not text:
+        return 0
+    encoding = _get_encoding()
+    if encoding is None:
+        return math.ceil(len(text) / _CHARS_PER_TOKEN)
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def _message_text(message: Any) -> str:
+    content = getattr(message, "content", message)
+    if isinstance(content, str):
+        return content
+    if isinstance(content, list):
+        return " ".join(part if isinstance(part, str) else str(part.get("text", "")) for part in content)
+    return str(content)
+
+
+def prompt_fixed_tokens(prompt: ChatPromptTemplate) -> int:
+    """Tokens de las plantillas del prompt (sin contexto, historial ni pregunta)."""
+    total = 0
+    for message in prompt.messages:
+        template = getattr(getattr(message, "prompt", None), "template", None)
+        if isinstance(template, str):
+            total += count_llm_tokens(template.replace("{context}", ""))
+    return total
+
+
+def context_budget(inputs: Dict[str, Any], fixed_tokens: int) -> int:
+    """
+    Tokens disponibles para los documentos en esta consulta.
+
+    Args:
+        inputs: Input de la chain ("input" y "chat_history")
+        fixed_tokens: Tokens del prompt sin variables (prompt_fixed_tokens)
+
+    Returns:
+        Presupuesto en tokens (puede ser <= 0 con historiales muy largos)
+    """
+    history = inputs.get("chat_history") or []
+    used = fixed_tokens + count_llm_tokens(inputs.get("input", ""))
+    used += sum(count_llm_tokens(_message_text(message)) for message in history)
+    return LLM_NUM_CTX - LLM_NUM_PREDICT - rag_config.CONTEXT_SAFETY_MARGIN_TOKENS - used
+
+
+def _header_tokens() -> int:
+    """Tokens del header de un expediente en el contexto (con su separador)."""
+    return count_llm_tokens(create_expediente_header("00-000000-0000-XX", 10)) + _DOCUMENT_SEPARATOR_TOKENS
+
+
+def trim_history(inputs: Dict[str, Any], fixed_tokens: int) -> Tuple[List[Any], int]:
+    """
+    Descarta los turnos más antiguos del historial hasta dejar lugar para un chunk.
+
+    Args:
+        inputs: Input de la chain ("input" y "chat_history")
+        fixed_tokens: Tokens del prompt sin variables (prompt_fixed_tokens)
+
+    Returns:
+        (historial recortado, presupuesto para los documentos)
+    """
+    history = list(inputs.get("chat_history") or [])
+    budget = context_budget(inputs, fixed_tokens)
+    required = rag_config.CONTEXT_MIN_TRUNCATED_TOKENS + _header_tokens() + _DOCUMENT_SEPARATOR_TOKENS
+
+    dropped = 0
+    while budget < required and history:
+        # Turno completo: mensaje del usuario y la respuesta que le sigue
+        removed = [history.pop(0)]
+        if history and getattr(history[0], "type", None) == "ai":
+            removed.append(history.pop(0))
+        budget += sum(count_llm_tokens(_message_text(message)) for message in removed)
+        dropped += len(removed)
+
+    if dropped:
+        logger.warning(
+            f"Historial recortado para dejar lugar al contexto: {dropped} mensajes descartados, "
+            f"{len(history)} conservados, presupuesto {budget} tokens"
+        )
+    return history, budget
+
+
+def _truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """Trunca en un fin de oración para no superar max_tokens."""
+    # Cierre del bloque de FormattedRetriever
+    closing = "\n---\n" if text.endswith("---\n") else ""
+    max_tokens -= count_llm_tokens(closing)
+    tokens = count_llm_tokens(text)
+    max_chars = int(max_tokens * len(text) / max(tokens, 1))
+    truncated = text
+    for _ in range(3):
+        truncated = _truncate_smart(text, max_chars)
+        if count_llm_tokens(truncated) <= max_tokens:
+            break
+        max_chars = int(max_chars * 0.9)
+    return truncated + closing
+
+
+def pack_documents(docs: Sequence[Document], budget: int) -> List[Document]:
+    """
+    Selecciona y recorta los documentos que caben en el presupuesto.
+
+    Args:
+        docs: Salida de FormattedRetriever (headers + chunks formateados)
+        budget: Tokens disponibles (context_budget)
+
+    Returns:
+        Documentos agrupados por expediente con headers recalculados
+    """
+    chunks = [(position, doc) for position, doc in enumerate(docs) if not doc.metadata.get("is_header")]
+    ranked = sorted(chunks, key=lambda item: item[1].metadata.get(MF.SIMILARITY_SCORE) or 0.0, reverse=True)
+    header_tokens = _header_tokens()
+
+    if budget < rag_config.CONTEXT_MIN_TRUNCATED_TOKENS:
+        logger.warning(
+            f"Presupuesto de contexto agotado por la pregunta: {budget} tokens "
+            f"(se incluye solo el chunk más relevante, truncado)"
+        )
+
+    remaining = budget
+    selected: Dict[int, Document] = {}
+    expedientes = set()
+    truncated = 0
+    for position, doc in ranked:
+        expediente = doc.metadata.get(MF.EXPEDIENTE_NUMERO, "N/A")
+        header_cost = 0 if expediente in expedientes else header_tokens
+        cost = count_llm_tokens(doc.page_content) + _DOCUMENT_SEPARATOR_TOKENS + header_cost
+        if cost <= remaining:
+            selected[position] = doc
+            expedientes.add(expediente)
+            remaining -= cost
+            continue
+
+        available = remaining - header_cost - _DOCUMENT_SEPARATOR_TOKENS
+        if not selected:
+            # Sin ningún documento el LLM respondería sin contexto
+            available = max(available, rag_config.CONTEXT_MIN_TRUNCATED_TOKENS)
+        if available >= rag_config.CONTEXT_MIN_TRUNCATED_TOKENS:
+            selected[position] = Document(
+                page_content=_truncate_to_tokens(doc.page_content, available),
+                metadata={**doc.metadata, "truncated": True},
+            )
+            expedientes.add(expediente)
+            remaining -= available + header_cost + _DOCUMENT_SEPARATOR_TOKENS
+            truncated += 1
+        break
+
+    # Misma agrupación y orden que FormattedRetriever
+    grouped: Dict[str, List[Document]] = {}
+    for position in sorted(selected):
+        doc = selected[position]
+        grouped.setdefault(doc.metadata.get(MF.EXPEDIENTE_NUMERO, "N/A"), []).append(doc)
+
+    packed: List[Document] = []
+    for expediente, exp_docs in grouped.items():
+        packed.append(Document(
+            page_content=create_expediente_header(expediente, len(exp_docs)),
+            metadata={MF.EXPEDIENTE_NUMERO: expediente, "is_header": True},
+        ))
+        packed.extend(exp_docs)
+
+    logger.info(
+        f"Contexto empaquetado: {len(selected)}/{len(chunks)} chunks "
+        f"({truncated} truncados), {budget - remaining} de {budget} tokens"
+    )
+    return packed
+
+
+def create_context_packer(prompt: ChatPromptTemplate, fixed_tokens: Optional[int] = None) -> Runnable:
+    """
+    Runnable que reemplaza inputs["context"] por los documentos empaquetados.
+
+    Se antepone a create_stuff_documents_chain. inputs["chat_history"] se
+    reemplaza por el historial recortado (trim_history); el resto del input
+    pasa igual.
+
+    Args:
+        prompt: Prompt de respuesta (para contar sus tokens fijos una sola vez)
+        fixed_tokens: Tokens fijos ya calculados (None = contar el prompt)
+
+    Returns:
+        Runnable dict → dict
+    """
+    if fixed_tokens is None:
+        fixed_tokens = prompt_fixed_tokens(prompt)
+
+    def _pack(inputs: Dict[str, Any]) -> Dict[str, Any]:
+        history, budget = trim_history(inputs, fixed_tokens)
+        packed = {**inputs, "context": pack_documents(inputs.get("context") or [], budget)}
+        if "chat_history" in inputs:
+            packed["chat_history"] = history
+        return packed
+
+    return RunnableLambda(_pack, name="pack_context")
@@ -8,7 +8,7 @@ A diferencia de consultas generales, estas chains:
 - Usan prompts especializados para análisis profundo
 
 Características:
-    * Prompt personalizado por expediente (con número en system prompt)
+    * Prompt constante con el número de expediente como variable del input
     * Sin contextualización (pregunta directa)
     * Recuperación completa del expediente (no búsqueda semántica)
     * Metadata visible con FormattedRetriever
@@ -23,6 +23,7 @@ Flujo de ejecución:
     2. NO reformulación (pregunta directa)
     3. Recuperación completa de documentos del expediente
     4. Formateo con metadata (FormattedRetriever)
+    4.5 Ajuste al presupuesto de tokens del LLM (context_packer)
     5. Generación con LLM usando prompt especializado
     6. Streaming al frontend
 
@@ -33,22 +34,20 @@ Prompt especializado:
     * Previene invención de información
 
 Example:
-    >>> from app.services.rag.expediente_chains import create_expediente_specific_chain
+    >>> from app.services.rag.expediente_chains import get_expediente_chain
     >>> 
-    >>> # Crear chain para expediente específico
-    >>> chain = await create_expediente_specific_chain(
-    ...     retriever=retriever,  # Ya filtrado por expediente
-    ...     expediente_numero="24-000123-0001-PE",
-    ...     with_history=True
-    ... )
+    >>> # Chain cacheada (una para todos los expedientes)
+    >>> chain = await get_expediente_chain(with_history=True)
     >>> 
-    >>> # Usar con stream_chain_response de general_chains
+    >>> # El expediente se pasa por consulta
+    >>> input_dict = {"input": pregunta, "expediente_numero": "24-000123-0001-PE"}
+    >>> config = {"configurable": {"session_id": session_id, "expediente_filter": "24-000123-0001-PE"}}
     >>> async for chunk in stream_chain_response(chain, input_dict, config):
     ...     print(chunk)
 
 Note:
-    * El retriever YA debe estar filtrado por expediente
-    * El número de expediente se usa SOLO en el prompt
+    * El filtro por expediente llega al retriever en config["configurable"]
+    * La chain se construye una sola vez por proceso (get_expediente_chain)
     * Usa mismo streaming que general_chains (stream_chain_response)
     * FormattedRetriever añade headers de expediente
 
@@ -65,6 +64,7 @@ Version:
     2.0.0 - Chains especializadas para expedientes
 """
 from typing import Dict, Any
+import asyncio
 from langchain.chains import create_retrieval_chain
 from langchain.chains.combine_documents import create_stuff_documents_chain
 from langchain_core.runnables.history import RunnableWithMessageHistory
@@ -72,30 +72,39 @@ import logging
 
 from app.llm.llm_service import get_llm
 from .session_store import get_session_history_func
-from .prompts import get_expediente_prompt, DOCUMENT_PROMPT
+from .prompts import EXPEDIENTE_PROMPT, DOCUMENT_PROMPT
 from .formatted_retriever import FormattedRetriever
+from .retriever import get_configurable_retriever
+from .context_packer import create_context_packer
+from app.config.rag_config import rag_config
 
 logger = logging.getLogger(__name__)
 
 
 async def create_expediente_specific_chain(
     retriever,
-    expediente_numero: str,
     with_history: bool = True
 ):
-    """Crea una chain especializada para análisis de expediente específico."""
+    """
+    Crea una chain especializada para análisis de expediente específico.
+
+    El número de expediente no forma parte de la chain: se pasa en el input
+    ("expediente_numero") para el prompt y en config["configurable"]
+    ("expediente_filter") para el retriever configurable.
+    """
     llm = await get_llm()
     
     # Envolver el retriever con FormattedRetriever para agregar metadata visible (igual que consulta general)
     formatted_retriever = FormattedRetriever(retriever)
     
-    EXPEDIENTE_PROMPT = get_expediente_prompt(expediente_numero)
-    
     question_answer_chain = create_stuff_documents_chain(
         llm=llm,
         prompt=EXPEDIENTE_PROMPT,
         document_prompt=DOCUMENT_PROMPT
     )
+    if rag_config.CONTEXT_PACKING:
+        # Ajusta los documentos al presupuesto de tokens antes del prompt
+        question_answer_chain = create_context_packer(EXPEDIENTE_PROMPT) | question_answer_chain
     
     rag_chain = create_retrieval_chain(
         formatted_retriever,
@@ -111,8 +120,31 @@ async def create_expediente_specific_chain(
             output_messages_key="answer",
         )
         
-        logger.info(f" Chain expediente {expediente_numero} con historial creado")
         return conversational_rag_chain
     
-    logger.info(f" Chain expediente {expediente_numero} creado")
-    return rag_chain
\ No newline at end of file
+    return rag_chain
+
+
+_chains: Dict[bool, Any] = {}
+_chains_lock = asyncio.Lock()
+
+
+async def get_expediente_chain(with_history: bool = True):
+    """
+    Chain de expediente construida una sola vez por proceso.
+
+    Args:
+        with_history: Envolver la chain con RunnableWithMessageHistory
+
+    Returns:
+        Chain cacheada (la misma instancia para todos los expedientes)
+    """
+    chain = _chains.get(with_history)
+    if chain is None:
+        async with _chains_lock:
+            chain = _chains.get(with_history)
+            if chain is None:
+                chain = await create_expediente_specific_chain(get_configurable_retriever(), with_history=with_history)
+                _chains[with_history] = chain
+                logger.info(f"Chain de expediente compilada (historial={with_history})")
+    return chain
@@ -8,7 +8,8 @@ Implementa el pipeline completo de RAG conversacional:
 4. Streaming de respuesta token por token
 
 Componentes de la chain:
-    * History-aware retriever: Reformula pregunta con contexto
+    * Question rewriter: Reformula con el LLM solo si la pregunta depende del historial
+      (con SPECULATIVE_RETRIEVAL la búsqueda con la pregunta original corre en paralelo)
     * Stuff documents chain: Combina documentos en contexto único
     * Retrieval chain: Pipeline completo de recuperación + generación
     * RunnableWithMessageHistory: Añade gestión de historial
@@ -26,26 +27,24 @@ Streaming:
 
 Flujo de ejecución:
     1. Usuario envía pregunta + session_id
-    2. Reformulación con historial (contextualize)
+    2. Reformulación con historial (solo si hace falta, question_rewriter)
     3. Búsqueda vectorial en Milvus (retriever)
     4. Formateo de documentos (FormattedRetriever)
+    4.5 Ajuste al presupuesto de tokens del LLM (context_packer)
     5. Generación con LLM (streaming)
     6. SSE al frontend chunk por chunk
 
 Example:
-    >>> from app.services.rag.general_chains import create_conversational_rag_chain, stream_chain_response
+    >>> from app.services.rag.general_chains import get_conversational_rag_chain, stream_chain_response
     >>> 
-    >>> # Crear chain conversacional
-    >>> chain = await create_conversational_rag_chain(
-    ...     retriever=retriever,
-    ...     with_history=True
-    ... )
+    >>> # Chain conversacional (construida una vez, cacheada)
+    >>> chain = await get_conversational_rag_chain(with_history=True)
     >>> 
-    >>> # Streaming de respuesta
+    >>> # Streaming de respuesta (parámetros de búsqueda por consulta)
     >>> async for chunk in stream_chain_response(
     ...     chain=chain,
     ...     input_dict={"input": "¿Qué es la prescripción?"},
-    ...     config={"configurable": {"session_id": session_id}}
+    ...     config={"configurable": {"session_id": session_id, "top_k": 15, "similarity_threshold": 0.3}}
     ... ):
     ...     print(chunk, end="", flush=True)
 
@@ -54,6 +53,8 @@ Note:
     * FormattedRetriever añade metadata visible en documentos
     * Detección de desconexión evita generación innecesaria
     * Fallback automático si LLM retorna respuesta vacía
+    * get_conversational_rag_chain construye la chain una vez por proceso;
+      create_conversational_rag_chain sigue disponible para retrievers propios
 
 Ver también:
     * app.services.rag.prompts: Definición de prompts
@@ -68,18 +69,23 @@ Version:
     2.0.0 - LangChain con streaming SSE
 """
 from typing import Dict, Any
+import asyncio
 from langchain_core.output_parsers import StrOutputParser
 from langchain_core.runnables import RunnablePassthrough
 from langchain_core.documents import Document
-from langchain.chains import create_history_aware_retriever, create_retrieval_chain
+from langchain.chains import create_retrieval_chain
 from langchain.chains.combine_documents import create_stuff_documents_chain
 from langchain_core.runnables.history import RunnableWithMessageHistory
 import logging
 import json
 
-from app.llm.llm_service import get_llm
+from app.llm.llm_service import get_llm, get_rewrite_llm
 from .session_store import get_session_history_func
 from .formatted_retriever import FormattedRetriever
+from .retriever import get_configurable_retriever
+from .question_rewriter import create_question_rewriter, create_speculative_retriever
+from .context_packer import create_context_packer
+from app.config.rag_config import rag_config
 from .prompts import (
     CONTEXTUALIZE_Q_PROMPT,
     ANSWER_PROMPT,
@@ -100,37 +106,29 @@ async def create_conversational_rag_chain(
     # Envolver el retriever con FormattedRetriever para agregar metadata visible
     formatted_retriever = FormattedRetriever(retriever)
     
-    history_aware_retriever = create_history_aware_retriever(
-        llm=llm,
-        retriever=formatted_retriever,
-        prompt=CONTEXTUALIZE_Q_PROMPT,
-    )
+    # Reformula con el LLM solo si la pregunta depende del historial
+    rewrite_llm = await get_rewrite_llm()
+    if rag_config.SPECULATIVE_RETRIEVAL:
+        # Busca con la pregunta original mientras el LLM reformula
+        history_aware_retriever = create_speculative_retriever(rewrite_llm, CONTEXTUALIZE_Q_PROMPT, formatted_retriever)
+    else:
+        question_rewriter = create_question_rewriter(rewrite_llm, CONTEXTUALIZE_Q_PROMPT)
+        history_aware_retriever = question_rewriter | formatted_retriever
     
     question_answer_chain = create_stuff_documents_chain(
         llm=llm,
         prompt=ANSWER_PROMPT,
         document_prompt=DOCUMENT_PROMPT
     )
+    if rag_config.CONTEXT_PACKING:
+        # Ajusta los documentos al presupuesto de tokens antes del prompt
+        question_answer_chain = create_context_packer(ANSWER_PROMPT) | question_answer_chain
     
     rag_chain = create_retrieval_chain(
         history_aware_retriever,
         question_answer_chain,
     )
     
-    # Debug: interceptar el chain para ver el contexto enviado
-    async def debug_context_wrapper(input_dict):
-        """Wrapper para logging del contexto antes de enviarlo al LLM."""
-        if "context" in input_dict:
-            context = input_dict["context"]
-            if isinstance(context, list):
-                total_chars = sum(len(doc.page_content) for doc in context)
-                logger.info(f"Contexto enviado al LLM: {len(context)} docs, {total_chars} chars (~{total_chars // 4} tokens)")
-                # Log de los primeros 200 chars del primer doc para debugging
-                if context:
-                    logger.debug(f"Primer doc (preview): {context[0].page_content[:200]}...")
-        return input_dict
-    
-    
     if with_history:
         conversational_rag_chain = RunnableWithMessageHistory(
             rag_chain,
@@ -145,6 +143,34 @@ async def create_conversational_rag_chain(
     return rag_chain
 
 
+_chains: Dict[bool, Any] = {}
+_chains_lock = asyncio.Lock()
+
+
+async def get_conversational_rag_chain(with_history: bool = True):
+    """
+    Chain conversacional general construida una sola vez por proceso.
+
+    Usa el retriever configurable: top_k y similarity_threshold se pasan
+    en config["configurable"] de cada consulta, junto con session_id.
+
+    Args:
+        with_history: Envolver la chain con RunnableWithMessageHistory
+
+    Returns:
+        Chain cacheada (la misma instancia en todas las consultas)
+    """
+    chain = _chains.get(with_history)
+    if chain is None:
+        async with _chains_lock:
+            chain = _chains.get(with_history)
+            if chain is None:
+                chain = await create_conversational_rag_chain(get_configurable_retriever(), with_history=with_history)
+                _chains[with_history] = chain
+                logger.info(f"Chain general compilada (historial={with_history})")
+    return chain
+
+
 async def stream_chain_response(chain, input_dict: Dict[str, Any], config: Dict[str, Any], http_request=None):
     total_chars = 0
     client_disconnected = False
@@ -39,12 +39,9 @@ Cambios de contexto:
 Example:
     >>> from app.services.rag.prompts.contextualize_prompt import CONTEXTUALIZE_Q_PROMPT
     >>> 
-    >>> # Usar en history-aware retriever
-    >>> retriever = create_history_aware_retriever(
-    ...     llm=llm,
-    ...     retriever=base_retriever,
-    ...     prompt=CONTEXTUALIZE_Q_PROMPT
-    ... )
+    >>> # Usar en la etapa de reformulación
+    >>> rewriter = create_question_rewriter(await get_rewrite_llm(), CONTEXTUALIZE_Q_PROMPT)
+    >>> retriever = rewriter | base_retriever
 
 Note:
     * SIEMPRE expande con 3-5 sinónimos/términos relacionados
@@ -54,6 +51,7 @@ Note:
 
 Ver también:
     * app.services.rag.prompts.answer_prompt: Generación de respuestas
+    * app.services.rag.question_rewriter: Decide cuándo reformular
     * app.services.rag.general_chains: Usa CONTEXTUALIZE_Q_PROMPT
 
 Authors:
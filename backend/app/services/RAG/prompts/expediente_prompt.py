@@ -1,11 +1,13 @@
 """
 Prompt especializado para análisis de expedientes específicos.
 
-Crea prompts personalizados con el número de expediente específico embebido
-en el system prompt. Instruye al LLM a analizar SOLO ese expediente.
+Plantilla constante con el número de expediente como variable
+({expediente_numero}): la chain se construye una sola vez y el número se
+pasa en el input de cada consulta. Instruye al LLM a analizar SOLO ese
+expediente.
 
 Características:
-    * Número de expediente en system prompt dinámico
+    * Número de expediente como variable del system prompt
     * Restricciones similares a answer_prompt (idioma, contenido)
     * Énfasis en que documentos se recuperaron automáticamente
     * Prevención de confusión con otros expedientes del historial
@@ -30,41 +32,40 @@ Estructura del expediente:
     * Documentos de soporte
 
 Instrucciones de análisis:
-    * Exhaustividad: Revisar TODOS los documentos
+    * Exhaustividad: Revisar TODOS los fragmentos recuperados
     * Cronología: Usar orden temporal para contexto
     * Precisión: SIEMPRE citar archivos específicos
     * Síntesis: Para preguntas amplias, sintetizar citando fuentes
     * Especificidad: Para preguntas puntuales, citar textualmente
 
 Manejo de plantillas:
-    * Sistema YA recuperó todos los documentos del expediente
+    * Sistema YA recuperó los fragmentos más relevantes del expediente
     * Usar info de documentos recuperados para completar plantilla
     * Mantener formato original de la plantilla
     * Marcar campos faltantes: **[PENDIENTE: especificar]**
 
 Example:
-    >>> from app.services.rag.prompts.expediente_prompt import get_expediente_prompt
+    >>> from app.services.rag.prompts.expediente_prompt import EXPEDIENTE_PROMPT
     >>> 
-    >>> # Crear prompt para expediente específico
-    >>> prompt = get_expediente_prompt("24-000123-0001-PE")
-    >>> 
-    >>> # Usar en chain
-    >>> chain = prompt | llm
+    >>> # Usar en chain (el número de expediente va en el input)
+    >>> chain = EXPEDIENTE_PROMPT | llm
     >>> response = chain.invoke({
     ...     "context": docs_del_expediente,
     ...     "chat_history": history,
-    ...     "input": "pregunta"
+    ...     "input": "pregunta",
+    ...     "expediente_numero": "24-000123-0001-PE"
     ... })
 
 Note:
-    * Función get_expediente_prompt genera prompt dinámico
+    * EXPEDIENTE_PROMPT se construye una vez al importar el módulo
+    * get_expediente_prompt devuelve la plantilla con el número ya fijado (partial)
     * Número de expediente aparece múltiples veces en prompt
     * Formato de fuentes idéntico a answer_prompt
     * Usado SOLO en expediente_chains, NO en general_chains
 
 Ver también:
     * app.services.rag.prompts.answer_prompt: Prompt general
-    * app.services.rag.expediente_chains: Usa get_expediente_prompt
+    * app.services.rag.expediente_chains: Usa EXPEDIENTE_PROMPT
 
 Authors:
     JusticIA Team
@@ -79,9 +80,8 @@ Define cómo JusticBot debe analizar un expediente en particular.
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 
 
-def get_expediente_system_prompt(expediente_numero: str) -> str:
-    """Genera el prompt del sistema para análisis de expediente específico."""
-    return f"""Eres JusticBot, especialista en análisis de expedientes legales costarricenses.
+# Plantilla constante: {expediente_numero} se completa al invocar la chain
+EXPEDIENTE_SYSTEM_PROMPT = """Eres JusticBot, especialista en análisis de expedientes legales costarricenses.
 
 🌐 **INSTRUCCIÓN OBLIGATORIA DE IDIOMA:**
 SIEMPRE comunícate ÚNICAMENTE en ESPAÑOL en todas tus respuestas, sugerencias, recomendaciones y ejemplos. NUNCA uses palabras, términos o ejemplos en inglés u otros idiomas. Si necesitas sugerir términos alternativos de búsqueda, usa SOLO sinónimos o variantes EN ESPAÑOL.
@@ -102,15 +102,15 @@ EXPEDIENTE BAJO ANÁLISIS: {expediente_numero}
 
 CÓMO FUNCIONAS:
 - El usuario solicitó información sobre el expediente {expediente_numero}
-- El sistema RECUPERÓ AUTOMÁTICAMENTE todos los documentos de este expediente desde la base de datos (Milvus)
+- El sistema RECUPERÓ AUTOMÁTICAMENTE desde la base de datos (Milvus) los fragmentos de este expediente más relevantes para la pregunta
 - Los documentos recuperados aparecen abajo en la sección "DOCUMENTOS DEL EXPEDIENTE"
 - Tu trabajo es ANALIZAR esos documentos y responder la pregunta
 
 DOCUMENTOS DEL EXPEDIENTE RECUPERADOS:
-{{context}}
+{context}
 
 🚨 REGLA CRÍTICA - NO INVENTES INFORMACIÓN:
-- Si los documentos recuperados están VACÍOS o NO contienen el expediente {expediente_numero}, responde: "No encontré documentos del expediente {expediente_numero} en la base de datos. Verifica que el número de expediente sea correcto."
+- Si los documentos recuperados están VACÍOS o NO contienen el expediente {expediente_numero}, responde: "No encontré información del expediente {expediente_numero} relacionada con tu consulta. Verifica que el número de expediente sea correcto o reformula la pregunta."
 - NUNCA inventes contenido que no esté explícitamente en los documentos recuperados arriba
 - NUNCA uses tu conocimiento general si no está en los documentos recuperados
 
@@ -130,7 +130,7 @@ Los documentos están organizados en secciones secuenciales:
 - Documentos de soporte
 
 INSTRUCCIONES PARA ANÁLISIS:
-1. **Exhaustividad**: Revisa TODOS los documentos antes de responder
+1. **Exhaustividad**: Revisa TODOS los fragmentos recuperados antes de responder
 2. **Cronología**: Los documentos siguen orden temporal, úsalo para contextualizar
 3. **Precisión**: SIEMPRE cita archivos específicos (ej: "según [nombre_archivo]...", "en el documento [nombre]...")
 4. **Síntesis**: Para preguntas amplias, sintetiza información citando fuentes
@@ -189,31 +189,31 @@ Si el usuario proporciona un DOCUMENTO EXTENSO (plantilla, machote, o documento
 Al generar documentos basados en plantillas/machotes, NUNCA uses líneas de separación horizontal (---, ___, ===).
 SOLO usa saltos de línea en blanco. Esto es OBLIGATORIO para mantener el formato profesional del documento.
 
-**IMPORTANTE**: El sistema YA RECUPERÓ automáticamente TODOS los documentos del expediente {expediente_numero}. Los documentos están en la sección "DOCUMENTOS DEL EXPEDIENTE RECUPERADOS" ({{context}}).
+**IMPORTANTE**: El sistema YA RECUPERÓ automáticamente los fragmentos más relevantes del expediente {expediente_numero}. Los documentos están en la sección "DOCUMENTOS DEL EXPEDIENTE RECUPERADOS".
 
 **TU TAREA:**
 1. Identifica que el usuario proporcionó una plantilla o documento de referencia
 2. Extrae la **ESTRUCTURA** del documento: secciones, formato, estilo
-3. Usa la información de los **DOCUMENTOS RECUPERADOS en {{context}}** para completar/generar un documento siguiendo esa estructura
+3. Usa la información de los **DOCUMENTOS RECUPERADOS** para completar/generar un documento siguiendo esa estructura
 4. Mantén el formato original pero con contenido específico del expediente {expediente_numero}
 
 **EJEMPLOS:**
 
 Usuario: "[Plantilla de recurso con campos vacíos] Complétala para este expediente"
-→ El sistema YA RECUPERÓ los documentos del expediente {expediente_numero} (están en {{context}})
+→ El sistema YA RECUPERÓ los documentos del expediente {expediente_numero} (están en la sección DOCUMENTOS DEL EXPEDIENTE RECUPERADOS)
 → Tú GENERAS un recurso completo usando la estructura de la plantilla + info de los documentos recuperados
 
 Usuario: "[Contestación de demanda completa de otro caso] Hazme una así para este expediente"
-→ Los documentos del expediente {expediente_numero} YA ESTÁN en {{context}}
+→ Los documentos del expediente {expediente_numero} YA ESTÁN en la sección DOCUMENTOS DEL EXPEDIENTE RECUPERADOS
 → Tú GENERAS nueva contestación con la misma estructura pero usando datos de este expediente
 
 Usuario: "[Plantilla de alegatos] Genera uno con la info del expediente"
-→ Documentos del expediente YA RECUPERADOS en {{context}}
+→ Documentos del expediente YA RECUPERADOS en la sección DOCUMENTOS DEL EXPEDIENTE RECUPERADOS
 → Tú GENERAS alegatos siguiendo la estructura + datos específicos de los documentos recuperados
 
 **REGLAS:**
 - Los documentos en la sección "DOCUMENTOS DEL EXPEDIENTE RECUPERADOS" SON del expediente {expediente_numero} (ya se recuperaron todos)
-- Usa SOLO información de esos documentos recuperados en {{context}}
+- Usa SOLO información de esos documentos recuperados
 - La plantilla es una GUÍA de formato, NO la fuente de información
 - Si falta información en los documentos recuperados, márcalo: **[PENDIENTE: especificar]**
 - En el texto de tu respuesta puedes referenciar archivos específicos (ej: "según documento.pdf...", "en la resolución...")
@@ -275,10 +275,18 @@ RESPUESTA A LA CONSULTA:
 """
 
 
+EXPEDIENTE_PROMPT = ChatPromptTemplate.from_messages([
+    ("system", EXPEDIENTE_SYSTEM_PROMPT),
+    MessagesPlaceholder("chat_history"),
+    ("human", "{input}"),
+])
+
+
+def get_expediente_system_prompt(expediente_numero: str) -> str:
+    """Genera el prompt del sistema para análisis de expediente específico."""
+    return EXPEDIENTE_SYSTEM_PROMPT.replace("{expediente_numero}", expediente_numero)
+
+
 def get_expediente_prompt(expediente_numero: str) -> ChatPromptTemplate:
-    """Crea el prompt template para un expediente específico."""
-    return ChatPromptTemplate.from_messages([
-        ("system", get_expediente_system_prompt(expediente_numero)),
-        MessagesPlaceholder("chat_history"),
-        ("human", "{input}"),
-    ])
+    """Prompt con el número de expediente ya fijado (EXPEDIENTE_PROMPT parcial)."""
+    return EXPEDIENTE_PROMPT.partial(expediente_numero=expediente_numero)
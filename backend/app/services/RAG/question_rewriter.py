@@ -0,0 +1,249 @@
+"""
+Etapa de reformulación de preguntas previa a la búsqueda general.
+
+create_history_aware_retriever hacía una llamada completa al LLM para
+reformular la pregunta en cada turno con historial, antes de que la
+búsqueda pudiera empezar. Esta etapa solo llama al LLM cuando la pregunta
+depende del historial; en el resto de turnos busca con la pregunta tal cual.
+
+Decisión (needs_rewrite):
+    ```
+    Sin historial                         → pregunta original
+    CONTEXTUALIZE_MODE = "never"          → pregunta original
+    CONTEXTUALIZE_MODE = "always"         → LLM
+    "auto" + mensaje largo (plantilla)    → LLM
+    "auto" + referencia al historial      → LLM
+    "auto" + pregunta autocontenida       → pregunta original
+    ```
+
+Referencias al historial (is_follow_up):
+    * Pronombres y demostrativos: ese, esa, aquel, dicho, ella, ellos...
+    * Referencias posicionales: el primero, el segundo, el último, el anterior
+    * Elipsis: "¿y ...?", "pero ...", "también ...", preguntas muy cortas
+    * Pedidos de continuación: "más detalles", "amplía", "resume"
+
+Búsqueda especulativa (create_speculative_retriever, SPECULATIVE_RETRIEVAL):
+    ```
+    Pregunta que requiere reformulación
+        ├─→ búsqueda con la pregunta original (en paralelo)
+        └─→ LLM de reformulación
+                    ↓
+    similitud coseno(original, reformulada) >= SPECULATIVE_REUSE_SIMILARITY
+        ├─ sí → resultados especulativos (búsqueda ya terminada o en curso)
+        └─ no → se cancela la especulativa y se busca con la reformulada
+    ```
+
+Note:
+    * La comparación ignora mayúsculas y tildes ("aquél" = "aquel")
+    * Una pregunta autocontenida no recibe la expansión semántica del prompt
+      de contextualización (igual que el primer turno de cada sesión); la
+      búsqueda híbrida (BM25) cubre buena parte de esas coincidencias
+    * El LLM de reformulación es get_rewrite_llm (LLM_REWRITE_MODEL opcional)
+
+Example:
+    >>> from app.services.rag.question_rewriter import needs_rewrite
+    >>> needs_rewrite("¿Y el segundo expediente?", chat_history)
+    True
+    >>> needs_rewrite("¿Qué es la prescripción adquisitiva en materia agraria?", chat_history)
+    False
+
+Ver también:
+    * app.services.rag.general_chains: Usa create_question_rewriter y
+      create_speculative_retriever
+    * app.services.rag.prompts.contextualize_prompt: Prompt de reformulación
+    * app.config.rag_config: CONTEXTUALIZE_MODE y umbrales de la heurística
+"""
+import asyncio
+import logging
+import re
+import unicodedata
+from operator import itemgetter
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.language_models import BaseLanguageModel
+from langchain_core.output_parsers import StrOutputParser
+from langchain_core.prompts import BasePromptTemplate
+from langchain_core.runnables import Runnable, RunnableBranch, RunnableConfig, RunnableLambda
+
+from app.config.rag_config import rag_config
+
+logger = logging.getLogger(__name__)
+
+# Palabras que remiten a algo mencionado antes en la conversación (sin tildes)
+_REFERENCE_WORDS = frozenset({
+    # Demostrativos y pronombres
+    "ese", "esa", "eso", "esos", "esas",
+    "aquel", "aquella", "aquello", "aquellos", "aquellas",
+    "dicho", "dicha", "dichos", "dichas",
+    # ("él" no se incluye: sin tilde coincide con el artículo "el")
+    "ella", "ellos", "ellas",
+    "mismo", "misma", "mismos", "mismas",
+    "ahi", "alli",
+    # Referencias posicionales
+    "primero", "primer", "primera", "segundo", "segunda", "tercero", "tercer", "tercera",
+    "cuarto", "cuarta", "quinto", "quinta", "ultimo", "ultima", "penultimo", "penultima",
+    "anterior", "anteriores", "siguiente", "previo", "previa", "mencionado", "mencionada",
+    "mencionados", "mencionadas",
+    # Pedidos de continuación
+    "amplia", "ampliar", "profundiza", "profundizar", "resume", "resumir",
+    "continua", "continuar", "detalla", "detallar",
+})
+
+# Frases que remiten al historial aunque sus palabras sean comunes
+_REFERENCE_PHRASES = (
+    "mas detalles", "mas informacion", "mas info", "lo anterior", "lo mismo",
+    "el otro", "la otra", "los otros", "las otras", "de nuevo", "otra vez",
+    "este caso", "este expediente", "esta sentencia", "esta resolucion",
+    "estos casos", "estos expedientes",
+)
+
+# Inicios elípticos: "¿y ...?", "pero ...", "entonces ..."
+_ELLIPTIC_STARTS = ("y", "e", "pero", "entonces", "tambien", "ademas", "o", "ni", "ok", "vale")
+
+_WORD_RE = re.compile(r"\w+")
+
+
+def _normalize(text: str) -> str:
+    """Minúsculas sin tildes para comparar palabras."""
+    decomposed = unicodedata.normalize("NFKD", text.lower())
+    return "".join(char for char in decomposed if not unicodedata.combining(char))
+
+
+def is_follow_up(pregunta: str) -> bool:
+    """
+    Indica si la pregunta parece depender de la conversación anterior.
+
+    Args:
+        pregunta: Pregunta del usuario
+
+    Returns:
+        True si contiene referencias al historial, empieza de forma elíptica
+        o es demasiado corta para ser autocontenida
+    """
+    normalized = _normalize(pregunta)
+    words = _WORD_RE.findall(normalized)
+    if not words:
+        return False
+    if len(words) <= rag_config.CONTEXTUALIZE_SHORT_QUESTION_WORDS:
+        return True
+    if words[0] in _ELLIPTIC_STARTS:
+        return True
+    if any(word in _REFERENCE_WORDS for word in words):
+        return True
+    return any(phrase in normalized for phrase in _REFERENCE_PHRASES)
+
+
+def needs_rewrite(pregunta: str, chat_history: Optional[Sequence[Any]], mode: Optional[str] = None) -> bool:
+    """
+    Decide si la pregunta debe reformularse con el LLM antes de buscar.
+
+    Args:
+        pregunta: Pregunta del usuario
+        chat_history: Mensajes previos de la sesión
+        mode: "auto", "always" o "never" (None = rag_config.CONTEXTUALIZE_MODE)
+
+    Returns:
+        True si se debe llamar al LLM de reformulación
+    """
+    if not chat_history:
+        return False
+    mode = mode or rag_config.CONTEXTUALIZE_MODE
+    if mode == "never":
+        return False
+    if mode == "always" or len(pregunta) > rag_config.CONTEXTUALIZE_LONG_MESSAGE_CHARS:
+        return True
+    return is_follow_up(pregunta)
+
+
+def _skip_rewrite(inputs: Dict[str, Any]) -> bool:
+    rewrite = needs_rewrite(inputs["input"], inputs.get("chat_history"))
+    logger.debug(f"Reformulación de pregunta: {'LLM' if rewrite else 'omitida'}")
+    return not rewrite
+
+
+def create_question_rewriter(llm: BaseLanguageModel, prompt: BasePromptTemplate) -> Runnable:
+    """
+    Runnable que devuelve la consulta de búsqueda para cada turno.
+
+    Recibe el mismo input que create_history_aware_retriever ("input" y
+    "chat_history") y devuelve un str: la pregunta original si no hace
+    falta reformular, o la salida del LLM en caso contrario.
+
+    Args:
+        llm: LLM de reformulación (get_rewrite_llm)
+        prompt: Prompt de contextualización (CONTEXTUALIZE_Q_PROMPT)
+
+    Returns:
+        Runnable dict → str
+    """
+    return RunnableBranch(
+        (_skip_rewrite, itemgetter("input")),
+        prompt | llm | StrOutputParser(),
+    ).with_config(run_name="rewrite_question")
+
+
+async def _query_similarity(pregunta: str, query: str) -> float:
+    """Similitud coseno entre los embeddings de la pregunta original y la reformulada."""
+    from app.embeddings.embeddings import get_embeddings
+
+    embeddings = await get_embeddings()
+    # El embedding de la pregunta original ya lo calculó la búsqueda especulativa (caché)
+    vectors = await asyncio.gather(embeddings.aembed_query(pregunta), embeddings.aembed_query(query))
+    a, b = (np.asarray(vector, dtype=np.float32) for vector in vectors)
+    norm = float(np.linalg.norm(a) * np.linalg.norm(b))
+    return float(np.dot(a, b) / norm) if norm else 0.0
+
+
+def create_speculative_retriever(
+    llm: BaseLanguageModel,
+    prompt: BasePromptTemplate,
+    retriever: Runnable,
+) -> Runnable:
+    """
+    Reformulación + búsqueda, con la búsqueda especulativa en paralelo al LLM.
+
+    Reemplaza a create_question_rewriter(...) | retriever: recibe "input" y
+    "chat_history" y devuelve los documentos recuperados.
+
+    Args:
+        llm: LLM de reformulación (get_rewrite_llm)
+        prompt: Prompt de contextualización (CONTEXTUALIZE_Q_PROMPT)
+        retriever: Retriever que recibe la consulta (FormattedRetriever)
+
+    Returns:
+        Runnable dict → List[Document]
+    """
+    rewrite_chain = (prompt | llm | StrOutputParser()).with_config(run_name="rewrite_question")
+
+    async def _retrieve(inputs: Dict[str, Any], config: RunnableConfig) -> List[Document]:
+        pregunta = inputs["input"]
+        if not needs_rewrite(pregunta, inputs.get("chat_history")):
+            return await retriever.ainvoke(pregunta, config)
+
+        speculative = asyncio.create_task(retriever.ainvoke(pregunta, config))
+        try:
+            query = await rewrite_chain.ainvoke(inputs, config)
+        except BaseException:
+            speculative.cancel()
+            raise
+
+        if query.strip() == pregunta.strip():
+            similarity = 1.0
+        else:
+            try:
+                similarity = await _query_similarity(pregunta, query)
+            except Exception as e:
+                logger.warning(f"No se pudo comparar la pregunta reformulada: {e}")
+                similarity = 0.0
+
+        if similarity >= rag_config.SPECULATIVE_REUSE_SIMILARITY:
+            logger.info(f"Búsqueda especulativa reutilizada (similitud {similarity:.3f})")
+            return await speculative
+
+        speculative.cancel()
+        logger.info(f"Búsqueda especulativa descartada (similitud {similarity:.3f})")
+        return await retriever.ainvoke(query, config)
+
+    return RunnableLambda(_retrieve, name="speculative_retrieval")
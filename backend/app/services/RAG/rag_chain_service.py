@@ -8,6 +8,8 @@ streaming de respuestas y mantiene el contexto conversacional.
 Arquitectura RAG:
     * Retriever: DynamicJusticIARetriever busca documentos relevantes en Milvus
     * Chains: LangChain chains procesan contexto + historial + pregunta
+      (compiladas una vez por modo; top_k, umbral y expediente se pasan
+      en config["configurable"] de cada consulta)
     * LLM: Modelo de lenguaje genera respuestas basadas en documentos
     * Streaming: Server-Sent Events (SSE) para respuestas en tiempo real
 
@@ -67,9 +69,8 @@ import re
 import logging
 import json
 
-from .retriever import DynamicJusticIARetriever
-from .general_chains import create_conversational_rag_chain, stream_chain_response
-from .expediente_chains import create_expediente_specific_chain
+from .general_chains import get_conversational_rag_chain, stream_chain_response
+from .expediente_chains import get_expediente_chain
 from .session_store import conversation_store
 
 # Importar configuración centralizada
@@ -147,22 +148,16 @@ class RAGChainService:
             logger.warning(f"top_k={top_k} excede el máximo recomendado. Ajustando a {MAX_TOP_K}")
             top_k = MAX_TOP_K
         
-        # Crear buscador con configuración centralizada
-        retriever = DynamicJusticIARetriever(
-            top_k=top_k,
-            similarity_threshold=rag_config.SIMILARITY_THRESHOLD_GENERAL
-        )
-        
-        # Crear chain conversacional
-        chain = await create_conversational_rag_chain(
-            retriever=retriever,
-            with_history=True # "Recuerda la conversación anterior"
-        )
+        # Chain conversacional compilada una sola vez ("recuerda la conversación anterior")
+        chain = await get_conversational_rag_chain(with_history=True)
         
-        # Configuración de sesión
+        # Configuración de sesión y parámetros del retriever para esta consulta
         config = {
             "configurable": {
-                "session_id": session_id
+                "session_id": session_id,
+                "top_k": top_k,
+                "similarity_threshold": rag_config.SIMILARITY_THRESHOLD_GENERAL,
+                "expediente_filter": None
             }
         }
         
@@ -230,38 +225,29 @@ class RAGChainService:
             expediente_number=expediente_numero
         )
         
-        # Crear retriever configurado para expediente específico con config centralizado
-        retriever = DynamicJusticIARetriever(
-            top_k=rag_config.TOP_K_EXPEDIENTE,
-            similarity_threshold=rag_config.SIMILARITY_THRESHOLD_EXPEDIENTE,
-            expediente_filter=expediente_numero
-        )
+        # Chain especializada para expedientes compilada una sola vez
+        chain = await get_expediente_chain(with_history=True)
         
         logger.info(
-            f"DynamicJusticIARetriever creado para expediente {expediente_numero} "
+            f"Retriever para expediente {expediente_numero} "
             f"(top_k: {rag_config.TOP_K_EXPEDIENTE}, "
             f"threshold: {rag_config.SIMILARITY_THRESHOLD_EXPEDIENTE})"
         )
         
-        # Crear chain especializada para expedientes
-        chain = await create_expediente_specific_chain(
-            retriever=retriever,
-            expediente_numero=expediente_numero,
-            with_history=True
-        )
-        
-        logger.info(f"Chain expediente creada")
-        
-        # Configuración de sesión
+        # Configuración de sesión y parámetros del retriever para esta consulta
         config = {
             "configurable": {
-                "session_id": session_id
+                "session_id": session_id,
+                "top_k": rag_config.TOP_K_EXPEDIENTE,
+                "similarity_threshold": rag_config.SIMILARITY_THRESHOLD_EXPEDIENTE,
+                "expediente_filter": expediente_numero
             }
         }
         
-        # Input para la chain
+        # Input para la chain (el número completa la plantilla del prompt)
         input_dict = {
-            "input": pregunta
+            "input": pregunta,
+            "expediente_numero": expediente_numero
         }
         
         # Streaming response
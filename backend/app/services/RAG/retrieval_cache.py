@@ -0,0 +1,338 @@
+"""
+Caché de resultados de recuperación (memoria del proceso + Redis compartido).
+
+Las mismas preguntas jurídicas generales ("¿qué es la prescripción?") se
+repiten entre usuarios: cada vez se vectorizaba la consulta, se buscaba en
+Milvus (hasta tres veces con el fallback) y se filtraba por estado. Con el
+caché, una consulta repetida se responde sin tocar el modelo ni Milvus.
+
+Niveles:
+    ```
+    DynamicJusticIARetriever._aget_relevant_documents
+            ↓
+    Clave: sha1(consulta normalizada, top_k, umbral, expediente,
+                SEARCH_MODE, modelo, colección, versión del corpus)
+            ↓
+    1. Memoria del proceso: LRU con TTL
+            ↓ (miss)
+    2. Redis DB 3: JSON de los documentos, compartido entre procesos
+            ↓ (miss)
+    3. search_with_fallback → se guarda en ambos niveles (solo si hay resultados)
+    ```
+
+Invalidación (versión del corpus):
+    * Redis corpus:version: contador que incrementa bump_corpus_version
+    * La ingesta lo incrementa cuando un documento entra o sale del estado
+      Procesado (ExpedienteService._propagar_cambio_estado), después del
+      commit en la BD y de confirmar el cambio en Milvus con una lectura
+      Strong: una búsqueda con la versión nueva ya ve el documento
+    * También la reconciliación periódica del estado y el cambio de alias
+      tras una revectorización
+    * Cada proceso relee la versión cada CORPUS_VERSION_REFRESH_SECONDS;
+      las entradas de versiones anteriores quedan huérfanas y expiran por TTL
+
+Normalización de la consulta:
+    * Unicode NFC, espacios colapsados y minúsculas (casefold): variantes de
+      mayúsculas de la misma pregunta comparten resultados
+
+Note:
+    * Sin Redis no se puede conocer la versión del corpus: el caché se
+      desactiva (se busca siempre) hasta que Redis responda
+    * Los resultados vacíos no se guardan (también son los de búsquedas con error)
+    * Cada hit devuelve Documents nuevos: los consumidores pueden modificarlos
+
+Example:
+    >>> from app.services.rag.retrieval_cache import get_retrieval_cache
+    >>> cache = get_retrieval_cache()
+    >>> key = await cache.akey("¿Qué es la prescripción?", 15, 0.2, None)
+    >>> docs = await cache.aget(key)  # None si no está
+    >>> cache.get_metrics()["hit_rate"]
+    0.37
+
+Ver también:
+    * app.services.rag.retriever: Consumidor
+    * app.embeddings.query_cache: Caché de embeddings (mismo esquema de niveles)
+    * app.services.expediente_service: Incrementa la versión del corpus
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from langchain_core.documents import Document
+
+from app.config.config import COLLECTION_NAME
+from app.config.rag_config import rag_config
+from app.embeddings.query_cache import default_model_id, normalize_query
+
+logger = logging.getLogger(__name__)
+
+CORPUS_VERSION_KEY = "corpus:version"
+
+_REDIS_PREFIX = "rag:retrieval:"
+
+# (page_content, metadata) por documento: inmutable dentro del caché
+_Entry = Tuple[Tuple[str, Dict[str, Any]], ...]
+
+
+# ================================
+# VERSIÓN DEL CORPUS
+# ================================
+
+_corpus_version: Optional[int] = None
+_corpus_version_read_at: Optional[float] = None
+_corpus_version_lock = threading.Lock()
+
+
+def get_corpus_version() -> Optional[int]:
+    """
+    Versión actual del corpus (releída de Redis cada CORPUS_VERSION_REFRESH_SECONDS).
+
+    Returns:
+        Versión, o None si Redis no responde (también se recuerda durante
+        el intervalo, para no esperar el timeout de Redis en cada búsqueda)
+    """
+    global _corpus_version, _corpus_version_read_at
+    now = time.monotonic()
+    with _corpus_version_lock:
+        if _corpus_version_read_at is not None and now - _corpus_version_read_at < rag_config.CORPUS_VERSION_REFRESH_SECONDS:
+            return _corpus_version
+
+    try:
+        from app.db.redis_client import get_redis_client
+
+        version = int(get_redis_client().get(CORPUS_VERSION_KEY) or 0)
+    except Exception as e:
+        logger.debug(f"Caché de recuperación: versión del corpus no disponible: {e}")
+        version = None
+
+    with _corpus_version_lock:
+        _corpus_version = version
+        _corpus_version_read_at = now
+    return version
+
+
+def bump_corpus_version() -> None:
+    """
+    Invalida los resultados cacheados de todos los procesos.
+
+    Los errores de Redis se registran sin propagarse: la ingesta no se
+    interrumpe por el caché.
+    """
+    global _corpus_version
+    try:
+        from app.db.redis_client import get_redis_client
+
+        version = int(get_redis_client().incr(CORPUS_VERSION_KEY))
+    except Exception as e:
+        logger.warning(f"No se pudo incrementar la versión del corpus: {e}")
+        version = None
+
+    with _corpus_version_lock:
+        # El proceso que publica el cambio no espera al siguiente refresco
+        _corpus_version = version
+
+
+# ================================
+# CACHÉ
+# ================================
+
+class RetrievalCache:
+    """
+    Caché de dos niveles de documentos recuperados.
+
+    Attributes:
+        max_entries: Entradas máximas en memoria (LRU)
+        ttl_seconds: Vigencia en memoria
+        redis_ttl_seconds: Vigencia en Redis
+    """
+
+    def __init__(
+        self,
+        max_entries: int = rag_config.RETRIEVAL_CACHE_MAX_ENTRIES,
+        ttl_seconds: int = rag_config.RETRIEVAL_CACHE_TTL_SECONDS,
+        redis_ttl_seconds: int = rag_config.RETRIEVAL_CACHE_REDIS_TTL_SECONDS,
+    ):
+        self.max_entries = max(1, max_entries)
+        self.ttl_seconds = ttl_seconds
+        self.redis_ttl_seconds = redis_ttl_seconds
+
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self._hits_memory = 0
+        self._hits_redis = 0
+        self._misses = 0
+        self._bypassed = 0
+        self._redis_errors = 0
+
+    @staticmethod
+    def key(
+        query: str,
+        top_k: int,
+        threshold: float,
+        expediente_filter: Optional[str],
+        corpus_version: int,
+    ) -> str:
+        """Clave del caché para una búsqueda en una versión del corpus."""
+        raw = "\n".join((
+            normalize_query(query).casefold(),
+            str(top_k),
+            f"{threshold:.4f}",
+            expediente_filter or "",
+            rag_config.SEARCH_MODE,
+            default_model_id(),
+            COLLECTION_NAME,
+            str(corpus_version),
+        ))
+        return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+    async def akey(
+        self,
+        query: str,
+        top_k: int,
+        threshold: float,
+        expediente_filter: Optional[str] = None,
+    ) -> Optional[str]:
+        """
+        Clave de la búsqueda en la versión actual del corpus.
+
+        Se calcula una vez antes de buscar y se reutiliza al guardar: una
+        búsqueda que termina después de un cambio de versión queda guardada
+        bajo la versión anterior.
+
+        Returns:
+            Clave, o None si la versión del corpus no está disponible
+        """
+        version = await asyncio.to_thread(get_corpus_version)
+        if version is None:
+            self._count("_bypassed")
+            return None
+        return self.key(query, top_k, threshold, expediente_filter, version)
+
+    # ================================
+    # CONSULTA
+    # ================================
+
+    async def aget(self, key: str) -> Optional[List[Document]]:
+        """Busca los documentos en memoria y luego en Redis."""
+        entry = self._get_memory(key)
+        if entry is None:
+            entry = await asyncio.to_thread(self._get_redis, key)
+        if entry is None:
+            self._count("_misses")
+            return None
+        return [Document(page_content=content, metadata=dict(metadata)) for content, metadata in entry]
+
+    def _get_memory(self, key: str) -> Optional[_Entry]:
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                return None
+            entry, expires_at = item
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            self._hits_memory += 1
+            return entry
+
+    def _get_redis(self, key: str) -> Optional[_Entry]:
+        try:
+            from app.db.redis_client import get_redis_client
+
+            raw = get_redis_client().get(_REDIS_PREFIX + key)
+        except Exception as e:
+            self._count("_redis_errors")
+            logger.debug(f"Caché de recuperación: error leyendo Redis: {e}")
+            return None
+        if raw is None:
+            return None
+
+        entry = tuple((item["page_content"], item["metadata"]) for item in json.loads(raw))
+        self._put_memory(key, entry)
+        self._count("_hits_redis")
+        return entry
+
+    # ================================
+    # ESCRITURA
+    # ================================
+
+    async def aset(self, key: str, documents: List[Document]) -> None:
+        """Guarda los documentos en memoria y en Redis (se omiten resultados vacíos)."""
+        if not documents:
+            return
+        entry: _Entry = tuple((doc.page_content, dict(doc.metadata)) for doc in documents)
+        self._put_memory(key, entry)
+        await asyncio.to_thread(self._set_redis, key, entry)
+
+    def _put_memory(self, key: str, entry: _Entry) -> None:
+        with self._lock:
+            self._entries[key] = (entry, time.monotonic() + self.ttl_seconds)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _set_redis(self, key: str, entry: _Entry) -> None:
+        payload = json.dumps(
+            [{"page_content": content, "metadata": metadata} for content, metadata in entry],
+            ensure_ascii=False,
+            default=str,
+        )
+        try:
+            from app.db.redis_client import get_redis_client
+
+            get_redis_client().set(_REDIS_PREFIX + key, payload, ex=self.redis_ttl_seconds)
+        except Exception as e:
+            self._count("_redis_errors")
+            logger.debug(f"Caché de recuperación: error escribiendo Redis: {e}")
+
+    def clear(self) -> None:
+        """Vacía el nivel en memoria (Redis expira por TTL o cambio de versión)."""
+        with self._lock:
+            self._entries.clear()
+
+    # ================================
+    # MÉTRICAS
+    # ================================
+
+    def _count(self, counter: str) -> None:
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Hits por nivel, misses, búsquedas sin caché y ocupación en memoria."""
+        with self._lock:
+            hits = self._hits_memory + self._hits_redis
+            lookups = hits + self._misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "corpus_version": _corpus_version,
+                "hits_memory": self._hits_memory,
+                "hits_redis": self._hits_redis,
+                "misses": self._misses,
+                "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+                "bypassed": self._bypassed,
+                "redis_errors": self._redis_errors,
+            }
+
+
+_cache: Optional[RetrievalCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_retrieval_cache() -> Optional[RetrievalCache]:
+    """Instancia singleton del caché (None si RETRIEVAL_CACHE_ENABLED=False)."""
+    global _cache
+    if not rag_config.RETRIEVAL_CACHE_ENABLED:
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = RetrievalCache()
+    return _cache
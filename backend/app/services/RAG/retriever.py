@@ -3,7 +3,7 @@ Retriever dinámico para búsqueda vectorial en Milvus.
 
 Implementa LangChain BaseRetriever con dos modos de operación:
 1. Búsqueda semántica general: Busca en toda la BD por similitud
-2. Recuperación de expediente: Obtiene todos los documentos de un expediente
+2. Búsqueda en expediente: Busca por similitud solo dentro de un expediente
 
 Características:
     * Integración con Milvus para búsqueda vectorial (BGE-M3 embeddings)
@@ -20,10 +20,11 @@ Flujo de búsqueda general:
     5. Construcción de Documents de LangChain
 
 Flujo de expediente específico:
-    1. Búsqueda por filtro de expediente
-    2. Recuperación completa (sin embedding query)
-    3. Limpieza de encoding
-    4. Limitación a top_k configurado
+    1. Query → Embedding (BGE-M3)
+    2. Búsqueda vectorial filtrada (numero_expediente == X) con scores reales
+    3. Fallback si pocos resultados (threshold relajado)
+    4. Limpieza de encoding
+    5. Construcción de Documents de LangChain (solo los chunks relevantes)
 
 Metadata enriquecida:
     * expediente_numero: Número de expediente
@@ -49,13 +50,18 @@ Example:
     ...     top_k=50,
     ...     expediente_filter="24-000123-0001-PE"
     ... )
-    >>> docs = await retriever_expediente.ainvoke("cualquier query")  # Se ignora el query
+    >>> docs = await retriever_expediente.ainvoke("¿Cuál fue la sentencia?")
 
 Note:
     * Usa config centralizada (rag_config) si no se especifican parámetros
     * MAX_TOP_K recomendado: 15 (límite de contexto del LLM)
     * Threshold general: 0.30, expediente: 0.10
     * Limpieza de encoding automática para todos los documentos
+    * Resultados cacheados por consulta, parámetros y versión del corpus
+      (app.services.rag.retrieval_cache)
+    * get_configurable_retriever: instancia única cuyos parámetros se pasan
+      al invocar (config["configurable"]: top_k, similarity_threshold,
+      expediente_filter), usada por las chains cacheadas
 
 Ver también:
     * app.vectorstore.vectorstore: Búsqueda en Milvus
@@ -71,7 +77,8 @@ Version:
 from typing import List, Optional
 from langchain_core.retrievers import BaseRetriever
 from langchain_core.documents import Document
-from app.vectorstore.vectorstore import search_by_text, get_expedient_documents
+from langchain_core.runnables import ConfigurableField, Runnable
+from app.vectorstore.vectorstore import search_by_text
 import logging
 from pydantic import Field
 
@@ -81,6 +88,7 @@ from app.constants.metadata_fields import MetadataFields as MF
 # Nuevas importaciones para mejoras RAG
 from app.config.rag_config import rag_config
 from app.services.RAG.search_strategies import search_manager
+from app.services.RAG.retrieval_cache import get_retrieval_cache
 
 # Importar limpieza de encoding para post-procesamiento
 from app.services.ingesta.file_management.text_cleaner import fix_encoding_issues
@@ -94,7 +102,7 @@ class DynamicJusticIARetriever(BaseRetriever):
     
     Implementa dos modos:
     - General: Búsqueda semántica con fallback
-    - Expediente: Recuperación completa de un expediente
+    - Expediente: Búsqueda semántica con fallback restringida a un expediente
     
     Attributes:
         top_k (int): Número máximo de documentos a recuperar.
@@ -124,18 +132,41 @@ class DynamicJusticIARetriever(BaseRetriever):
         object.__setattr__(self, 'similarity_threshold', similarity_threshold)
         object.__setattr__(self, 'expediente_filter', expediente_filter)
         
-        logger.info(
+        # debug: con get_configurable_retriever se instancia en cada consulta
+        logger.debug(
             f"DynamicJusticIARetriever inicializado - "
             f"top_k={top_k}, threshold={similarity_threshold}, "
             f"expediente={expediente_filter or 'None'}"
         )
     
     async def _aget_relevant_documents(self, query: str) -> List[Document]:
+        cache = get_retrieval_cache()
+        cache_key = None
+        if cache is not None:
+            try:
+                cache_key = await cache.akey(query, self.top_k, self.similarity_threshold, self.expediente_filter)
+                cached = await cache.aget(cache_key) if cache_key else None
+            except Exception as e:
+                logger.warning(f"Caché de recuperación no disponible: {e}")
+                cache_key, cached = None, None
+            if cached is not None:
+                logger.info(f"Caché de recuperación: {len(cached)} documentos para '{query[:100]}'")
+                return cached
+        
+        docs = await self._search(query)
+        if cache_key and docs:
+            try:
+                await cache.aset(cache_key, docs)
+            except Exception as e:
+                logger.warning(f"No se pudo guardar en el caché de recuperación: {e}")
+        return docs
+    
+    async def _search(self, query: str) -> List[Document]:
         try:
             # FLUJO 1: Expediente específico (filtro explícito)
             if self.expediente_filter:
                 logger.info(f"Búsqueda en expediente: {self.expediente_filter}")
-                docs = await self._get_expediente_documents(self.expediente_filter)
+                docs = await self._get_expediente_documents(query, self.expediente_filter)
                 logger.debug(f"Expediente: {len(docs)} documentos recuperados")
                 return docs
             
@@ -153,27 +184,24 @@ class DynamicJusticIARetriever(BaseRetriever):
             logger.error(f"Error en retriever: {e}", exc_info=True)
             return []
     
-    async def _get_expediente_documents(self, expediente_numero: str) -> List[Document]:
-        """Obtiene todos los documentos de un expediente específico con limpieza de encoding."""
+    async def _get_expediente_documents(self, query: str, expediente_numero: str) -> List[Document]:
+        """Búsqueda semántica dentro de un expediente con limpieza de encoding."""
         try:
-            logger.info(f"Obteniendo documentos del expediente: {expediente_numero}")
-            
-            # Obtener documentos completos del expediente
-            docs = await get_expedient_documents(expediente_numero)
+            logger.info(f"Búsqueda vectorial en expediente: {expediente_numero}")
+            results = await search_manager.search_with_fallback(
+                query_text=query,
+                top_k=self.top_k,
+                threshold=self.similarity_threshold,
+                expediente_filter=expediente_numero
+            )
             
-            if not docs:
-                logger.warning(f"Expediente {expediente_numero}: sin documentos")
+            if not results:
+                logger.warning(f"Expediente {expediente_numero}: sin documentos relevantes")
                 return []
             
-            # Aplicar limpieza de encoding a todos los documentos
-            for doc in docs:
-                if hasattr(doc, 'page_content'):
-                    doc.page_content = fix_encoding_issues(doc.page_content)
-            
-            # Limitar al top_k configurado
-            result = docs[:self.top_k]
-            logger.info(f"Expediente {expediente_numero}: {len(result)} documentos recuperados (con limpieza de encoding)")
-            return result
+            documents = self._results_to_documents(results)
+            logger.info(f"Expediente {expediente_numero}: {len(documents)} documentos recuperados (con limpieza de encoding)")
+            return documents
             
         except Exception as e:
             logger.error(f"Error obteniendo expediente {expediente_numero}: {e}", exc_info=True)
@@ -194,53 +222,7 @@ class DynamicJusticIARetriever(BaseRetriever):
                 logger.warning(f"No se encontraron resultados para: '{query[:100]}'")
                 return []
             
-            # Convertir a LangChain Documents con metadata enriquecida y limpieza de encoding
-            documents = []
-            for doc in results:
-                if isinstance(doc, Document):
-                    # Limpiar encoding del contenido existente
-                    doc.page_content = fix_encoding_issues(doc.page_content)
-                    documents.append(doc)
-                else:
-                    content = doc.get("content_preview", "")
-                    if content.strip():
-                        # Limpiar encoding antes de crear el documento
-                        content_limpio = fix_encoding_issues(content)
-                        
-                        # Extraer metadata completa de Milvus
-                        milvus_metadata = doc.get("metadata", {})
-                        meta_data = milvus_metadata.get("meta", {})
-                        
-                        # Construir metadata enriquecida para el LLM
-                        enriched_metadata = {
-                            # Identificación del expediente
-                            MF.EXPEDIENTE_NUMERO: doc.get("expedient_id", ""),
-                            MF.DOCUMENTO_NOMBRE: doc.get("document_name", ""),
-                            MF.DOCUMENTO_ID: doc.get("id", ""),
-                            
-                            # Información del chunk
-                            "indice_chunk": milvus_metadata.get("indice_chunk", 0),
-                            "id_chunk": milvus_metadata.get("id_chunk", ""),
-                            
-                            # Información de páginas (si existe)
-                            "pagina_inicio": milvus_metadata.get("pagina_inicio"),
-                            "pagina_fin": milvus_metadata.get("pagina_fin"),
-                            
-                            # Tipo de documento (sentencia, resolución, etc.)
-                            "tipo_documento": milvus_metadata.get("tipo_documento", ""),
-                            
-                            # Ruta del archivo para descarga (desde meta)
-                            "ruta_archivo": meta_data.get("ruta_archivo", ""),
-                            
-                            # Score de similitud
-                            MF.SIMILARITY_SCORE: doc.get("similarity_score", 0.0)
-                        }
-                        
-                        documents.append(Document(
-                            page_content=content_limpio,
-                            metadata=enriched_metadata
-                        ))
-            
+            documents = self._results_to_documents(results)
             logger.info(f"Búsqueda completada: {len(documents)} documentos (con limpieza de encoding)")
             return documents
             
@@ -248,7 +230,88 @@ class DynamicJusticIARetriever(BaseRetriever):
             logger.error(f"Error en búsqueda general: {e}", exc_info=True)
             return []
     
+    @staticmethod
+    def _results_to_documents(results: List) -> List[Document]:
+        """Convierte resultados de search_by_text a LangChain Documents con metadata enriquecida y limpieza de encoding."""
+        documents = []
+        for doc in results:
+            if isinstance(doc, Document):
+                # Limpiar encoding del contenido existente
+                doc.page_content = fix_encoding_issues(doc.page_content)
+                documents.append(doc)
+            else:
+                content = doc.get("content_preview", "")
+                if content.strip():
+                    # Limpiar encoding antes de crear el documento
+                    content_limpio = fix_encoding_issues(content)
+                    
+                    # Extraer metadata completa de Milvus
+                    milvus_metadata = doc.get("metadata", {})
+                    meta_data = milvus_metadata.get("meta") or {}
+                    
+                    # Construir metadata enriquecida para el LLM
+                    enriched_metadata = {
+                        # Identificación del expediente
+                        MF.EXPEDIENTE_NUMERO: doc.get("expedient_id", ""),
+                        MF.DOCUMENTO_NOMBRE: doc.get("document_name", ""),
+                        MF.DOCUMENTO_ID: doc.get("id", ""),
+                        
+                        # Información del chunk
+                        "indice_chunk": milvus_metadata.get("indice_chunk", 0),
+                        "id_chunk": milvus_metadata.get("id_chunk", ""),
+                        
+                        # Información de páginas (si existe)
+                        "pagina_inicio": milvus_metadata.get("pagina_inicio"),
+                        "pagina_fin": milvus_metadata.get("pagina_fin"),
+                        
+                        # Tipo de documento (sentencia, resolución, etc.)
+                        "tipo_documento": milvus_metadata.get("tipo_documento", ""),
+                        
+                        # Ruta del archivo para descarga (desde meta)
+                        "ruta_archivo": meta_data.get("ruta_archivo", ""),
+                        
+                        # Score de similitud
+                        MF.SIMILARITY_SCORE: doc.get("similarity_score", 0.0)
+                    }
+                    
+                    documents.append(Document(
+                        page_content=content_limpio,
+                        metadata=enriched_metadata
+                    ))
+        return documents
+    
     def _get_relevant_documents(self, query: str) -> List[Document]:
         """Método síncrono requerido por BaseRetriever."""
         import asyncio
-        return asyncio.run(self._aget_relevant_documents(query))
\ No newline at end of file
+        return asyncio.run(self._aget_relevant_documents(query))
+
+
+_configurable_retriever: Optional[Runnable] = None
+
+
+def get_configurable_retriever() -> Runnable:
+    """
+    Retriever con top_k, umbral y expediente configurables al invocar.
+
+    Las chains se construyen una sola vez sobre este retriever; cada consulta
+    pasa sus parámetros en config["configurable"] y LangChain crea el
+    DynamicJusticIARetriever correspondiente solo para esa invocación.
+
+    Returns:
+        Runnable con los campos configurables top_k, similarity_threshold
+        y expediente_filter (sin valor: defaults de rag_config)
+    """
+    global _configurable_retriever
+    if _configurable_retriever is None:
+        _configurable_retriever = DynamicJusticIARetriever().configurable_fields(
+            top_k=ConfigurableField(
+                id="top_k", name="Top K", description="Número de documentos a recuperar"
+            ),
+            similarity_threshold=ConfigurableField(
+                id="similarity_threshold", name="Umbral de similitud", description="Umbral de similitud mínimo"
+            ),
+            expediente_filter=ConfigurableField(
+                id="expediente_filter", name="Expediente", description="Filtro por expediente específico"
+            ),
+        )
+    return _configurable_retriever
@@ -8,9 +8,9 @@ incluso cuando el vectorstore presenta problemas.
 Arquitectura de recuperación:
 
     Estrategia Principal: Milvus Vectorstore
-    └─> DynamicJusticIARetriever con filtro por expediente
-        └─> Búsqueda vectorial de hasta 50 documentos
-            └─> Threshold: 0.2 (permisivo para recuperar todo el expediente)
+    └─> get_expedient_documents (query escalar por expediente)
+        └─> Hasta 50 chunks en orden de indice_chunk
+            └─> Sin umbral de similitud (recupera el expediente completo)
 
     Estrategia Fallback: Base de Datos SQL Server
     └─> Consulta directa a T_Documento + T_Expediente_Documento
@@ -44,12 +44,10 @@ Formato de salida (LangChain Document):
     )
 
 Parámetros de configuración:
-    - top_k: 50 (recuperar todos los documentos del expediente)
-    - similarity_threshold: 0.2 (muy permisivo, no filtrar por similitud)
-    - expediente_filter: Número de expediente exacto
+    - MAX_DOCUMENTOS_MILVUS: 50 chunks por expediente
 
 Integración con otros servicios:
-    - DynamicJusticIARetriever: Búsqueda vectorial en Milvus
+    - get_expedient_documents: Recuperación por expediente en Milvus
     - DocumentoService: Consultas directas a BD (fallback)
     - SimilarityService: Consumidor principal para búsquedas por expediente
 
@@ -77,7 +75,7 @@ Note:
     - Se preserva la estructura de metadata para compatibilidad con RAG
 
 Ver también:
-    - app.services.RAG.retriever: DynamicJusticIARetriever
+    - app.vectorstore.vectorstore: get_expedient_documents
     - app.services.busqueda_similares.documentos.documento_service: Acceso a BD
     - app.services.busqueda_similares.similarity_service: Consumidor principal
 
@@ -93,11 +91,15 @@ import logging
 from typing import List
 from langchain_core.documents import Document
 
-from app.services.RAG.retriever import DynamicJusticIARetriever
+from app.vectorstore.vectorstore import get_expedient_documents
+from app.services.ingesta.file_management.text_cleaner import fix_encoding_issues
 from .documentos.documento_service import DocumentoService
 
 logger = logging.getLogger(__name__)
 
+# Máximo de chunks recuperados desde Milvus por expediente
+MAX_DOCUMENTOS_MILVUS = 50
+
 
 class DocumentRetriever:
     """Maneja la obtención de documentos de expedientes desde diferentes fuentes."""
@@ -107,7 +109,7 @@ class DocumentRetriever:
     
     async def obtener_documentos_expediente(self, numero_expediente: str) -> List[Document]:
         """
-        Obtiene documentos del expediente usando retriever o fallback a BD.
+        Obtiene documentos del expediente desde Milvus o fallback a BD.
         
         Args:
             numero_expediente: Número del expediente
@@ -119,15 +121,12 @@ class DocumentRetriever:
             ValueError: Si no se encuentran documentos
         """
         try:
-            # Estrategia principal: usar retriever con filtro directo
-            retriever = DynamicJusticIARetriever(
-                top_k=50,
-                similarity_threshold=0.2,
-                expediente_filter=numero_expediente
-            )
-            
-            query_expediente = f"documentos del expediente {numero_expediente}"
-            docs_expediente = await retriever._aget_relevant_documents(query_expediente)
+            # Estrategia principal: query directa por expediente (sin ranking por similitud)
+            # (solo se leen los textos de los primeros MAX_DOCUMENTOS_MILVUS chunks; del resto
+            # del expediente se recorren id_documento / indice_chunk para ordenar)
+            docs_expediente = await get_expedient_documents(numero_expediente, max_chunks=MAX_DOCUMENTOS_MILVUS)
+            for doc in docs_expediente:
+                doc.page_content = fix_encoding_issues(doc.page_content)
             
             if docs_expediente:
                 logger.info(f"Recuperados {len(docs_expediente)} documentos para expediente {numero_expediente}")
@@ -54,9 +54,10 @@ class DocumentoRetrievalService:
                         if current_score > existing_score:
                             expedientes_map[expedient_id]["documents"][document_name] = doc
                     
+                    # Score agregado del expediente (search_similar_expedients) si existe
                     expedientes_map[expedient_id]["max_similarity"] = max(
                         expedientes_map[expedient_id]["max_similarity"],
-                        current_score,
+                        doc.get("expedient_score", current_score),
                     )
 
         # Obtener datos básicos de expedientes
@@ -9,6 +9,7 @@ Funciones principales:
     - buscar_o_crear_expediente: Gestiona expedientes por número único
     - crear_documento: Registra documentos con validación de formato
     - actualizar_estado_documento: Gestiona estados (Pendiente, Procesado, Error)
+    - propagar_cambios_estado: Sincroniza Milvus y cachés después del commit
     - actualizar_ruta_documento: Actualiza ubicación física de archivos
     - listar_documentos_expediente: Obtiene todos los documentos de un expediente
 
@@ -30,6 +31,8 @@ Note:
     - Los estados válidos son: 'Pendiente', 'Procesado', 'Error'
     - Los documentos se crean con estado 'Pendiente' por defecto
     - La validación de extensiones usa ALLOWED_EXTENSIONS de file_config
+    - Los cambios de estado se propagan a Milvus solo después del commit: con
+      auto_commit=False el llamador invoca propagar_cambios_estado tras db.commit()
 """
 
 from sqlalchemy.orm import Session
@@ -42,10 +45,18 @@ from app.repositories.estado_procesamiento_repository import EstadoProcesamiento
 from app.config.file_config import ALLOWED_EXTENSIONS
 from datetime import datetime
 from typing import Optional, List
+import asyncio
+import logging
 import os
 from pathlib import Path
 from fastapi import UploadFile
 
+logger = logging.getLogger(__name__)
+
+# Clave de Session.info con los cambios de estado pendientes de propagar
+_CAMBIOS_ESTADO_PENDIENTES = "cambios_estado_pendientes"
+
+
 class ExpedienteService:
     """
     Servicio de lógica de negocio para expedientes y documentos judiciales.
@@ -187,6 +198,10 @@ class ExpedienteService:
         Lógica de negocio para actualizar estado de documento.
         Valida transiciones de estado permitidas.
         
+        El cambio se propaga a Milvus y a los cachés después del commit: de
+        inmediato con auto_commit=True; con auto_commit=False queda pendiente
+        en la sesión hasta que el llamador invoque propagar_cambios_estado.
+        
         Args:
             db: Sesión de base de datos
             documento: Documento a actualizar
@@ -205,6 +220,9 @@ class ExpedienteService:
             raise Exception(f"Estado '{nuevo_estado}' no es válido. Estados permitidos: {estados_permitidos}")
         
         try:
+            # Estado previo (para saber si el documento era visible en búsquedas)
+            estado_anterior = documento.estado_procesamiento.CT_Nombre_estado if documento.estado_procesamiento else None
+            
             # Obtener el nuevo estado
             estado = await self.obtener_estado_procesamiento(db, nuevo_estado)
             
@@ -217,10 +235,105 @@ class ExpedienteService:
             )
             
             print(f"Estado actualizado a '{nuevo_estado}' para: {documento.CT_Nombre_archivo}")
-            return documento_actualizado
             
         except Exception as e:
             raise Exception(f"Error en lógica de actualización de estado: {str(e)}")
+        
+        self._registrar_cambio_estado(db, documento_actualizado.CN_Id_documento, estado_anterior, nuevo_estado)
+        if auto_commit:
+            await self.propagar_cambios_estado(db)
+        return documento_actualizado
+    
+    def _registrar_cambio_estado(
+        self,
+        db: Session,
+        documento_id: int,
+        estado_anterior: Optional[str],
+        nuevo_estado: str
+    ) -> None:
+        """
+        Registra un cambio de estado en la sesión para propagarlo después del commit.
+        
+        Varios cambios del mismo documento en la transacción se combinan: se
+        conserva el estado previo a la transacción y el último estado.
+        """
+        pendientes = db.info.setdefault(_CAMBIOS_ESTADO_PENDIENTES, {})
+        estado_inicial = pendientes[documento_id][0] if documento_id in pendientes else estado_anterior
+        pendientes[documento_id] = (estado_inicial, nuevo_estado)
+    
+    async def propagar_cambios_estado(self, db: Session) -> None:
+        """
+        Propaga los cambios de estado registrados en la sesión ya confirmada.
+        
+        Debe llamarse después de db.commit(): si la transacción se revierte,
+        Milvus y los cachés no reflejan un estado que la BD no tiene.
+        
+        Args:
+            db: Sesión cuyos cambios de estado ya se confirmaron
+        """
+        pendientes = db.info.pop(_CAMBIOS_ESTADO_PENDIENTES, {})
+        for documento_id, (estado_anterior, nuevo_estado) in pendientes.items():
+            await self._propagar_cambio_estado(documento_id, estado_anterior, nuevo_estado)
+    
+    def descartar_cambios_estado(self, db: Session) -> None:
+        """Descarta los cambios de estado pendientes (después de db.rollback())."""
+        db.info.pop(_CAMBIOS_ESTADO_PENDIENTES, None)
+    
+    async def _propagar_cambio_estado(
+        self,
+        documento_id: int,
+        estado_anterior: Optional[str],
+        nuevo_estado: str
+    ) -> None:
+        """
+        Propaga un cambio de estado del documento fuera de la BD transaccional.
+        
+        Mantiene sincronizado el campo escalar "procesado" de los chunks en Milvus,
+        que es el que filtran las búsquedas vectoriales, notifica el cambio a los
+        cachés de IDs procesados de cada proceso e incrementa la versión del
+        corpus (caché de resultados de recuperación). Solo actúa si el documento entra
+        o sale del estado 'Procesado'.
+        
+        La sincronización con Milvus se reintenta PROCESSED_SYNC_RETRIES veces;
+        si se agotan, el error se registra sin interrumpir la ingesta y la
+        reconciliación periódica (reconciliar_estado_procesado) corrige el documento.
+        
+        Args:
+            documento_id: ID del documento actualizado
+            estado_anterior: Nombre del estado previo a la transacción (o None)
+            nuevo_estado: Nombre del nuevo estado
+        """
+        if "Procesado" not in (estado_anterior, nuevo_estado) or estado_anterior == nuevo_estado:
+            return
+        
+        from app.config.vectorstore_config import vectorstore_config
+        from app.vectorstore.vectorstore import actualizar_estado_procesado
+        
+        procesado = nuevo_estado == "Procesado"
+        intentos = max(1, vectorstore_config.PROCESSED_SYNC_RETRIES)
+        
+        for intento in range(1, intentos + 1):
+            try:
+                await actualizar_estado_procesado(documento_id=documento_id, procesado=procesado)
+                break
+            except Exception as e:
+                if intento == intentos:
+                    logger.error(
+                        f"Error sincronizando estado '{nuevo_estado}' en Milvus para documento {documento_id} "
+                        f"tras {intentos} intentos (lo corregirá la reconciliación periódica): {e}"
+                    )
+                else:
+                    logger.warning(f"Reintentando sincronización en Milvus del documento {documento_id}: {e}")
+                    await asyncio.sleep(vectorstore_config.PROCESSED_SYNC_RETRY_DELAY_SECONDS * intento)
+        
+        from app.vectorstore.processed_ids_cache import notificar_cambio_estado
+        notificar_cambio_estado(documento_id, procesado)
+        
+        # Invalida los resultados de búsqueda cacheados de todos los procesos.
+        # Va después del commit y del upsert confirmado en Milvus: una búsqueda
+        # con la versión nueva no puede cachear resultados sin el documento
+        from app.services.RAG.retrieval_cache import bump_corpus_version
+        bump_corpus_version()
     
     async def actualizar_ruta_documento(
         self,
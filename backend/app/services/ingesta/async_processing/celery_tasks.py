@@ -20,6 +20,9 @@ Tarea principal:
         * Registra en bitácora
         * Limpia recursos al finalizar
 
+    reconciliar_estado_procesado_celery (beat):
+        * Corrige el campo "procesado" de Milvus que no coincide con la BD
+
 Idempotencia:
     1. Check en Redis: task_progress:{task_id}
     2. Check en BD: Documentos ya procesados
@@ -308,3 +311,24 @@ def procesar_archivo_celery(self, CT_Num_expediente, archivo_data, usuario_id):
             del archivo_data["content"]
         
         raise  # Re-raise para que Celery registre el error correctamente
+
+
+@celery_app.task(name='reconciliar_estado_procesado')
+def reconciliar_estado_procesado_celery():
+    """
+    Reconciliación periódica del campo "procesado" de Milvus con la BD.
+
+    Programada por Celery beat cada PROCESSED_RECONCILE_INTERVAL_SECONDS
+    (celery_app.py). Corrige los documentos que la ingesta no pudo
+    sincronizar después del commit.
+
+    Returns:
+        dict: Documentos recorridos, desincronizados y corregidos
+    """
+    from app.vectorstore.vectorstore import reconciliar_estado_procesado
+
+    db = SessionLocal()
+    try:
+        return asyncio.run(reconciliar_estado_procesado(db))
+    finally:
+        db.close()
@@ -547,6 +547,7 @@ async def process_single_file_with_content(
                     else:
                         # Caso muy raro: si no hay documento creado, hacer rollback
                         db.rollback()
+                        expediente_service.descartar_cambios_estado(db)
                         logger.debug("Rollback de BD realizado (sin documento creado)")
                         
                 except Exception as cleanup_error:
@@ -555,9 +556,22 @@ async def process_single_file_with_content(
                         db.rollback()  # Rollback de emergencia
                     except:
                         pass
+                    expediente_service.descartar_cambios_estado(db)
                 
                 # Re-lanzar la excepción original
                 raise e
+            
+            # 8. Propagar el estado confirmado a Milvus y a los cachés. Fuera del
+            # manejo de errores de la ingesta: el documento ya quedó "Procesado" en
+            # la BD y un fallo aquí (o una cancelación durante los reintentos) no
+            # debe marcarlo como "Error"; la reconciliación periódica corrige Milvus
+            try:
+                await expediente_service.propagar_cambios_estado(db)
+            except Exception as e:
+                logger.error(
+                    f"Documento {documento_creado.CN_Id_documento} procesado, pero no se pudo "
+                    f"propagar su estado a Milvus (lo corregirá la reconciliación): {e}"
+                )
         
         else:
             # Sin BD disponible - NO almacenar en Milvus
@@ -49,6 +49,11 @@ Example:
         print('Error: No se pudo descargar el modelo')
     ```
 
+Pesos en safetensors:
+    ensure_safetensors convierte una sola vez pytorch_model.bin a model.safetensors:
+    la carga lee los tensores directamente, sin deserializar con pickle.
+    Cada proceso sigue teniendo su propia copia de los pesos en memoria.
+
 Note:
     La descarga muestra progreso automáticamente con tqdm.
     En caso de error de red, snapshot_download reintenta automáticamente.
@@ -82,6 +87,7 @@ def ensure_model_available(model_id: str, dest_root: str = "models") -> bool:
     # Si ya hay pesos comunes, consideramos el modelo presente
     if final_dir.exists() and (any(final_dir.glob('*.safetensors')) or any(final_dir.glob('*.bin'))):
         print(f"Modelo '{model_id}' disponible")
+        ensure_safetensors(final_dir)
         return True
     
     print(f"Descargando modelo: {model_id} (~2.5GB)")
@@ -112,7 +118,41 @@ def ensure_model_available(model_id: str, dest_root: str = "models") -> bool:
         shutil.copytree(snapshot_path, final_dir)
         
         print(f"Modelo '{model_id}' descargado")
+        ensure_safetensors(final_dir)
         return True
     except Exception as e:
         print(f"Error descarga: {e}")
         return False
+
+
+def ensure_safetensors(model_dir) -> bool:
+    """
+    Garantiza que el modelo tenga sus pesos en formato safetensors.
+    
+    Si el directorio solo trae pytorch_model.bin, carga el modelo con
+    transformers y lo guarda con safe_serialization (una sola vez; los
+    arranques siguientes cargan desde safetensors).
+
+    Retorna True si el modelo quedó con pesos .safetensors, False si no fue
+    posible (se seguirá cargando desde .bin).
+    """
+    model_dir = Path(model_dir)
+    if any(model_dir.glob('*.safetensors')):
+        return True
+    if not (model_dir / 'pytorch_model.bin').exists():
+        return False
+    if not os.access(model_dir, os.W_OK):
+        print(f"Directorio no escribible, se mantiene pytorch_model.bin: {model_dir}")
+        return False
+
+    print(f"Convirtiendo pesos a safetensors: {model_dir}")
+    try:
+        from transformers import AutoModel
+
+        model = AutoModel.from_pretrained(str(model_dir))
+        model.save_pretrained(str(model_dir), safe_serialization=True)
+        print("Pesos convertidos a model.safetensors")
+        return True
+    except Exception as e:
+        print(f"Error convirtiendo a safetensors: {e}")
+        return False
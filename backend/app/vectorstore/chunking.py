@@ -0,0 +1,257 @@
+"""
+Chunking de la ingesta medido en tokens del modelo de embeddings.
+
+Los chunks de 7000 caracteres podían superar la longitud máxima de
+secuencia del modelo: el resto se truncaba al vectorizar y esa parte del
+texto quedaba almacenada pero invisible para la búsqueda semántica.
+
+Estrategia:
+    ```
+    Texto del documento
+            ↓
+    RecursiveCharacterTextSplitter (separadores \\n\\n, \\n, ". ", " ")
+    con longitud = max(tokens, caracteres x CHUNK_MAX_TOKENS / CHUNK_MAX_CHARS)
+            ↓
+    Chunks que caben en el modelo (tokens) y en el campo texto de Milvus (caracteres)
+            ↓
+    Conteo final de tokens por chunk (un solo lote) → reporte de truncamiento
+    ```
+
+    * CHUNK_MAX_TOKENS = 0 usa max_seq_length del modelo menos los tokens especiales
+    * Solapamiento: al menos CHUNK_OVERLAP_TOKENS tokens y CHUNK_OVERLAP_CHARS
+      caracteres (el que corresponda al límite que se alcanza primero)
+    * start_index real de cada chunk (la estimación de páginas ya no asume
+      chunks de tamaño fijo)
+    * Sin tokenizer disponible: mismo splitter medido en caracteres (comportamiento previo)
+
+Reporte (TruncationReport):
+    * chunks / chunks_truncated: Chunks que superan la longitud del modelo
+    * tokens / tokens_truncated: Tokens totales y tokens que el modelo no vería
+    * truncated_ratio: Fracción de tokens invisibles para la búsqueda
+
+Uso (auditoría de la colección existente):
+    ```
+    python -m app.vectorstore.chunking --report
+    python -m app.vectorstore.chunking --report --limit 20000
+    ```
+
+Example:
+    >>> from app.vectorstore.chunking import split_document
+    >>> chunks, report = split_document(texto)
+    >>> chunks[0].start_index, chunks[0].tokens
+    (0, 1536)
+    >>> report.tokens_truncated
+    0
+
+Ver también:
+    * app.vectorstore.milvus_storage.store_in_vectorstore: Consumidor
+    * app.embeddings.tokenizer: Tokenizer y longitud máxima del modelo
+    * app.config.vectorstore_config: Tamaños de chunk
+"""
+import argparse
+import asyncio
+import logging
+import math
+from dataclasses import dataclass, field
+from typing import List, Optional, Tuple
+
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+from app.config.vectorstore_config import vectorstore_config
+from app.embeddings.tokenizer import SPECIAL_TOKENS, count_tokens, get_max_seq_length, get_tokenizer
+
+logger = logging.getLogger(__name__)
+
+SEPARATORS = ["\n\n", "\n", ". ", " ", ""]
+
+
+@dataclass
+class Chunk:
+    """Fragmento de documento listo para vectorizar."""
+    text: str
+    start_index: int
+    tokens: Optional[int] = None
+
+
+@dataclass
+class TruncationReport:
+    """Tokens que el modelo de embeddings no vería en un conjunto de chunks."""
+    max_tokens: int
+    chunks: int = 0
+    chunks_truncated: int = 0
+    tokens: int = 0
+    tokens_truncated: int = 0
+    longest_chunk_tokens: int = 0
+    measured: bool = True
+    chunk_tokens: List[int] = field(default_factory=list)
+    truncated_chunk_indexes: List[int] = field(default_factory=list)
+
+    def add(self, index: int, tokens: int) -> None:
+        self.chunks += 1
+        self.chunk_tokens.append(tokens)
+        self.tokens += tokens
+        self.longest_chunk_tokens = max(self.longest_chunk_tokens, tokens)
+        if tokens > self.max_tokens:
+            self.chunks_truncated += 1
+            self.tokens_truncated += tokens - self.max_tokens
+            self.truncated_chunk_indexes.append(index)
+
+    @property
+    def truncated_ratio(self) -> float:
+        return self.tokens_truncated / self.tokens if self.tokens else 0.0
+
+    def summary(self) -> str:
+        if not self.measured:
+            return f"{self.chunks} chunks (sin tokenizer: truncamiento no medido)"
+        return (
+            f"{self.chunks} chunks, {self.tokens} tokens, máx {self.longest_chunk_tokens}/{self.max_tokens}, "
+            f"truncados {self.chunks_truncated} chunks / {self.tokens_truncated} tokens "
+            f"({self.truncated_ratio:.1%})"
+        )
+
+
+def chunk_token_limit() -> int:
+    """Tokens de contenido por chunk (sin tokens especiales)."""
+    model_limit = get_max_seq_length() - SPECIAL_TOKENS
+    configured = vectorstore_config.CHUNK_MAX_TOKENS
+    return min(configured, model_limit) if configured > 0 else model_limit
+
+
+def _build_splitter() -> Tuple[RecursiveCharacterTextSplitter, bool]:
+    """Splitter por tokens con tope de caracteres, o por caracteres si no hay tokenizer."""
+    max_chars = vectorstore_config.CHUNK_MAX_CHARS
+    tokenizer = get_tokenizer()
+
+    if tokenizer is None:
+        splitter = RecursiveCharacterTextSplitter(
+            chunk_size=max_chars,
+            chunk_overlap=vectorstore_config.CHUNK_OVERLAP_CHARS,
+            length_function=len,
+            separators=SEPARATORS,
+            add_start_index=True,
+        )
+        return splitter, False
+
+    max_tokens = chunk_token_limit()
+    chars_per_token = max_chars / max_tokens
+
+    def length(text: str) -> int:
+        # Una sola unidad para los dos límites: chunk_size tokens equivale a
+        # CHUNK_MAX_CHARS caracteres, y se respeta el que se alcance primero
+        tokens = len(tokenizer.encode(text, add_special_tokens=False, verbose=False))
+        return max(tokens, math.ceil(len(text) / chars_per_token))
+
+    # El solapamiento se mide en la misma unidad: con el tope de caracteres
+    # dominando (BGE-M3: 8190 tokens vs 7000 caracteres), CHUNK_OVERLAP_TOKENS
+    # unidades serían ~110 caracteres; se toma el mayor de los dos solapamientos
+    overlap = max(
+        vectorstore_config.CHUNK_OVERLAP_TOKENS,
+        math.ceil(vectorstore_config.CHUNK_OVERLAP_CHARS / chars_per_token),
+    )
+
+    splitter = RecursiveCharacterTextSplitter(
+        chunk_size=max_tokens,
+        chunk_overlap=min(overlap, max_tokens // 4),
+        length_function=length,
+        separators=SEPARATORS,
+        add_start_index=True,
+    )
+    return splitter, True
+
+
+def measure_truncation(texts: List[str], max_tokens: Optional[int] = None) -> TruncationReport:
+    """
+    Mide cuánto del texto de cada chunk quedaría fuera del modelo.
+
+    Args:
+        texts: Chunks a medir
+        max_tokens: Tokens de contenido visibles (None = chunk_token_limit())
+
+    Returns:
+        TruncationReport (measured=False si no hay tokenizer)
+    """
+    report = TruncationReport(max_tokens=max_tokens or chunk_token_limit())
+    counts = count_tokens(texts)
+    if counts is None:
+        report.measured = False
+        report.chunks = len(texts)
+        return report
+    for index, tokens in enumerate(counts):
+        report.add(index, tokens)
+    return report
+
+
+def split_document(texto: str) -> Tuple[List[Chunk], TruncationReport]:
+    """
+    Divide el texto de un documento en chunks que el modelo representa completos.
+
+    Args:
+        texto: Texto completo del documento
+
+    Returns:
+        (chunks con start_index y tokens, reporte de truncamiento)
+    """
+    splitter, by_tokens = _build_splitter()
+    documents = splitter.create_documents([texto])
+    texts = [doc.page_content for doc in documents]
+
+    report = measure_truncation(texts)
+    chunks = [
+        Chunk(text=doc.page_content, start_index=doc.metadata.get("start_index", -1))
+        for doc in documents
+    ]
+    for chunk, tokens in zip(chunks, report.chunk_tokens):
+        chunk.tokens = tokens
+
+    if not by_tokens:
+        logger.warning(f"Chunking por caracteres: {report.summary()}")
+    elif report.chunks_truncated:
+        logger.warning(f"Chunks que superan la longitud del modelo: {report.summary()}")
+    return chunks, report
+
+
+async def audit_collection(limit: Optional[int] = None) -> TruncationReport:
+    """
+    Mide el truncamiento de los chunks ya almacenados en la colección.
+
+    Args:
+        limit: Chunks máximos a revisar (None = todos)
+
+    Returns:
+        TruncationReport acumulado
+    """
+    from app.vectorstore.vectorstore import iter_chunk_batches
+
+    report = TruncationReport(max_tokens=chunk_token_limit())
+    async for batch in iter_chunk_batches("id_documento >= 0", output_fields=["texto"]):
+        if limit is not None:
+            batch = batch[:max(0, limit - report.chunks)]
+        batch_report = measure_truncation([row.get("texto") or "" for row in batch], report.max_tokens)
+        if not batch_report.measured:
+            report.measured = False
+            break
+        for tokens in batch_report.chunk_tokens:
+            report.add(report.chunks, tokens)
+        if limit is not None and report.chunks >= limit:
+            break
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Truncamiento de chunks por el modelo de embeddings")
+    parser.add_argument("--report", action="store_true", help="Auditar los chunks de la colección")
+    parser.add_argument("--limit", type=int, default=None, help="Chunks máximos a revisar")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    if not args.report:
+        parser.print_help()
+        return
+
+    report = asyncio.run(audit_collection(args.limit))
+    print("\n=== TRUNCAMIENTO DE CHUNKS EN LA COLECCIÓN ===")
+    print(report.summary())
+
+
+if __name__ == "__main__":
+    main()
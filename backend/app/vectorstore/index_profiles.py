@@ -0,0 +1,196 @@
+"""
+Perfiles de índice ANN y parámetros de búsqueda por tipo de solicitud.
+
+Permite ajustar el compromiso memoria / recall / latencia de la colección sin
+editar código: el perfil define el tipo de índice y sus parámetros de
+construcción, y cada tipo de solicitud usa un nivel de esfuerzo de búsqueda.
+
+Perfiles:
+    * hnsw: Grafo en memoria, mejor latencia/recall (default). Búsqueda: ef
+    * ivf_flat: Clusters con vectores completos, menos memoria que HNSW. Búsqueda: nprobe
+    * ivf_sq8: Clusters con vectores cuantizados a 8 bits (~4x menos memoria). Búsqueda: nprobe
+    * ivf_pq: Cuantización por producto (m=64 subvectores, ~64x menos memoria). Búsqueda: nprobe
+    * diskann: Índice en disco para corpus muy grandes. Búsqueda: search_list
+
+Niveles de esfuerzo:
+    ```
+    Tipo de solicitud        Nivel      HNSW ef   IVF nprobe   DISKANN search_list
+    rag                  →   default    64        32           100
+    similar              →   high       256       128          300
+    ```
+
+    El parámetro nunca queda por debajo del límite pedido (ef y search_list >= limit).
+
+Perfiles cuantizados (quantized=True):
+    El índice devuelve limit * VECTOR_RERANK_MULTIPLIER candidatos con distancias
+    aproximadas y vectorstore los re-ordena por similitud coseno exacta contra el
+    embedding almacenado (ver rerank_candidates).
+
+Variables de entorno (app.config.vectorstore_config):
+    * VECTOR_INDEX_PROFILE: Perfil al crear/reconstruir la colección (default hnsw)
+    * VECTOR_INDEX_BUILD_PARAMS: JSON que reemplaza los parámetros de construcción
+    * VECTOR_SEARCH_LEVELS: JSON {"default": int, "high": int}
+      que reemplaza los valores del perfil activo
+    * VECTOR_RERANK_MULTIPLIER: Candidatos por resultado en perfiles cuantizados
+
+Example:
+    >>> from app.vectorstore.index_profiles import get_index_profile, build_search_params
+    >>> profile = get_index_profile("ivf_sq8")
+    >>> build_search_params(profile, request_type="similar", limit=40)
+    {'metric_type': 'COSINE', 'params': {'nprobe': 128}}
+
+Ver también:
+    * app.vectorstore.vectorstore: Crea el índice y aplica los parámetros
+    * app.routes.vectorstore: Reconstrucción del índice (administradores)
+"""
+import json
+import logging
+from typing import Any, Dict, Optional
+
+from app.config.vectorstore_config import vectorstore_config
+
+logger = logging.getLogger(__name__)
+
+METRIC_TYPE = "COSINE"
+
+INDEX_PROFILES: Dict[str, Dict[str, Any]] = {
+    "hnsw": {
+        "index_type": "HNSW",
+        "build_params": {"M": 16, "efConstruction": 200},
+        "search_param": "ef",
+        "levels": {"default": 64, "high": 256},
+    },
+    "ivf_flat": {
+        "index_type": "IVF_FLAT",
+        "build_params": {"nlist": 1024},
+        "search_param": "nprobe",
+        "levels": {"default": 32, "high": 128},
+    },
+    "ivf_sq8": {
+        "index_type": "IVF_SQ8",
+        "build_params": {"nlist": 1024},
+        "search_param": "nprobe",
+        "levels": {"default": 32, "high": 128},
+        "quantized": True,
+    },
+    "ivf_pq": {
+        "index_type": "IVF_PQ",
+        "build_params": {"nlist": 1024, "m": 64, "nbits": 8},
+        "search_param": "nprobe",
+        "levels": {"default": 32, "high": 128},
+        "quantized": True,
+    },
+    "diskann": {
+        "index_type": "DISKANN",
+        "build_params": {},
+        "search_param": "search_list",
+        "levels": {"default": 100, "high": 300},
+    },
+}
+
+# Nivel de esfuerzo por tipo de solicitud
+REQUEST_LEVELS = {
+    "rag": "default",
+    "similar": "high",
+}
+
+# Parámetros que deben ser >= limit para devolver limit resultados
+_LIMIT_BOUND_PARAMS = ("ef", "search_list")
+
+DEFAULT_PROFILE = vectorstore_config.VECTOR_INDEX_PROFILE
+
+
+def _parse_json(name: str, raw: str) -> Optional[Dict[str, Any]]:
+    if not raw:
+        return None
+    try:
+        return json.loads(raw)
+    except ValueError as e:
+        logger.warning(f"{name} no es JSON válido, se ignora: {e}")
+        return None
+
+
+_BUILD_OVERRIDE = _parse_json("VECTOR_INDEX_BUILD_PARAMS", vectorstore_config.VECTOR_INDEX_BUILD_PARAMS)
+_LEVELS_OVERRIDE = _parse_json("VECTOR_SEARCH_LEVELS", vectorstore_config.VECTOR_SEARCH_LEVELS)
+
+
+def get_index_profile(name: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Obtiene un perfil de índice con los overrides de entorno aplicados.
+
+    Args:
+        name: Nombre del perfil (None = VECTOR_INDEX_PROFILE)
+
+    Returns:
+        Dict con name, index_type, build_params, search_param, levels y quantized
+
+    Raises:
+        ValueError: Si el perfil no existe
+    """
+    name = (name or DEFAULT_PROFILE).lower()
+    if name not in INDEX_PROFILES:
+        raise ValueError(
+            f"Perfil de índice '{name}' no soportado. Opciones: {', '.join(INDEX_PROFILES)}"
+        )
+
+    profile = {"name": name, "quantized": False, **INDEX_PROFILES[name]}
+    profile["levels"] = dict(profile["levels"])
+    profile["build_params"] = dict(profile["build_params"])
+
+    # Los overrides de entorno aplican al perfil configurado
+    if name == DEFAULT_PROFILE:
+        if _BUILD_OVERRIDE:
+            profile["build_params"].update(_BUILD_OVERRIDE)
+        if _LEVELS_OVERRIDE:
+            profile["levels"].update(_LEVELS_OVERRIDE)
+    return profile
+
+
+def profile_for_index_type(index_type: Optional[str]) -> Optional[Dict[str, Any]]:
+    """Perfil que corresponde a un tipo de índice existente (ej: "HNSW"), o None."""
+    if not index_type:
+        return None
+    for name, profile in INDEX_PROFILES.items():
+        if profile["index_type"] == index_type.upper():
+            return get_index_profile(name)
+    return None
+
+
+def build_search_params(
+    profile: Optional[Dict[str, Any]], request_type: str = "rag", limit: int = 0
+) -> Dict[str, Any]:
+    """
+    Construye search_params para client.search / AnnSearchRequest.
+
+    Args:
+        profile: Perfil del índice activo (None = solo métrica)
+        request_type: rag | similar
+        limit: Resultados pedidos (ef / search_list no pueden ser menores)
+
+    Returns:
+        {"metric_type": "COSINE", "params": {...}}
+    """
+    params: Dict[str, Any] = {}
+    if profile:
+        level = REQUEST_LEVELS.get(request_type, "default")
+        value = int(profile["levels"].get(level, profile["levels"]["default"]))
+        if profile["search_param"] in _LIMIT_BOUND_PARAMS:
+            value = max(value, limit)
+        params[profile["search_param"]] = value
+    return {"metric_type": METRIC_TYPE, "params": params}
+
+
+def rerank_candidates(profile: Optional[Dict[str, Any]], limit: int) -> int:
+    """
+    Candidatos a pedir al índice para devolver limit resultados.
+
+    Args:
+        profile: Perfil del índice activo
+        limit: Resultados finales
+
+    Returns:
+        limit * VECTOR_RERANK_MULTIPLIER en perfiles cuantizados, limit en el resto
+    """
+    if profile and profile.get("quantized"):
+        return limit * max(1, vectorstore_config.VECTOR_RERANK_MULTIPLIER)
+    return limit
@@ -0,0 +1,207 @@
+"""
+Migración de una colección Milvus existente al layout actual.
+
+Copia todos los chunks (incluidos los embeddings, sin re-vectorizar) a una
+colección nueva creada con el schema e índices del sistema. Permite adoptar
+cambios de schema que Milvus no admite sobre colecciones existentes:
+
+    * Partition key por expediente (numero_expediente o id_expediente)
+    * Campo escalar "procesado" (se completa desde la BD si el origen no lo tiene)
+    * Campo BM25 texto_sparse (lo calcula Milvus al insertar)
+    * Precisión del campo embedding (float32 / float16 / bfloat16)
+    * Perfil de índice vectorial
+
+Flujo:
+    ```
+    Colección origen → query_iterator (lotes de --batch-size)
+                ↓
+    Filas filtradas a los campos insertables del destino
+                ↓
+    insert en colección destino (create_collection_with_indexes)
+                ↓
+    flush → actualizar COLLECTION_NAME y reiniciar servicios
+    ```
+
+Uso:
+    ```
+    python -m app.vectorstore.migracion justicia_docs justicia_docs_v2 \\
+        --partition-key numero_expediente --bm25 --index-profile hnsw --vector-dtype float16
+    ```
+
+    Comparar la calidad de la colección nueva con python -m app.vectorstore.recall.
+
+Note:
+    * La colección origen no se modifica ni se elimina
+    * Aborta si la colección destino ya existe
+    * Ejecutar con la ingesta detenida: los chunks insertados durante la copia
+      pueden no llegar al destino
+
+Ver también:
+    * app.vectorstore.schema.build_collection_schema: Schema del destino
+    * app.vectorstore.vectorstore.create_collection_with_indexes: Índices del destino
+    * app.vectorstore.vector_codec: Conversión de precisión de los embeddings
+    * app.vectorstore.revectorizacion: Copia re-vectorizando con otro modelo
+"""
+import argparse
+import logging
+import time
+from typing import Optional
+
+from pymilvus import MilvusClient
+
+from app.config.config import MILVUS_URI, MILVUS_TOKEN, MILVUS_DB_NAME
+from app.config.vectorstore_config import vectorstore_config
+from app.vectorstore.schema import build_collection_schema, PARTITION_KEY_FIELDS, SPARSE_FIELD
+from app.vectorstore.vectorstore import create_collection_with_indexes
+from app.vectorstore.vector_codec import VECTOR_DTYPES, encode_vector, decode_vector, vector_dtype_name
+from app.vectorstore.index_profiles import INDEX_PROFILES
+from app.vectorstore.processed_ids_cache import _load_processed_ids
+
+logger = logging.getLogger(__name__)
+
+
+def migrar_coleccion(
+    origen: str,
+    destino: str,
+    partition_key: Optional[str] = None,
+    enable_bm25: bool = False,
+    index_profile: Optional[str] = None,
+    batch_size: int = 1000,
+    vector_dtype: str = "float32",
+) -> int:
+    """
+    Copia una colección a una nueva con el schema, precisión e índices indicados.
+
+    Args:
+        origen: Colección existente
+        destino: Colección nueva (no debe existir)
+        partition_key: numero_expediente | id_expediente (None = sin partition key)
+        enable_bm25: Incluir el campo BM25 texto_sparse
+        index_profile: Perfil del índice vectorial (None = VECTOR_INDEX_PROFILE)
+        batch_size: Chunks por lote de lectura/inserción
+        vector_dtype: Precisión del campo embedding en el destino
+
+    Returns:
+        int: Chunks copiados
+
+    Raises:
+        ValueError: Si el origen no existe o el destino ya existe
+    """
+    client = MilvusClient(uri=MILVUS_URI, token=MILVUS_TOKEN, db_name=MILVUS_DB_NAME)
+
+    if not client.has_collection(origen):
+        raise ValueError(f"La colección origen '{origen}' no existe")
+    if client.has_collection(destino):
+        raise ValueError(f"La colección destino '{destino}' ya existe")
+
+    schema = build_collection_schema(
+        enable_bm25=enable_bm25, partition_key=partition_key, vector_dtype=vector_dtype
+    )
+    create_collection_with_indexes(client, destino, schema=schema, index_profile=index_profile)
+
+    source_description = {field["name"]: field for field in client.describe_collection(origen)["fields"]}
+    source_fields = set(source_description)
+    source_dtype = vector_dtype_name(source_description.get("embedding", {}).get("type"))
+    target_fields = {field.name for field in schema.fields} - {SPARSE_FIELD}
+    output_fields = sorted((source_fields - {SPARSE_FIELD}) & target_fields)
+
+    # Colecciones legacy sin "procesado": completar desde la BD
+    processed_ids = None
+    if "procesado" in target_fields and "procesado" not in source_fields:
+        processed_ids = set(_load_processed_ids())
+        logger.info(f"Origen sin campo 'procesado': {len(processed_ids)} documentos procesados en BD")
+
+    client.load_collection(collection_name=origen)
+    total = client.get_collection_stats(origen).get("row_count", 0)
+    logger.info(
+        f"Migrando {total} chunks: {origen} → {destino} "
+        f"(partition_key={partition_key or 'no'}, bm25={enable_bm25}, "
+        f"embedding {source_dtype} → {vector_dtype})"
+    )
+
+    iterator = client.query_iterator(
+        collection_name=origen,
+        batch_size=batch_size,
+        filter='id_chunk != ""',
+        output_fields=output_fields,
+    )
+
+    copiados = 0
+    inicio = time.perf_counter()
+    try:
+        while True:
+            batch = iterator.next()
+            if not batch:
+                break
+
+            rows = []
+            for row in batch:
+                data = {key: value for key, value in row.items() if key in target_fields}
+                if "embedding" in data:
+                    data["embedding"] = encode_vector(
+                        decode_vector(data["embedding"], source_dtype), vector_dtype
+                    )
+                if processed_ids is not None:
+                    data["procesado"] = data.get("id_documento") in processed_ids
+                rows.append(data)
+
+            client.insert(
+                collection_name=destino,
+                data=rows,
+                timeout=vectorstore_config.MILVUS_WRITE_TIMEOUT,
+            )
+            copiados += len(rows)
+            logger.info(f"  {copiados}/{total} chunks copiados")
+    finally:
+        iterator.close()
+
+    client.flush(collection_name=destino)
+    logger.info(
+        f"Migración completada: {copiados} chunks en {time.perf_counter() - inicio:.1f}s. "
+        f"Configurar COLLECTION_NAME={destino} y reiniciar API y workers"
+    )
+    return copiados
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Copia una colección Milvus al schema actual (partition key, procesado, BM25, precisión)"
+    )
+    parser.add_argument("origen", help="Colección existente")
+    parser.add_argument("destino", help="Colección nueva (no debe existir)")
+    parser.add_argument(
+        "--partition-key",
+        choices=PARTITION_KEY_FIELDS,
+        default=None,
+        help="Campo usado como partition key (default: sin partition key)",
+    )
+    parser.add_argument("--bm25", action="store_true", help="Incluir el campo BM25 texto_sparse")
+    parser.add_argument(
+        "--index-profile",
+        choices=sorted(INDEX_PROFILES),
+        default=None,
+        help="Perfil del índice vectorial (default: VECTOR_INDEX_PROFILE)",
+    )
+    parser.add_argument(
+        "--vector-dtype",
+        choices=list(VECTOR_DTYPES),
+        default=vectorstore_config.VECTOR_DTYPE,
+        help="Precisión del campo embedding en el destino (default: VECTOR_DTYPE)",
+    )
+    parser.add_argument("--batch-size", type=int, default=1000, help="Chunks por lote")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    migrar_coleccion(
+        origen=args.origen,
+        destino=args.destino,
+        partition_key=args.partition_key,
+        enable_bm25=args.bm25,
+        index_profile=args.index_profile,
+        batch_size=args.batch_size,
+        vector_dtype=args.vector_dtype,
+    )
+
+
+if __name__ == "__main__":
+    main()
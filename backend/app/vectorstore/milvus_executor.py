@@ -0,0 +1,112 @@
+"""
+Ejecución asíncrona de llamadas a Milvus.
+
+PyMilvus (MilvusClient) y LangChain Milvus son síncronos: llamarlos directamente
+desde funciones async bloquea el event loop de uvicorn, incluidos los streams SSE
+de otros usuarios. Este módulo ejecuta cada llamada en un pool de hilos dedicado
+y acotado, con límite de concurrencia y timeout por llamada.
+
+Flujo:
+    ```
+    await run_milvus(client.search, ..., timeout=30)
+                ↓
+    Semáforo del event loop (MILVUS_MAX_CONCURRENT_CALLS)
+                ↓
+    ThreadPoolExecutor "milvus" (MILVUS_MAX_WORKERS hilos)
+                ↓
+    client.search(..., timeout=30)  ←  timeout del servidor gRPC
+                ↓
+    asyncio.wait_for(timeout + margen)  ←  el event loop nunca espera indefinidamente
+    ```
+
+Note:
+    * Pool separado del executor por defecto de asyncio: las búsquedas no
+      compiten con otras tareas run_in_executor del proceso
+    * Un semáforo por event loop (Celery ejecuta tareas en loops propios)
+    * El timeout se reenvía a pymilvus para que la llamada se cancele también
+      del lado del servidor, no solo la espera en Python
+
+Example:
+    >>> from app.vectorstore.milvus_executor import run_milvus
+    >>> results = await run_milvus(
+    ...     client.query, collection_name="justicia_docs", filter="id_documento == 1"
+    ... )
+
+Ver también:
+    * app.vectorstore.vectorstore: Único consumidor
+    * app.config.vectorstore_config: Parámetros del pool
+"""
+import asyncio
+import logging
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable, Optional
+
+from app.config.vectorstore_config import vectorstore_config
+
+logger = logging.getLogger(__name__)
+
+# Margen sobre el timeout de pymilvus antes de abandonar la espera en el event loop
+_TIMEOUT_GRACE_SECONDS = 5
+
+_executor = ThreadPoolExecutor(
+    max_workers=max(1, vectorstore_config.MILVUS_MAX_WORKERS),
+    thread_name_prefix="milvus",
+)
+
+# asyncio.Semaphore queda ligado al loop donde se usa: uno por event loop
+_semaphores: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def _get_semaphore() -> asyncio.Semaphore:
+    loop = asyncio.get_running_loop()
+    semaphore = _semaphores.get(loop)
+    if semaphore is None:
+        semaphore = asyncio.Semaphore(max(1, vectorstore_config.MILVUS_MAX_CONCURRENT_CALLS))
+        _semaphores[loop] = semaphore
+    return semaphore
+
+
+async def run_milvus(
+    func: Callable[..., Any],
+    *args,
+    timeout: Optional[float] = None,
+    forward_timeout: bool = True,
+    **kwargs,
+) -> Any:
+    """
+    Ejecuta una llamada síncrona de Milvus sin bloquear el event loop.
+
+    Args:
+        func: Método de MilvusClient / LangChain Milvus
+        *args: Argumentos posicionales de func
+        timeout: Segundos máximos (None = MILVUS_CALL_TIMEOUT, 0 = sin límite)
+        forward_timeout: Pasar timeout=... a func (pymilvus lo acepta en sus RPC)
+        **kwargs: Argumentos nombrados de func
+
+    Returns:
+        Resultado de func
+
+    Raises:
+        asyncio.TimeoutError: Si la llamada excede el timeout
+        Exception: Cualquier error de func (p. ej. MilvusException)
+    """
+    if timeout is None:
+        timeout = vectorstore_config.MILVUS_CALL_TIMEOUT
+
+    if timeout and forward_timeout:
+        kwargs.setdefault("timeout", timeout)
+
+    loop = asyncio.get_running_loop()
+    async with _get_semaphore():
+        future = loop.run_in_executor(_executor, partial(func, *args, **kwargs))
+        if not timeout:
+            return await future
+        try:
+            return await asyncio.wait_for(future, timeout=timeout + _TIMEOUT_GRACE_SECONDS)
+        except asyncio.TimeoutError:
+            logger.error(f"Timeout de Milvus ({timeout}s) en {getattr(func, '__name__', func)}")
+            raise
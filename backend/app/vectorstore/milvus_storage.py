@@ -5,16 +5,19 @@ Migrado a LangChain para automación completa de embeddings e inserción.
 Maneja chunking inteligente, estimación de páginas y preparación de metadata.
 
 Características:
-    * Chunking con RecursiveCharacterTextSplitter
-    * Chunks de 7000 chars (seguro bajo límite 8192 de Milvus)
-    * Overlap de 500 chars para continuidad contextual
+    * Chunking con RecursiveCharacterTextSplitter medido en tokens del modelo
+      de embeddings (app.vectorstore.chunking)
+    * Chunks dentro de la longitud máxima del modelo y de 7000 chars
+      (seguro bajo límite 8192 de Milvus)
+    * Overlap de al menos CHUNK_OVERLAP_TOKENS tokens y CHUNK_OVERLAP_CHARS
+      caracteres, medido como el largo del splitter (app.vectorstore.chunking)
     * Estimación de páginas por chunk
     * Metadata completa (expediente, documento, chunk, páginas)
     * Embeddings automáticos via LangChain
 
 Flujo de almacenamiento:
     1. Recibir texto completo del documento
-    2. Dividir en chunks con text_splitter
+    2. Dividir en chunks por tokens (split_document) y reportar truncamiento
     3. Calcular páginas estimadas por chunk
     4. Preparar metadata enriquecida
     5. Crear Documents de LangChain
@@ -28,17 +31,19 @@ Metadata por chunk:
     * pagina_inicio/pagina_fin: Rango estimado de páginas
     * tipo_archivo: Código de tipo (FILE_TYPE_CODES)
     * fecha_carga/fecha_vectorizacion: Timestamps
-    * meta: JSON con info adicional (total_chunks, length, etc.)
+    * procesado: False al insertar (lo activa actualizar_estado_documento)
+    * meta: JSON con info adicional (total_chunks, length, tokens, etc.)
 
 Chunking:
     * Separadores: \n\n, \n, ".", " " (en orden de preferencia)
     * Respeta límites de oración cuando es posible
     * Overlap mantiene continuidad entre chunks
-    * Longitud función: len (caracteres)
+    * Longitud: tokens del modelo de embeddings con tope de caracteres
+      (caracteres si el tokenizer no está disponible)
 
 Estimación de páginas:
     * 2500 caracteres por página (aprox 500 palabras)
-    * Cálculo basado en posición de caracteres
+    * Cálculo basado en la posición real del chunk (start_index)
     * Mantiene secuencia correcta entre chunks
 
 Example:
@@ -63,12 +68,13 @@ Example:
 Note:
     * LangChain genera embeddings automáticamente (BGE-M3)
     * IDs retornados son UUIDs asignados por Milvus
-    * Chunks respetan límite de 8192 chars de Milvus
+    * Chunks respetan límite de 8192 chars de Milvus y la longitud del modelo
     * Metadata "meta" es JSON flexible para extensibilidad
     * FILE_TYPE_CODES mapea extensiones a códigos numéricos
 
 Ver también:
     * app.vectorstore.vectorstore: add_documents para inserción
+    * app.vectorstore.chunking: Chunking por tokens y reporte de truncamiento
     * app.config.file_config: FILE_TYPE_CODES
     * app.services.ingesta: Usa store_in_vectorstore
 
@@ -85,12 +91,13 @@ MIGRADO A LANGCHAIN: Este módulo ahora usa add_documents() para aprovechar
 la automación completa de embeddings e inserción de LangChain.
 """
 
+import asyncio
 import uuid
 import time
 from typing import List, Dict, Any
-from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain_core.documents import Document
 from app.config.file_config import FILE_TYPE_CODES
+from app.vectorstore.chunking import split_document
 from app.vectorstore.vectorstore import add_documents
 from pathlib import Path
 
@@ -142,22 +149,15 @@ async def store_in_vectorstore(
         >>> print(f"{num_chunks} chunks almacenados")
     
     Note:
-        * Chunks de 7000 chars con overlap de 500 (límite Milvus: 8192)
+        * Chunks medidos en tokens del modelo (sin truncamiento al vectorizar),
+          tope de 7000 chars (límite Milvus: 8192)
         * Estimación de páginas: 2500 caracteres por página
         * Metadata "meta" es JSON flexible para extensibilidad
         * Timestamps en epoch milliseconds
     """
-    # Configurar text splitter con chunks que respeten el límite de Milvus (8192 chars)
-    text_splitter = RecursiveCharacterTextSplitter(
-        chunk_size=7000,      # Seguro bajo límite de 8192 con margen para metadata
-        chunk_overlap=500,    # Mayor overlap para mantener continuidad
-        length_function=len,
-        separators=["\n\n", "\n", ". ", " ", ""]  # Separadores en orden de preferencia
-    )
-    
-    # Dividir el texto en chunks
-    chunks = text_splitter.split_text(texto)
-    print(f"Documento dividido en {len(chunks)} chunks para LangChain")
+    # Dividir en chunks medidos en tokens del modelo (tokenización fuera del event loop)
+    chunks, reporte = await asyncio.to_thread(split_document, texto)
+    print(f"Documento dividido en {len(chunks)} chunks: {reporte.summary()}")
     
     # Preparar metadatos comunes
     timestamp_ms = int(time.time() * 1000)
@@ -170,9 +170,11 @@ async def store_in_vectorstore(
     # Crear documentos LangChain para cada chunk
     langchain_documents = []
     
-    for i, chunk_text in enumerate(chunks):
-        # Calcular páginas aproximadas para este chunk
-        inicio_char = i * (7000 - 500)  # chunk_size menos overlap
+    for i, chunk in enumerate(chunks):
+        chunk_text = chunk.text
+        
+        # Calcular páginas aproximadas para este chunk (posición real en el texto)
+        inicio_char = max(0, chunk.start_index)
         fin_char = inicio_char + len(chunk_text)
         
         pagina_inicio = max(1, (inicio_char // caracteres_por_pagina) + 1)
@@ -199,12 +201,16 @@ async def store_in_vectorstore(
             "tipo_documento": "documento",
             "fecha_vectorizacion": timestamp_ms,
             
+            # Estado: visible en búsquedas solo cuando la ingesta marque "Procesado"
+            "procesado": False,
+            
             # Metadatos flexibles
             "meta": {
                 **metadatos,
                 "total_chunks": len(chunks),
                 "chunk_index": i,
                 "chunk_length": len(chunk_text),
+                "chunk_tokens": chunk.tokens,
                 "estimated_pages": f"{pagina_inicio}-{pagina_fin}"
             }
         }
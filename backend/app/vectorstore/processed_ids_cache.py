@@ -0,0 +1,316 @@
+"""
+Caché por proceso del conjunto de IDs de documentos procesados.
+
+Evita que cada búsqueda vectorial abra una sesión de BD y ejecute el join
+completo T_Documento ⋈ T_Estado_procesamiento para filtrar por estado.
+
+Representación:
+    Arreglo numpy int64 ordenado; la pertenencia se resuelve con búsqueda
+    binaria (np.searchsorted). 100k documentos ocupan ~800 KB frente a los
+    ~5 MB de un set de ints de Python.
+
+Actualización:
+    ```
+    Worker de ingesta (Celery) → actualizar_estado_documento
+                ↓
+    notificar_cambio_estado → PUBLISH documentos:estado {"id_documento", "procesado"}
+                ↓
+    Listener (hilo daemon, uno por proceso) → apply_change (inserción/borrado O(n))
+    ```
+
+    * Refresco completo al primer uso y cada PROCESSED_IDS_REFRESH_SECONDS
+      como red de seguridad ante mensajes perdidos (pub/sub no es durable)
+    * Si el listener está caído, el conjunto expira cada
+      PROCESSED_IDS_FALLBACK_TTL_SECONDS para no servir datos obsoletos
+    * Los cambios recibidos durante un refresco se re-aplican sobre el resultado
+
+Example:
+    >>> from app.vectorstore.processed_ids_cache import get_processed_ids_cache
+    >>> cache = get_processed_ids_cache()
+    >>> 1234 in cache
+    True
+
+Note:
+    * Solo lo usa el filtro legacy de colecciones sin el campo "procesado"
+    * Thread-safe: lecturas y cambios incrementales protegidos con lock
+
+Ver también:
+    * app.vectorstore.vectorstore._filter_by_processed_status: Consumidor
+    * app.services.expediente_service: Publica los cambios de estado
+"""
+import json
+import logging
+import threading
+import time
+from typing import Iterable, Optional
+
+import numpy as np
+
+from app.config.vectorstore_config import vectorstore_config
+
+logger = logging.getLogger(__name__)
+
+
+class ProcessedIdsCache:
+    """
+    Conjunto compacto de IDs de documentos en estado 'Procesado'.
+
+    Attributes:
+        channel: Canal Redis pub/sub con los cambios de estado
+        refresh_seconds: Intervalo del refresco completo con listener activo
+        fallback_ttl_seconds: Vigencia del conjunto sin listener activo
+    """
+
+    def __init__(
+        self,
+        channel: str = vectorstore_config.PROCESSED_IDS_CHANNEL,
+        refresh_seconds: int = vectorstore_config.PROCESSED_IDS_REFRESH_SECONDS,
+        fallback_ttl_seconds: int = vectorstore_config.PROCESSED_IDS_FALLBACK_TTL_SECONDS,
+    ):
+        self.channel = channel
+        self.refresh_seconds = refresh_seconds
+        self.fallback_ttl_seconds = fallback_ttl_seconds
+
+        self._ids = np.empty(0, dtype=np.int64)
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._loaded = False
+        self._loaded_at = 0.0
+        self._last_attempt = 0.0
+
+        # Cambios recibidos mientras corre un refresco completo
+        self._refreshing = False
+        self._pending = []
+
+        self._listener_thread = None
+        self._listener_alive = False
+
+    # ================================
+    # CONSULTA
+    # ================================
+
+    def __contains__(self, doc_id) -> bool:
+        try:
+            value = int(doc_id)
+        except (TypeError, ValueError):
+            return False
+        ids = self._ids
+        pos = int(np.searchsorted(ids, value))
+        return pos < len(ids) and ids[pos] == value
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    @property
+    def is_loaded(self) -> bool:
+        return self._loaded
+
+    def ensure_fresh(self, db=None) -> bool:
+        """
+        Refresca el conjunto si expiró y arranca el listener si no está activo.
+
+        Args:
+            db: Sesión de BD (opcional, se crea una temporal si falta)
+
+        Returns:
+            bool: True si hay un conjunto cargado utilizable
+        """
+        self._start_listener()
+
+        if self._is_fresh():
+            return True
+
+        with self._refresh_lock:
+            # Otro hilo pudo refrescar mientras se esperaba el lock
+            if self._is_fresh():
+                return True
+            # No reintentar contra la BD en cada búsqueda si el último intento falló
+            if self._loaded and time.monotonic() - self._last_attempt < self.fallback_ttl_seconds:
+                return True
+            self.refresh(db)
+
+        return self._loaded
+
+    def _is_fresh(self) -> bool:
+        if not self._loaded:
+            return False
+        ttl = self.refresh_seconds if self._listener_alive else self.fallback_ttl_seconds
+        return time.monotonic() - self._loaded_at < ttl
+
+    # ================================
+    # ACTUALIZACIÓN
+    # ================================
+
+    def refresh(self, db=None) -> bool:
+        """
+        Recarga el conjunto completo desde la BD.
+
+        Args:
+            db: Sesión de BD (opcional)
+
+        Returns:
+            bool: True si la recarga fue exitosa
+        """
+        self._last_attempt = time.monotonic()
+        with self._lock:
+            self._refreshing = True
+            self._pending = []
+
+        try:
+            ids = _load_processed_ids(db)
+        except Exception as e:
+            logger.error(f"Error recargando IDs procesados: {e}")
+            with self._lock:
+                self._refreshing = False
+                self._pending = []
+            return False
+
+        with self._lock:
+            self._ids = np.unique(np.fromiter(ids, dtype=np.int64, count=len(ids)))
+            for doc_id, procesado in self._pending:
+                self._apply_locked(doc_id, procesado)
+            self._refreshing = False
+            self._pending = []
+            self._loaded = True
+            self._loaded_at = time.monotonic()
+
+        logger.info(f"Caché de IDs procesados recargado: {len(self._ids)} documentos")
+        return True
+
+    def apply_change(self, doc_id: int, procesado: bool) -> None:
+        """
+        Aplica un cambio de estado incremental.
+
+        Args:
+            doc_id: ID del documento
+            procesado: True si entró al estado 'Procesado', False si salió
+        """
+        with self._lock:
+            if self._refreshing:
+                self._pending.append((int(doc_id), procesado))
+            self._apply_locked(int(doc_id), procesado)
+
+    def _apply_locked(self, doc_id: int, procesado: bool) -> None:
+        pos = int(np.searchsorted(self._ids, doc_id))
+        present = pos < len(self._ids) and self._ids[pos] == doc_id
+        if procesado and not present:
+            self._ids = np.insert(self._ids, pos, doc_id)
+        elif not procesado and present:
+            self._ids = np.delete(self._ids, pos)
+
+    def invalidate(self) -> None:
+        """Fuerza un refresco completo en la próxima consulta."""
+        with self._lock:
+            self._loaded_at = 0.0
+
+    # ================================
+    # LISTENER PUB/SUB
+    # ================================
+
+    def _start_listener(self) -> None:
+        if self._listener_thread is not None:
+            return
+        with self._lock:
+            if self._listener_thread is not None:
+                return
+            self._listener_thread = threading.Thread(
+                target=self._listen_loop,
+                name="processed-ids-listener",
+                daemon=True,
+            )
+            self._listener_thread.start()
+
+    def _listen_loop(self) -> None:
+        from app.db.redis_client import get_redis_client
+
+        while True:
+            pubsub = None
+            try:
+                pubsub = get_redis_client().pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(self.channel)
+                self._listener_alive = True
+                # Mensajes perdidos mientras no había suscripción
+                self.invalidate()
+                logger.info(f"Escuchando cambios de estado en canal '{self.channel}'")
+
+                while True:
+                    message = pubsub.get_message(timeout=1.0)
+                    if message and message.get("type") == "message":
+                        self._handle_message(message.get("data"))
+            except Exception as e:
+                if self._listener_alive:
+                    logger.warning(f"Listener de estados desconectado: {e}")
+                self._listener_alive = False
+                time.sleep(self.fallback_ttl_seconds)
+            finally:
+                if pubsub is not None:
+                    try:
+                        pubsub.close()
+                    except Exception:
+                        pass
+
+    def _handle_message(self, data) -> None:
+        try:
+            payload = json.loads(data)
+            self.apply_change(int(payload["id_documento"]), bool(payload["procesado"]))
+        except Exception as e:
+            logger.warning(f"Mensaje de estado inválido en '{self.channel}': {e}")
+
+
+def _load_processed_ids(db=None) -> Iterable[int]:
+    """
+    Consulta los IDs procesados usando el repository centralizado.
+    Crea sesión temporal si no se proporciona db.
+    """
+    from app.repositories.documento_repository import DocumentoRepository
+
+    db_creada = False
+    if db is None:
+        from app.db.database import get_db
+        db = next(get_db())
+        db_creada = True
+
+    try:
+        return DocumentoRepository().obtener_ids_procesados(db)
+    finally:
+        if db_creada:
+            db.close()
+
+
+_cache: Optional[ProcessedIdsCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_processed_ids_cache() -> ProcessedIdsCache:
+    """Obtiene la instancia singleton del caché para el proceso actual."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ProcessedIdsCache()
+    return _cache
+
+
+def notificar_cambio_estado(documento_id: int, procesado: bool) -> None:
+    """
+    Publica un cambio de estado para los cachés de todos los procesos.
+
+    También lo aplica al caché local si ya fue creado. Los errores de Redis
+    se registran sin propagarse (el refresco periódico corrige el conjunto).
+
+    Args:
+        documento_id: ID del documento
+        procesado: True si entró al estado 'Procesado', False si salió
+    """
+    if _cache is not None:
+        _cache.apply_change(documento_id, procesado)
+
+    try:
+        from app.db.redis_client import get_redis_client
+
+        get_redis_client().publish(
+            vectorstore_config.PROCESSED_IDS_CHANNEL,
+            json.dumps({"id_documento": int(documento_id), "procesado": bool(procesado)}),
+        )
+    except Exception as e:
+        logger.warning(f"No se pudo publicar cambio de estado del documento {documento_id}: {e}")
@@ -0,0 +1,213 @@
+"""
+Comparación de recall, latencia y memoria entre dos colecciones Milvus.
+
+Mide el efecto de la precisión reducida (VECTOR_DTYPE) y de los índices
+cuantizados (ivf_sq8, ivf_pq) sobre el top-k, comparando una colección
+candidata contra una de referencia con los mismos chunks (p. ej. la
+colección float32 original y su copia creada con app.vectorstore.migracion).
+
+Método:
+    ```
+    N chunks de la referencia (embeddings como consultas)
+                ↓
+    Verdad de referencia: similitud coseno exacta en la colección de referencia
+    (índice con esfuerzo "similar" + re-ranking exacto de K * multiplicador candidatos)
+                ↓
+    Búsqueda en la candidata con el perfil y re-ranking de producción
+                ↓
+    recall@k = |top-k candidata ∩ top-k referencia| / k (promedio)
+    ```
+
+Reporte por colección:
+    * Tipo del campo embedding y perfil de índice
+    * Memoria estimada de los vectores (filas x DIM x bytes por dimensión)
+    * Tiempo de carga (release + load_collection, opcional con --measure-load)
+    * Latencia media y p95 de búsqueda
+
+Uso:
+    ```
+    python -m app.vectorstore.recall justicia_docs justicia_docs_fp16 --queries 200 --top-k 10
+    ```
+
+Note:
+    * Solo lectura: no modifica ninguna colección (--measure-load las libera y
+      vuelve a cargar; las búsquedas de la API fallan mientras tanto)
+    * Las consultas son chunks almacenados: el propio chunk aparece en ambos top-k
+
+Ver también:
+    * app.vectorstore.vector_codec: Codificación y re-ranking exacto
+    * app.vectorstore.index_profiles: Perfiles de índice y parámetros de búsqueda
+"""
+import argparse
+import logging
+import time
+from typing import Any, Dict, List
+
+import numpy as np
+from pymilvus import MilvusClient
+
+from app.config.config import MILVUS_URI, MILVUS_TOKEN, MILVUS_DB_NAME
+from app.config.vectorstore_config import vectorstore_config
+from app.vectorstore.index_profiles import profile_for_index_type, build_search_params, rerank_candidates
+from app.vectorstore.vector_codec import (
+    BYTES_PER_DIM, encode_vector, decode_vector, rerank_by_cosine, vector_dtype_name, hit_fields
+)
+
+logger = logging.getLogger(__name__)
+
+
+def _describe(client: MilvusClient, collection_name: str) -> Dict[str, Any]:
+    """Tipo de vector, dimensión, perfil de índice y filas de una colección."""
+    fields = {field["name"]: field for field in client.describe_collection(collection_name)["fields"]}
+    embedding = fields.get("embedding", {})
+    dim = int(embedding.get("params", {}).get("dim", 0))
+    dtype = vector_dtype_name(embedding.get("type"))
+
+    profile = None
+    index_names = client.list_indexes(collection_name=collection_name, field_name="embedding")
+    if index_names:
+        description = client.describe_index(collection_name=collection_name, index_name=index_names[0])
+        profile = profile_for_index_type(description.get("index_type"))
+
+    rows = int(client.get_collection_stats(collection_name).get("row_count", 0))
+    return {
+        "collection": collection_name,
+        "vector_dtype": dtype,
+        "dim": dim,
+        "profile": profile,
+        "rows": rows,
+        "vector_memory_mb": rows * dim * BYTES_PER_DIM[dtype] / (1024 * 1024),
+    }
+
+
+def _measure_load(client: MilvusClient, collection_name: str) -> float:
+    client.release_collection(collection_name=collection_name)
+    start = time.perf_counter()
+    client.load_collection(collection_name=collection_name, timeout=vectorstore_config.MILVUS_WRITE_TIMEOUT)
+    return time.perf_counter() - start
+
+
+def _search_ids(
+    client: MilvusClient, info: Dict[str, Any], query: np.ndarray, top_k: int, request_type: str
+) -> List[str]:
+    """Top-k de id_chunk con el perfil de la colección y re-ranking exacto si corresponde."""
+    candidates = rerank_candidates(info["profile"], top_k)
+    if request_type == "similar":
+        # Referencia: siempre re-ranking exacto sobre un conjunto amplio de candidatos
+        candidates = top_k * max(2, vectorstore_config.VECTOR_RERANK_MULTIPLIER)
+
+    results = client.search(
+        collection_name=info["collection"],
+        data=[encode_vector(query, info["vector_dtype"])],
+        anns_field="embedding",
+        limit=candidates,
+        search_params=build_search_params(info["profile"], request_type, candidates),
+        output_fields=["id_chunk"] + (["embedding"] if candidates > top_k else []),
+    )
+    hits = list(results[0]) if results else []
+    if candidates > top_k:
+        ranked = rerank_by_cosine(
+            query, hits, lambda hit: hit_fields(hit).get("embedding"), top_k, info["vector_dtype"]
+        )
+        hits = [hit for hit, _ in ranked]
+    return [hit_fields(hit).get("id_chunk") for hit in hits[:top_k]]
+
+
+def comparar_colecciones(
+    referencia: str, candidata: str, queries: int = 100, top_k: int = 10, measure_load: bool = False
+) -> Dict[str, Any]:
+    """
+    Compara el top-k de una colección candidata contra la de referencia.
+
+    Args:
+        referencia: Colección de referencia (normalmente float32)
+        candidata: Colección a evaluar (float16 / bfloat16 / índice cuantizado)
+        queries: Cantidad de chunks usados como consultas
+        top_k: Resultados comparados por consulta
+        measure_load: Medir el tiempo de carga de cada colección
+
+    Returns:
+        Dict con recall@k, latencias y la descripción de ambas colecciones
+    """
+    client = MilvusClient(uri=MILVUS_URI, token=MILVUS_TOKEN, db_name=MILVUS_DB_NAME)
+
+    infos = {name: _describe(client, name) for name in (referencia, candidata)}
+    for name, info in infos.items():
+        info["load_seconds"] = _measure_load(client, name) if measure_load else None
+        client.load_collection(collection_name=name)
+
+    ref_info = infos[referencia]
+    sample = client.query(
+        collection_name=referencia,
+        filter='id_chunk != ""',
+        output_fields=["embedding"],
+        limit=queries,
+    )
+    query_vectors = [decode_vector(row.get("embedding"), ref_info["vector_dtype"]) for row in sample]
+    query_vectors = [vector for vector in query_vectors if vector.size]
+
+    recalls = []
+    latencies = {referencia: [], candidata: []}
+    for query in query_vectors:
+        start = time.perf_counter()
+        expected = _search_ids(client, ref_info, query, top_k, "similar")
+        latencies[referencia].append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        found = _search_ids(client, infos[candidata], query, top_k, "rag")
+        latencies[candidata].append(time.perf_counter() - start)
+
+        if expected:
+            recalls.append(len(set(expected) & set(found)) / len(expected))
+
+    for name, values in latencies.items():
+        infos[name]["latency_ms_mean"] = float(np.mean(values) * 1000) if values else None
+        infos[name]["latency_ms_p95"] = float(np.percentile(values, 95) * 1000) if values else None
+
+    return {
+        "queries": len(query_vectors),
+        "top_k": top_k,
+        "recall": float(np.mean(recalls)) if recalls else None,
+        "referencia": infos[referencia],
+        "candidata": infos[candidata],
+    }
+
+
+def _print_report(report: Dict[str, Any]) -> None:
+    print(f"\n=== RECALL@{report['top_k']} ({report['queries']} consultas) ===")
+    recall = report["recall"]
+    print(f"Recall: {recall:.4f}" if recall is not None else "Recall: sin consultas")
+
+    for role in ("referencia", "candidata"):
+        info = report[role]
+        profile = info["profile"]["name"] if info["profile"] else "desconocido"
+        print(f"\n--- {role.upper()}: {info['collection']} ---")
+        print(f"Vectores: {info['vector_dtype']} x {info['dim']} dims, índice {profile}")
+        print(f"Filas: {info['rows']}  Memoria de vectores (estimada): {info['vector_memory_mb']:.1f} MB")
+        if info["load_seconds"] is not None:
+            print(f"Carga: {info['load_seconds']:.2f}s")
+        if info["latency_ms_mean"] is not None:
+            print(f"Latencia: media {info['latency_ms_mean']:.1f} ms, p95 {info['latency_ms_p95']:.1f} ms")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Compara recall@k, latencia y memoria entre dos colecciones Milvus"
+    )
+    parser.add_argument("referencia", help="Colección de referencia (float32)")
+    parser.add_argument("candidata", help="Colección a evaluar")
+    parser.add_argument("--queries", type=int, default=100, help="Chunks usados como consultas")
+    parser.add_argument("--top-k", type=int, default=10, help="Resultados comparados por consulta")
+    parser.add_argument(
+        "--measure-load", action="store_true", help="Medir tiempo de carga (libera y recarga las colecciones)"
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    _print_report(comparar_colecciones(
+        args.referencia, args.candidata, queries=args.queries, top_k=args.top_k, measure_load=args.measure_load
+    ))
+
+
+if __name__ == "__main__":
+    main()
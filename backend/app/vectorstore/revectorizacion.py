@@ -0,0 +1,532 @@
+"""
+Re-vectorización de la colección con otro modelo de embeddings (sin downtime).
+
+Cambiar EMBEDDING_MODEL (o DIM) obligaba a vaciar la colección y re-ingestar
+todo (Tika, Whisper, chunking). Este job re-vectoriza el texto ya almacenado
+en Milvus hacia una colección sombra y, al terminar, mueve el alias de la
+colección activa en una sola operación.
+
+Flujo:
+    ```
+    1. run: colección sombra con el schema del origen y la dimensión del modelo nuevo
+            ↓
+       query_iterator del origen por id_chunk > último procesado (orden de PK)
+            ↓
+       texto → modelo nuevo (lotes por longitud) → upsert en la sombra
+            ↓
+       progreso en Redis (revectorizacion:{destino}) tras cada lote
+    2. Sincronización: chunks vectorizados en el origen desde el inicio del job,
+       chunks eliminados y cambios de "procesado" ocurridos mientras tanto
+    3. swap: sincronización final + alias COLLECTION_NAME → colección sombra
+       (alter_alias, atómico en Milvus)
+    ```
+
+    * Reanudable: si el proceso se interrumpe, run continúa desde el último
+      id_chunk confirmado; el upsert hace idempotente el lote repetido
+    * La colección origen no se modifica: volver atrás es mover el alias
+    * Modelo por colección registrado en Redis (embeddings:modelo:{coleccion});
+      la API advierte al iniciar si no coincide con EMBEDDING_MODEL
+
+Uso:
+    ```
+    # Horas de trabajo en segundo plano con la API y la ingesta funcionando
+    nohup python -m app.vectorstore.revectorizacion run justicia_docs justicia_docs_v2 \\
+        --model BAAI/bge-m3 &
+    python -m app.vectorstore.revectorizacion status justicia_docs_v2
+
+    # Al desplegar el modelo nuevo (EMBEDDING_MODEL/DIM) en API y workers
+    python -m app.vectorstore.revectorizacion swap justicia_docs_v2 --alias justicia_docs
+    ```
+
+Note:
+    * Si COLLECTION_NAME es todavía una colección física (no un alias), el swap
+      la renombra a {nombre}_{fecha} y crea el alias con su nombre: las
+      llamadas en curso durante esos milisegundos pueden fallar
+    * API y workers deben reiniciarse con EMBEDDING_MODEL/DIM del modelo nuevo
+      junto con el swap: las consultas se vectorizan con el modelo del proceso
+    * La sincronización compara id_chunk/procesado de ambas colecciones en
+      memoria (~150 MB por millón de chunks)
+    * Revisar el truncamiento con el modelo nuevo: python -m app.vectorstore.chunking --report
+
+Ver también:
+    * app.vectorstore.migracion: Copia sin re-vectorizar (cambios de schema)
+    * app.vectorstore.schema.build_collection_schema: Schema de la sombra
+    * app.embeddings.embeddings.load_model: Carga del modelo nuevo
+"""
+import argparse
+import json
+import logging
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from pymilvus import MilvusClient
+
+from app.config.config import MILVUS_URI, MILVUS_TOKEN, MILVUS_DB_NAME, COLLECTION_NAME
+from app.config.vectorstore_config import vectorstore_config
+from app.db.redis_client import get_redis_client
+from app.vectorstore.schema import build_collection_schema, SPARSE_FIELD
+from app.vectorstore.vectorstore import create_collection_with_indexes
+from app.vectorstore.vector_codec import VECTOR_DTYPES, encode_vector, decode_vector, vector_dtype_name
+from app.vectorstore.index_profiles import INDEX_PROFILES
+from app.vectorstore.processed_ids_cache import _load_processed_ids
+
+logger = logging.getLogger(__name__)
+
+_PROGRESS_PREFIX = "revectorizacion:"
+_MODEL_PREFIX = "embeddings:modelo:"
+
+# Margen al sincronizar cambios: fecha_vectorizacion la fija el proceso de ingesta
+_SYNC_MARGIN_MS = 60_000
+
+_MAX_IDS_PER_FILTER = 1000
+
+
+# ================================
+# REGISTRO DE MODELO Y PROGRESO (REDIS)
+# ================================
+
+
+def resolver_coleccion(client: MilvusClient, nombre: str) -> str:
+    """Colección física detrás de un alias (o el mismo nombre si no es alias)."""
+    try:
+        return client.describe_alias(alias=nombre)["collection_name"]
+    except Exception:
+        return nombre
+
+
+def registrar_modelo(coleccion: str, modelo: str) -> None:
+    """Registra el modelo de embeddings con el que se vectorizó una colección física."""
+    get_redis_client().set(_MODEL_PREFIX + coleccion, modelo)
+
+
+def modelo_registrado(coleccion: str) -> Optional[str]:
+    """Modelo registrado para una colección física (None si no hay registro)."""
+    return get_redis_client().get(_MODEL_PREFIX + coleccion)
+
+
+def obtener_progreso(destino: str) -> Dict[str, Any]:
+    """Progreso de la re-vectorización hacia destino ({} si no existe)."""
+    progreso = get_redis_client().hgetall(_PROGRESS_PREFIX + destino)
+    for key in ("procesados", "total", "inicio_ms", "actualizado_ms", "sincronizado_ms", "dim"):
+        if key in progreso:
+            progreso[key] = int(progreso[key])
+    return progreso
+
+
+def _guardar_progreso(destino: str, **campos) -> None:
+    campos["actualizado_ms"] = int(time.time() * 1000)
+    get_redis_client().hset(
+        _PROGRESS_PREFIX + destino,
+        mapping={key: value if isinstance(value, (str, int, float)) else json.dumps(value) for key, value in campos.items()},
+    )
+
+
+# ================================
+# COPIA CON EL MODELO NUEVO
+# ================================
+
+
+def _client() -> MilvusClient:
+    return MilvusClient(uri=MILVUS_URI, token=MILVUS_TOKEN, db_name=MILVUS_DB_NAME)
+
+
+def _describe_fields(client: MilvusClient, coleccion: str) -> Dict[str, Dict[str, Any]]:
+    return {field["name"]: field for field in client.describe_collection(coleccion)["fields"]}
+
+
+def _load_encoder(modelo: str):
+    """Modelo nuevo en el pool de inferencia (independiente del modelo del proceso)."""
+    from app.embeddings.embeddings import EmbeddingsWrapper, load_model
+
+    model = load_model(model_id=modelo)
+    return EmbeddingsWrapper(model), model.get_sentence_embedding_dimension()
+
+
+def _processed_ids_if_legacy(source_fields, target_fields) -> Optional[set]:
+    """Origen legacy sin campo "procesado": estado desde la BD (como en la migración)."""
+    if "procesado" in target_fields and "procesado" not in source_fields:
+        return set(_load_processed_ids())
+    return None
+
+
+def _embed_rows(
+    encoder,
+    rows: List[Dict[str, Any]],
+    target_fields: set,
+    vector_dtype: str,
+    processed_ids: Optional[set] = None,
+) -> List[Dict[str, Any]]:
+    """Vectoriza el texto almacenado de cada fila con el modelo nuevo."""
+    from app.embeddings.document_batcher import length_bucketed_batches
+
+    texts = [row.get("texto") or "" for row in rows]
+    vectors: List[Any] = [None] * len(rows)
+    for batch in length_bucketed_batches(texts):
+        for i, vector in zip(batch, encoder.embed_documents([texts[i] for i in batch])):
+            vectors[i] = vector
+
+    now_ms = int(time.time() * 1000)
+    data = []
+    for row, vector in zip(rows, vectors):
+        item = {key: value for key, value in row.items() if key in target_fields}
+        item["embedding"] = encode_vector(vector, vector_dtype)
+        if "fecha_vectorizacion" in target_fields:
+            item["fecha_vectorizacion"] = now_ms
+        if processed_ids is not None:
+            item["procesado"] = row.get("id_documento") in processed_ids
+        data.append(item)
+    return data
+
+
+def revectorizar_coleccion(
+    origen: str,
+    destino: str,
+    modelo: str,
+    batch_size: int = 256,
+    index_profile: Optional[str] = None,
+    vector_dtype: Optional[str] = None,
+) -> int:
+    """
+    Re-vectoriza todos los chunks de origen con otro modelo en una colección sombra.
+
+    Args:
+        origen: Colección (o alias) con los chunks actuales
+        destino: Colección sombra; si existe debe tener progreso de una ejecución previa
+        modelo: Modelo de embeddings nuevo (id de HuggingFace o ruta local)
+        batch_size: Chunks por lote de lectura/upsert
+        index_profile: Perfil del índice de la sombra (None = VECTOR_INDEX_PROFILE)
+        vector_dtype: Precisión del embedding en la sombra (None = la del origen)
+
+    Returns:
+        int: Chunks re-vectorizados en esta ejecución
+
+    Raises:
+        ValueError: Si el origen no existe, o el destino existe sin progreso o
+            con otro origen/modelo
+    """
+    client = _client()
+    if not client.has_collection(origen):
+        raise ValueError(f"La colección origen '{origen}' no existe")
+    origen = resolver_coleccion(client, origen)
+
+    source_fields = _describe_fields(client, origen)
+    source_dtype = vector_dtype_name(source_fields.get("embedding", {}).get("type"))
+    vector_dtype = vector_dtype or source_dtype
+
+    progreso = obtener_progreso(destino)
+    if client.has_collection(destino):
+        if not progreso:
+            raise ValueError(f"La colección destino '{destino}' ya existe y no tiene progreso de re-vectorización")
+        if progreso.get("origen") != origen or progreso.get("modelo") != modelo:
+            raise ValueError(
+                f"'{destino}' corresponde a {progreso.get('origen')} con {progreso.get('modelo')}, "
+                f"no a {origen} con {modelo}"
+            )
+
+    encoder, dim = _load_encoder(modelo)
+
+    if not client.has_collection(destino):
+        partition_key = next(
+            (name for name, field in source_fields.items() if field.get("is_partition_key")), None
+        )
+        schema = build_collection_schema(
+            enable_bm25=SPARSE_FIELD in source_fields,
+            partition_key=partition_key,
+            vector_dtype=vector_dtype,
+            dim=dim,
+        )
+        create_collection_with_indexes(client, destino, schema=schema, index_profile=index_profile)
+        progreso = {"ultimo_id": "", "procesados": 0, "inicio_ms": int(time.time() * 1000)}
+        _guardar_progreso(
+            destino, origen=origen, modelo=modelo, dim=dim, estado="en_curso", **progreso
+        )
+        logger.info(f"Colección sombra {destino} creada (dim={dim}, embedding {vector_dtype})")
+
+    target_fields = set(_describe_fields(client, destino)) - {SPARSE_FIELD}
+    output_fields = sorted((set(source_fields) - {SPARSE_FIELD, "embedding"}) & target_fields)
+    processed_ids = _processed_ids_if_legacy(source_fields, target_fields)
+
+    client.load_collection(collection_name=origen)
+    total = client.get_collection_stats(origen).get("row_count", 0)
+    ultimo_id = progreso.get("ultimo_id", "")
+    procesados = int(progreso.get("procesados", 0))
+    _guardar_progreso(destino, estado="en_curso", total=total)
+    logger.info(
+        f"Re-vectorizando {origen} → {destino} con {modelo}: "
+        f"{procesados}/{total} ya procesados, reanudando desde id_chunk > '{ultimo_id}'"
+    )
+
+    # query_iterator pagina por clave primaria: reanudar con id_chunk > último confirmado
+    iterator = client.query_iterator(
+        collection_name=origen,
+        batch_size=batch_size,
+        filter=f'id_chunk > "{ultimo_id}"',
+        output_fields=output_fields,
+    )
+
+    copiados = 0
+    inicio = time.perf_counter()
+    try:
+        while True:
+            batch = iterator.next()
+            if not batch:
+                break
+
+            client.upsert(
+                collection_name=destino,
+                data=_embed_rows(encoder, batch, target_fields, vector_dtype, processed_ids),
+                timeout=vectorstore_config.MILVUS_WRITE_TIMEOUT,
+            )
+            copiados += len(batch)
+            procesados += len(batch)
+            ultimo_id = max(row["id_chunk"] for row in batch)
+            _guardar_progreso(destino, ultimo_id=ultimo_id, procesados=procesados)
+
+            rate = copiados / max(time.perf_counter() - inicio, 1e-6)
+            logger.info(f"  {procesados}/{total} chunks ({rate:.1f}/s)")
+    except Exception as e:
+        _guardar_progreso(destino, estado="error", error=str(e))
+        raise
+    finally:
+        iterator.close()
+
+    sincronizar_cambios(destino, client=client, encoder=encoder)
+    registrar_modelo(destino, modelo)
+    _guardar_progreso(destino, estado="listo")
+    logger.info(
+        f"Re-vectorización completada: {copiados} chunks en {time.perf_counter() - inicio:.1f}s. "
+        f"Ejecutar swap al desplegar {modelo}"
+    )
+    return copiados
+
+
+# ================================
+# SINCRONIZACIÓN CON EL ORIGEN
+# ================================
+
+
+def _scan(client: MilvusClient, coleccion: str, output_fields: List[str], filtro: str = 'id_chunk != ""'):
+    iterator = client.query_iterator(
+        collection_name=coleccion, batch_size=1000, filter=filtro, output_fields=output_fields
+    )
+    try:
+        while True:
+            batch = iterator.next()
+            if not batch:
+                return
+            yield from batch
+    finally:
+        iterator.close()
+
+
+def _id_filter(ids: List[str]) -> str:
+    return "id_chunk in [" + ", ".join(f'"{chunk_id}"' for chunk_id in ids) + "]"
+
+
+def sincronizar_cambios(destino: str, client: Optional[MilvusClient] = None, encoder=None) -> Dict[str, int]:
+    """
+    Aplica en la sombra los cambios del origen ocurridos durante la re-vectorización.
+
+    * Chunks vectorizados en el origen desde la última sincronización: se re-vectorizan
+    * Chunks que ya no están en el origen: se eliminan
+    * Valor de "procesado" distinto al del origen: se corrige
+
+    Args:
+        destino: Colección sombra (con progreso en Redis)
+        client: Cliente Milvus (None = nuevo)
+        encoder: Modelo ya cargado (None = se carga el registrado en el progreso)
+
+    Returns:
+        {"revectorizados": n, "eliminados": n, "estado_actualizado": n}
+    """
+    progreso = obtener_progreso(destino)
+    if not progreso:
+        raise ValueError(f"Sin progreso de re-vectorización para '{destino}'")
+
+    client = client or _client()
+    origen = progreso["origen"]
+    if encoder is None:
+        encoder, _ = _load_encoder(progreso["modelo"])
+
+    source_fields = _describe_fields(client, origen)
+    target_description = _describe_fields(client, destino)
+    target_fields = set(target_description) - {SPARSE_FIELD}
+    target_dtype = vector_dtype_name(target_description["embedding"]["type"])
+    output_fields = sorted((set(source_fields) - {SPARSE_FIELD, "embedding"}) & target_fields)
+    desde_ms = progreso.get("sincronizado_ms", progreso["inicio_ms"]) - _SYNC_MARGIN_MS
+    inicio_sync_ms = int(time.time() * 1000)
+    _guardar_progreso(destino, estado="sincronizando")
+
+    processed_ids = _processed_ids_if_legacy(source_fields, target_fields)
+
+    def upsert_embedded(rows):
+        client.upsert(
+            collection_name=destino,
+            data=_embed_rows(encoder, rows, target_fields, target_dtype, processed_ids),
+            timeout=vectorstore_config.MILVUS_WRITE_TIMEOUT,
+        )
+
+    # 1. Chunks nuevos o re-ingestados en el origen
+    revectorizados = 0
+    pendientes: List[Dict[str, Any]] = []
+    if "fecha_vectorizacion" in source_fields:
+        for row in _scan(client, origen, output_fields, f"fecha_vectorizacion >= {desde_ms}"):
+            pendientes.append(row)
+            if len(pendientes) >= 256:
+                upsert_embedded(pendientes)
+                revectorizados += len(pendientes)
+                pendientes = []
+        if pendientes:
+            upsert_embedded(pendientes)
+            revectorizados += len(pendientes)
+
+    # 2. Eliminados y cambios de estado (id_chunk → procesado en ambas colecciones)
+    with_status = "procesado" in target_fields
+    if processed_ids is not None:
+        source_status_fields = ["id_chunk", "id_documento"]
+    else:
+        source_status_fields = ["id_chunk"] + (["procesado"] if "procesado" in source_fields else [])
+
+    def estado_origen(row):
+        if processed_ids is not None:
+            return row.get("id_documento") in processed_ids
+        return row.get("procesado")
+
+    origen_estado = {row["id_chunk"]: estado_origen(row) for row in _scan(client, origen, source_status_fields)}
+    eliminar: List[str] = []
+    corregir: Dict[str, Any] = {}
+    for row in _scan(client, destino, ["id_chunk", "procesado"] if with_status else ["id_chunk"]):
+        chunk_id = row["id_chunk"]
+        if chunk_id not in origen_estado:
+            eliminar.append(chunk_id)
+        elif with_status and row.get("procesado") != origen_estado[chunk_id]:
+            corregir[chunk_id] = origen_estado[chunk_id]
+    del origen_estado
+
+    for i in range(0, len(eliminar), _MAX_IDS_PER_FILTER):
+        client.delete(collection_name=destino, ids=eliminar[i:i + _MAX_IDS_PER_FILTER])
+
+    # Milvus no actualiza un solo campo: se reescriben las filas completas
+    ids_corregir = list(corregir)
+    for i in range(0, len(ids_corregir), _MAX_IDS_PER_FILTER):
+        filas = client.query(
+            collection_name=destino,
+            filter=_id_filter(ids_corregir[i:i + _MAX_IDS_PER_FILTER]),
+            output_fields=sorted(target_fields),
+        )
+        for fila in filas:
+            fila["procesado"] = corregir[fila["id_chunk"]]
+            fila["embedding"] = encode_vector(decode_vector(fila["embedding"], target_dtype), target_dtype)
+        if filas:
+            client.upsert(collection_name=destino, data=filas, timeout=vectorstore_config.MILVUS_WRITE_TIMEOUT)
+
+    client.flush(collection_name=destino)
+    resultado = {"revectorizados": revectorizados, "eliminados": len(eliminar), "estado_actualizado": len(corregir)}
+    _guardar_progreso(destino, sincronizado_ms=inicio_sync_ms, estado="listo", ultima_sincronizacion=resultado)
+    logger.info(f"Sincronización {origen} → {destino}: {resultado}")
+    return resultado
+
+
+# ================================
+# CAMBIO DE ALIAS
+# ================================
+
+
+def intercambiar_alias(destino: str, alias: str = COLLECTION_NAME, sincronizar: bool = True) -> Dict[str, Any]:
+    """
+    Apunta el alias de la colección activa a la colección re-vectorizada.
+
+    Args:
+        destino: Colección sombra lista
+        alias: Nombre usado por la aplicación (COLLECTION_NAME)
+        sincronizar: Aplicar antes los cambios pendientes del origen
+
+    Returns:
+        {"alias": alias, "anterior": colección previa, "actual": destino}
+
+    Raises:
+        ValueError: Si la re-vectorización hacia destino no terminó
+    """
+    progreso = obtener_progreso(destino)
+    if progreso.get("estado") not in ("listo", "intercambiado"):
+        raise ValueError(f"La re-vectorización hacia '{destino}' no está lista (estado={progreso.get('estado')})")
+
+    client = _client()
+    if sincronizar:
+        sincronizar_cambios(destino, client=client)
+
+    client.load_collection(collection_name=destino)
+    anterior = resolver_coleccion(client, alias)
+
+    if anterior != alias:
+        # Alias existente: cambio atómico
+        client.alter_alias(collection_name=destino, alias=alias)
+    elif client.has_collection(alias):
+        # Primera vez: la colección activa es física y ocupa el nombre del alias
+        anterior = f"{alias}_{datetime.now():%Y%m%d%H%M}"
+        logger.warning(f"'{alias}' es una colección física: se renombra a '{anterior}' y se crea el alias")
+        client.rename_collection(old_name=alias, new_name=anterior)
+        client.create_alias(collection_name=destino, alias=alias)
+        registro = modelo_registrado(alias)
+        if registro:
+            registrar_modelo(anterior, registro)
+    else:
+        anterior = None
+        client.create_alias(collection_name=destino, alias=alias)
+
+    _guardar_progreso(destino, estado="intercambiado", alias=alias, anterior=anterior or "")
+
+    from app.services.RAG.retrieval_cache import bump_corpus_version
+    bump_corpus_version()
+    logger.info(
+        f"Alias '{alias}' → '{destino}' (anterior: {anterior}). "
+        f"Reiniciar API y workers con EMBEDDING_MODEL={progreso.get('modelo')} y DIM={progreso.get('dim')}"
+    )
+    return {"alias": alias, "anterior": anterior, "actual": destino}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Re-vectorización de la colección con otro modelo de embeddings")
+    subparsers = parser.add_subparsers(dest="comando", required=True)
+
+    run = subparsers.add_parser("run", help="Re-vectorizar (reanuda si hay progreso)")
+    run.add_argument("origen", help="Colección o alias actual")
+    run.add_argument("destino", help="Colección sombra")
+    run.add_argument("--model", required=True, help="Modelo de embeddings nuevo")
+    run.add_argument("--batch-size", type=int, default=256, help="Chunks por lote")
+    run.add_argument("--index-profile", choices=sorted(INDEX_PROFILES), default=None, help="Perfil del índice de la sombra")
+    run.add_argument("--vector-dtype", choices=list(VECTOR_DTYPES), default=None, help="Precisión (default: la del origen)")
+    run.add_argument("--swap", action="store_true", help="Mover el alias al terminar")
+    run.add_argument("--alias", default=COLLECTION_NAME, help="Alias de la colección activa (default: COLLECTION_NAME)")
+
+    sync = subparsers.add_parser("sync", help="Aplicar en la sombra los cambios del origen")
+    sync.add_argument("destino")
+
+    swap = subparsers.add_parser("swap", help="Sincronizar y mover el alias a la sombra")
+    swap.add_argument("destino")
+    swap.add_argument("--alias", default=COLLECTION_NAME, help="Alias de la colección activa (default: COLLECTION_NAME)")
+
+    status = subparsers.add_parser("status", help="Progreso de una re-vectorización")
+    status.add_argument("destino")
+
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+
+    if args.comando == "run":
+        revectorizar_coleccion(
+            args.origen, args.destino, args.model,
+            batch_size=args.batch_size, index_profile=args.index_profile, vector_dtype=args.vector_dtype,
+        )
+        if args.swap:
+            intercambiar_alias(args.destino, alias=args.alias, sincronizar=False)
+    elif args.comando == "sync":
+        sincronizar_cambios(args.destino)
+    elif args.comando == "swap":
+        intercambiar_alias(args.destino, alias=args.alias)
+    else:
+        print(json.dumps(obtener_progreso(args.destino), indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
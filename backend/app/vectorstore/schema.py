@@ -10,7 +10,9 @@ Estructura de campos:
     * Referencias documentos: id_documento, nombre_archivo, tipo_archivo, fecha_carga
     * Datos RAG: texto, embedding, indice_chunk, paginas, tipo_documento
     * Timestamps: fecha_vectorizacion
+    * Estado: procesado (BOOL, filtro de búsquedas)
     * Metadata flexible: meta (JSON)
+    * Léxico (opcional): texto_sparse (SPARSE_FLOAT_VECTOR, BM25 sobre texto)
 
 Campos clave:
     * id_chunk: UUID único del chunk (PRIMARY KEY)
@@ -19,16 +21,36 @@ Campos clave:
     * texto: Contenido del chunk (máx 8192 chars)
     * embedding: Vector BGE-M3 (DIM dimensiones)
     * meta: JSON flexible para extensiones
+    * procesado: Sincronizado por la ingesta; las búsquedas filtran procesado == true
+    * texto_sparse: Generado por Milvus con una Function BM25 al insertar (no se
+      envía desde la ingesta); habilita la búsqueda híbrida densa + léxica
 
 DataTypes:
     * VARCHAR: Strings con max_length definido
     * INT64/INT32: Enteros de diferentes tamaños
+    * BOOL: Estado de procesamiento
     * FLOAT_VECTOR: Vector de embeddings con dimensión DIM
+    * FLOAT16_VECTOR / BFLOAT16_VECTOR: Embeddings de 16 bits (VECTOR_DTYPE, mitad de memoria)
+    * SPARSE_FLOAT_VECTOR: Pesos BM25 por término (opcional)
     * JSON: Metadata flexible (schema-less)
 
 Índices (creados en vectorstore.py):
     * embedding: HNSW para búsqueda vectorial (COSINE)
     * Campos escalares: STL_SORT para filtros rápidos
+    * procesado: INVERTED para el filtro de estado
+    * texto_sparse: SPARSE_INVERTED_INDEX con métrica BM25 (opcional)
+
+Partition key (ENABLE_PARTITION_KEY):
+    * numero_expediente (default) o id_expediente como partition key
+    * Milvus reparte los chunks en NUM_PARTITIONS particiones por hash del valor
+    * Filtros numero_expediente == "X" (RAG por expediente, similares, documento
+      completo) solo recorren la partición del expediente
+    * Colecciones existentes: migrar con python -m app.vectorstore.migracion
+
+BM25 (ENABLE_BM25):
+    * Analizador: tokenizer estándar + minúsculas + sin tildes + stop words en español
+    * Números de artículo, de expediente y nombres de partes quedan como términos
+    * Solo aplica al crear la colección; colecciones existentes requieren migración
 
 Configuraci��n:
     * DIM: Dimensión de embeddings (default 768, BGE-M3 usa 1024)
@@ -41,7 +63,7 @@ Limites:
     * numero_expediente: 64 caracteres
 
 Example:
-    >>> from app.vectorstore.schema import COLLECTION_SCHEMA, COLLECTION_FIELDS
+    >>> from app.vectorstore.schema import COLLECTION_SCHEMA, COLLECTION_FIELDS, build_collection_schema
     >>> 
     >>> # Ver campos del schema
     >>> for field in COLLECTION_FIELDS:
@@ -52,6 +74,9 @@ Example:
     ...     collection_name="mi_coleccion",
     ...     schema=COLLECTION_SCHEMA
     ... )
+    >>> 
+    >>> # Schema con campo BM25 y partition key por expediente
+    >>> schema = build_collection_schema(enable_bm25=True, partition_key="numero_expediente")
 
 Note:
     * Schema es inmutable después de crear la colección
@@ -74,8 +99,12 @@ Version:
 """
 
 import os
+from typing import Optional
 from dotenv import load_dotenv
-from pymilvus import CollectionSchema, FieldSchema, DataType
+from pymilvus import CollectionSchema, FieldSchema, DataType, Function, FunctionType
+
+from app.config.vectorstore_config import vectorstore_config
+from app.vectorstore.vector_codec import VECTOR_DTYPES
 
 
 load_dotenv()
@@ -107,8 +136,109 @@ COLLECTION_FIELDS = [
     # --- Tiempos del pipeline de IA ---
     FieldSchema(name="fecha_vectorizacion", dtype=DataType.INT64, nullable=True), # cuándo se generó el embedding (epoch ms)
 
+    # --- Estado de procesamiento (espejo de T_Documento.CN_Id_estado) ---
+    FieldSchema(name="procesado", dtype=DataType.BOOL, default_value=False),      # True solo si el documento está "Procesado"
+
     # --- Metadatos flexibles ---
     FieldSchema(name="meta", dtype=DataType.JSON, nullable=True),
 ]
 
-COLLECTION_SCHEMA = CollectionSchema(fields=COLLECTION_FIELDS)
+# --- Partition key (opcional) ---
+PARTITION_KEY_FIELDS = ("numero_expediente", "id_expediente")
+
+# --- Búsqueda léxica (BM25) ---
+SPARSE_FIELD = "texto_sparse"
+BM25_FUNCTION_NAME = "texto_bm25"
+
+# Stop words frecuentes en español (sin tildes: se aplican después de asciifolding)
+_SPANISH_STOP_WORDS = [
+    "a", "al", "ante", "con", "contra", "de", "del", "desde", "e", "el", "en", "entre",
+    "es", "esa", "ese", "esta", "este", "fue", "ha", "hay", "la", "las", "lo", "los",
+    "mas", "o", "para", "pero", "por", "que", "se", "sin", "sobre", "su", "sus", "u",
+    "un", "una", "y", "ya",
+]
+
+BM25_ANALYZER_PARAMS = {
+    "tokenizer": "standard",
+    "filter": [
+        "lowercase",
+        "asciifolding",
+        {"type": "stop", "stop_words": _SPANISH_STOP_WORDS},
+    ],
+}
+
+
+def build_collection_schema(
+    enable_bm25: bool = False,
+    partition_key: Optional[str] = None,
+    vector_dtype: str = "float32",
+    dim: Optional[int] = None,
+) -> CollectionSchema:
+    """
+    Construye el schema de la colección.
+
+    Args:
+        enable_bm25: Agrega el campo texto_sparse y la Function BM25 que lo
+            calcula a partir de texto (búsqueda híbrida)
+        partition_key: Campo usado como partition key (numero_expediente o
+            id_expediente); Milvus reparte los chunks por hash del valor y los
+            filtros por ese campo solo recorren una partición
+        vector_dtype: Precisión del campo embedding (float32 | float16 | bfloat16)
+        dim: Dimensión del campo embedding (None = DIM); la re-vectorización con
+            otro modelo crea la colección con la dimensión del modelo nuevo
+
+    Returns:
+        CollectionSchema listo para create_collection
+    """
+    if partition_key is not None and partition_key not in PARTITION_KEY_FIELDS:
+        raise ValueError(
+            f"Partition key '{partition_key}' no soportada. Opciones: {', '.join(PARTITION_KEY_FIELDS)}"
+        )
+
+    if vector_dtype not in VECTOR_DTYPES:
+        raise ValueError(
+            f"Tipo de vector '{vector_dtype}' no soportado. Opciones: {', '.join(VECTOR_DTYPES)}"
+        )
+
+    fields = []
+    for field in COLLECTION_FIELDS:
+        if field.name == "texto" and enable_bm25:
+            # La entrada de la Function BM25 debe tener analizador y no admitir nulos
+            field = FieldSchema(
+                name="texto",
+                dtype=DataType.VARCHAR,
+                max_length=8192,
+                enable_analyzer=True,
+                analyzer_params=BM25_ANALYZER_PARAMS,
+            )
+        elif field.name == "embedding":
+            field = FieldSchema(name="embedding", dtype=VECTOR_DTYPES[vector_dtype], dim=dim or DIM)
+        elif field.name == partition_key:
+            field = FieldSchema(
+                name=field.name,
+                dtype=field.dtype,
+                is_partition_key=True,
+                **field.params,
+            )
+        fields.append(field)
+
+    if not enable_bm25:
+        return CollectionSchema(fields=fields)
+
+    fields.append(FieldSchema(name=SPARSE_FIELD, dtype=DataType.SPARSE_FLOAT_VECTOR))
+
+    schema = CollectionSchema(fields=fields)
+    schema.add_function(Function(
+        name=BM25_FUNCTION_NAME,
+        function_type=FunctionType.BM25,
+        input_field_names=["texto"],
+        output_field_names=[SPARSE_FIELD],
+    ))
+    return schema
+
+
+COLLECTION_SCHEMA = build_collection_schema(
+    enable_bm25=vectorstore_config.ENABLE_BM25,
+    partition_key=vectorstore_config.PARTITION_KEY_FIELD if vectorstore_config.ENABLE_PARTITION_KEY else None,
+    vector_dtype=vectorstore_config.VECTOR_DTYPE,
+)
@@ -0,0 +1,188 @@
+"""
+Codificación de embeddings según el tipo de vector de la colección.
+
+El campo embedding puede almacenarse en precisión completa o reducida
+(VECTOR_DTYPE al crear la colección):
+
+    ```
+    Tipo        DataType Milvus      Bytes por chunk (1024 dims)
+    float32  →  FLOAT_VECTOR         4096
+    float16  →  FLOAT16_VECTOR       2048
+    bfloat16 →  BFLOAT16_VECTOR      2048
+    ```
+
+    Con 16 bits la memoria del campo y el tiempo de carga de la colección se
+    reducen a la mitad; la pérdida de precisión en similitud coseno es del
+    orden de 1e-3, menor que la del propio índice ANN.
+
+Funciones:
+    * encode_vector: float32 → formato que pymilvus acepta para el tipo del campo
+    * decode_vector: Valor leído de Milvus (lista, ndarray o bytes) → np.float32
+    * rerank_by_cosine: Re-ranking exacto de candidatos de un índice cuantizado
+    * hit_fields / hit_score: Campos de salida y score de un hit de búsqueda
+
+Note:
+    * bfloat16 en consultas requiere ml_dtypes (pymilvus no acepta bytes como
+      vector de consulta bfloat16); se importa solo cuando se usa
+    * pymilvus devuelve los vectores de 16 bits como [bytes] en query y search
+    * En pymilvus 2.5 hit.entity devuelve el propio Hit ({pk, distance,
+      entity}): los campos de salida se leen con hit_fields
+
+Ver también:
+    * app.vectorstore.schema.build_collection_schema: Tipo del campo embedding
+    * app.vectorstore.vectorstore: Codifica inserciones y consultas
+    * app.vectorstore.recall: Comparación de recall entre colecciones
+"""
+from collections.abc import Mapping
+from typing import Any, Callable, Dict, List, Sequence, Tuple
+
+import numpy as np
+from pymilvus import DataType
+
+VECTOR_DTYPES: Dict[str, DataType] = {
+    "float32": DataType.FLOAT_VECTOR,
+    "float16": DataType.FLOAT16_VECTOR,
+    "bfloat16": DataType.BFLOAT16_VECTOR,
+}
+
+BYTES_PER_DIM = {"float32": 4, "float16": 2, "bfloat16": 2}
+
+
+def vector_dtype_name(data_type: Any) -> str:
+    """Nombre (float32 | float16 | bfloat16) de un DataType de vector; float32 si no se reconoce."""
+    for name, dtype in VECTOR_DTYPES.items():
+        if data_type == dtype or data_type == int(dtype) or data_type == dtype.name:
+            return name
+    return "float32"
+
+
+def _bfloat16():
+    try:
+        import ml_dtypes
+    except ImportError as e:
+        raise RuntimeError("VECTOR_DTYPE=bfloat16 requiere el paquete ml_dtypes") from e
+    return ml_dtypes.bfloat16
+
+
+def encode_vector(vector: Sequence[float], dtype: str = "float32") -> Any:
+    """
+    Convierte un embedding al formato de inserción/consulta del campo.
+
+    Args:
+        vector: Embedding en precisión completa
+        dtype: float32 | float16 | bfloat16
+
+    Returns:
+        Lista de floats (float32) o ndarray del tipo reducido
+    """
+    if dtype == "float16":
+        return np.asarray(vector, dtype=np.float32).astype(np.float16)
+    if dtype == "bfloat16":
+        return np.asarray(vector, dtype=np.float32).astype(_bfloat16())
+    if isinstance(vector, np.ndarray):
+        return vector.astype(np.float32).tolist()
+    return vector
+
+
+def decode_vector(value: Any, dtype: str = "float32") -> np.ndarray:
+    """
+    Convierte un embedding leído de Milvus a np.float32.
+
+    Args:
+        value: Lista de floats, ndarray, bytes o [bytes] (vectores de 16 bits)
+        dtype: Tipo del campo en la colección (interpreta los bytes)
+
+    Returns:
+        np.ndarray float32 (vacío si value es None)
+    """
+    if value is None:
+        return np.empty(0, dtype=np.float32)
+    if isinstance(value, (list, tuple)) and len(value) == 1 and isinstance(value[0], (bytes, bytearray)):
+        value = value[0]
+    if isinstance(value, (bytes, bytearray)):
+        if dtype == "bfloat16":
+            # bfloat16 = 16 bits altos de un float32
+            raw = np.frombuffer(value, dtype=np.uint16).astype(np.uint32) << 16
+            return raw.view(np.float32)
+        return np.frombuffer(value, dtype=np.float16).astype(np.float32)
+    return np.asarray(value, dtype=np.float32)
+
+
+def rerank_by_cosine(
+    query_vector: Sequence[float],
+    candidates: List[Any],
+    get_vector: Callable[[Any], Any],
+    limit: int,
+    dtype: str = "float32",
+) -> List[Tuple[Any, float]]:
+    """
+    Re-ordena candidatos por similitud coseno exacta con el vector almacenado.
+
+    Corrige el error de los índices cuantizados (IVF_SQ8, IVF_PQ): el índice
+    selecciona candidatos con distancias aproximadas y aquí se recalcula la
+    similitud real contra el embedding de cada candidato.
+
+    Args:
+        query_vector: Embedding de la consulta (precisión completa)
+        candidates: Hits devueltos por Milvus
+        get_vector: Extrae el embedding almacenado de un candidato
+        limit: Resultados a conservar
+        dtype: Tipo del campo embedding
+
+    Returns:
+        Lista de (candidato, score exacto) ordenada por score descendente
+    """
+    if not candidates:
+        return []
+
+    query = np.asarray(query_vector, dtype=np.float32)
+    query_norm = np.linalg.norm(query) or 1.0
+
+    scored = []
+    for candidate in candidates:
+        stored = decode_vector(get_vector(candidate), dtype)
+        if stored.size != query.size:
+            continue
+        norm = np.linalg.norm(stored) or 1.0
+        scored.append((candidate, float(np.dot(query, stored) / (query_norm * norm))))
+
+    scored.sort(key=lambda item: item[1], reverse=True)
+    return scored[:limit]
+
+
+def hit_fields(hit: Any, pk_field: str = "id_chunk") -> Dict[str, Any]:
+    """
+    Campos de salida de un hit de client.search / client.hybrid_search.
+
+    pymilvus 2.5 devuelve cada hit como {pk, distance, entity: {campos}} y
+    hit.entity es el propio hit, así que dict(hit.entity) no contiene los
+    campos. Se leen de hit["entity"] (o hit.fields) y se agrega la clave
+    primaria, que Milvus devuelve fuera de entity.
+
+    Args:
+        hit: Hit de pymilvus (o dict con la misma forma)
+        pk_field: Nombre de la clave primaria
+
+    Returns:
+        Dict nuevo con los campos de salida (modificable por el llamador)
+    """
+    fields = hit.get("entity") if isinstance(hit, Mapping) else None
+    if not isinstance(fields, Mapping):
+        fields = getattr(hit, "fields", None)
+    if not isinstance(fields, Mapping):
+        # Versiones donde hit.entity es el diccionario de campos
+        fields = getattr(hit, "entity", None)
+    fields = dict(fields) if isinstance(fields, Mapping) else {}
+
+    if fields.get(pk_field) is None:
+        pk = hit.get(pk_field, hit.get("id")) if isinstance(hit, Mapping) else getattr(hit, "id", None)
+        if pk is not None:
+            fields[pk_field] = pk
+    return fields
+
+
+def hit_score(hit: Any) -> float:
+    """Score de un hit (distance; en COSINE es la similitud)."""
+    if isinstance(hit, Mapping) and "distance" in hit:
+        return float(hit["distance"])
+    return float(getattr(hit, "score", None) or getattr(hit, "distance", 0.0) or 0.0)
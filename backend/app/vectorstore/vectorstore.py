@@ -5,32 +5,50 @@ Proporciona interfaz unificada para todas las operaciones vectoriales del sistem
 búsqueda semántica, almacenamiento, recuperación de expedientes y estadísticas.
 
 Arquitectura dual:
-    * PyMilvus Client: Configuración, administración, queries directas
-    * LangChain Milvus: Búsquedas vectoriales, embeddings automáticos
+    * PyMilvus Client: Configuración, administración, queries, búsquedas ANN e inserción
+    * LangChain Milvus: VectorStore disponible para integraciones LangChain
+
+Acceso asíncrono:
+    * Ambos clientes son síncronos: toda llamada pasa por run_milvus
+      (app.vectorstore.milvus_executor) y se ejecuta en un pool de hilos acotado
+    * Timeout por llamada y límite de concurrencia; el event loop no se bloquea
 
 Colección Milvus:
     * Nombre: COLLECTION_NAME (config)
     * Schema: Definido en vectorstore.schema
-    * Índice vectorial: HNSW para similitud coseno
+    * Índice vectorial: perfil VECTOR_INDEX_PROFILE (HNSW por defecto) para similitud coseno
+    * Embeddings en float32 o 16 bits (VECTOR_DTYPE); índices cuantizados con
+      re-ranking exacto de candidatos (VECTOR_RERANK_MULTIPLIER)
     * Índices escalares: STL_SORT para filtros (expediente, documento, tipo, fecha)
+    * Partition key opcional en numero_expediente (ENABLE_PARTITION_KEY): los filtros
+      por expediente solo recorren una partición
 
 Embeddings:
     * Modelo: BGE-M3 (1024 dims) via LangChainEmbeddingsAdapter
-    * Generación automática por LangChain en búsquedas y almacenamiento
+    * Consultas: embedding explícito (get_embedding) + client.search con scores reales
+    * Almacenamiento: embeddings por lote (aembed_documents) + client.insert
+    * Búsqueda híbrida opcional: densa + BM25 (campo texto_sparse) fusionadas en Milvus
     * Métrica: Similitud coseno (COSINE)
 
 Filtrado de estado:
     * TODAS las búsquedas filtran automáticamente por estado "Procesado"
-    * Usa DocumentoRepository para obtener IDs procesados
+    * Campo escalar "procesado" en cada chunk: filtro dentro de Milvus (top_k completo)
+    * Sincronizado por la ingesta después del commit (actualizar_estado_procesado)
+      y reconciliado periódicamente con la BD (reconciliar_estado_procesado)
+    * Colecciones sin el campo: post-filtrado con DocumentoRepository (legacy)
     * Evita mostrar documentos en procesamiento o con error
 
 Funciones principales:
-    * search_by_text: Búsqueda semántica general o por expediente
+    * search_by_text: Búsqueda semántica general o filtrada por expediente
     * search_by_vector: Búsqueda con vector precomputado
-    * search_similar_expedients: Encuentra expedientes similares
+    * search_similar_expedients: Encuentra expedientes similares (búsqueda por lotes)
     * get_expedient_documents: Recupera todos los chunks de un expediente
-    * add_documents: Almacena documentos con embeddings automáticos
+    * iter_chunks / iter_chunk_batches: Recorrido ordenado por lotes (memoria acotada)
+    * add_documents: Almacena documentos generando sus embeddings
+    * actualizar_estado_procesado: Sincroniza el estado de un documento en Milvus
+    * reconciliar_estado_procesado: Corrige documentos desincronizados con la BD
     * get_stats: Estadísticas de la colección
+    * start_vector_index_rebuild: Reconstruye el índice ANN con otro perfil en segundo plano (administración)
 
 Example:
     >>> from app.vectorstore.vectorstore import search_by_text, add_documents
@@ -74,19 +92,32 @@ Authors:
 Version:
     2.0.0 - LangChain integration + filtrado por estado
 """
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, AsyncIterator
+import asyncio
+import json
 import logging
+import threading
+import time
 
 # LangChain imports para operaciones vectoriales
 from langchain_milvus import Milvus
 from langchain_core.documents import Document
 
-# PyMilvus solo para configuración inicial
-from pymilvus import MilvusClient
+# PyMilvus: configuración, queries y búsquedas (densa e híbrida)
+from pymilvus import MilvusClient, AnnSearchRequest, RRFRanker, WeightedRanker
 
 # Configuración local
-from app.config.config import MILVUS_URI, MILVUS_TOKEN, MILVUS_DB_NAME, COLLECTION_NAME
-from app.vectorstore.schema import COLLECTION_SCHEMA
+from app.config.config import MILVUS_URI, MILVUS_TOKEN, MILVUS_DB_NAME, COLLECTION_NAME, EMBEDDING_MODEL
+from app.config.vectorstore_config import vectorstore_config
+from app.config.rag_config import rag_config
+from app.vectorstore.schema import COLLECTION_SCHEMA, SPARSE_FIELD
+from app.vectorstore.milvus_executor import run_milvus
+from app.vectorstore.index_profiles import (
+    get_index_profile, profile_for_index_type, build_search_params, rerank_candidates, METRIC_TYPE
+)
+from app.vectorstore.vector_codec import (
+    encode_vector, decode_vector, rerank_by_cosine, vector_dtype_name, hit_fields, hit_score
+)
 
 logger = logging.getLogger(__name__)
 
@@ -95,6 +126,29 @@ logger = logging.getLogger(__name__)
 # ================================
 _milvus_client = None
 _langchain_vectorstore = None
+_status_field_enabled = False  # La colección tiene el campo escalar "procesado"
+_bm25_enabled = False  # La colección tiene el campo BM25 "texto_sparse"
+_insert_fields = set()  # Campos que la ingesta envía (excluye salidas de Functions)
+_active_index_profile = None  # Perfil del índice existente en "embedding" (index_profiles)
+_index_profile_checked_at = 0.0  # Última lectura del índice (se relee cada VECTOR_INDEX_REFRESH_SECONDS)
+_vector_dtype = "float32"  # Precisión del campo embedding: float32 | float16 | bfloat16
+_client_lock = threading.Lock()  # Creación única de clientes desde el pool de hilos
+_rebuild_lock = threading.Lock()  # Una sola reconstrucción de índice a la vez
+_rebuild_tasks = set()  # Reconstrucciones en segundo plano (referencia hasta que terminan)
+_REBUILD_STATUS_KEY = f"vectorstore:reconstruccion:{COLLECTION_NAME}"  # Estado compartido (hash Redis)
+
+# Expresión de filtro para documentos en estado "Procesado"
+PROCESSED_FILTER = "procesado == true"
+
+# Máximo de filas por query en Milvus (offset + limit)
+MAX_QUERY_WINDOW = 16384
+
+# Campos devueltos por las búsquedas de texto (metadata de cada resultado)
+SEARCH_OUTPUT_FIELDS = [
+    "id_chunk", "id_expediente", "numero_expediente", "id_documento", "nombre_archivo",
+    "tipo_archivo", "fecha_carga", "texto", "indice_chunk", "pagina_inicio", "pagina_fin",
+    "tipo_documento", "meta",
+]
 
 # ================================
 # FUNCIONES DE CONFIGURACIÓN
@@ -109,70 +163,249 @@ async def get_client():
     automáticamente con schema e índices optimizados.
     
     Índices creados:
-        * embedding: HNSW (M=16, efConstruction=200, COSINE)
+        * embedding: Perfil VECTOR_INDEX_PROFILE (HNSW M=16, efConstruction=200 por defecto)
         * Escalares: STL_SORT para filtros rápidos
+        * numero_expediente: INVERTED para filtros por expediente
+        * procesado: INVERTED para el filtro de estado
+        * texto_sparse: SPARSE_INVERTED_INDEX (BM25), si ENABLE_BM25
     
     Returns:
         MilvusClient: Cliente configurado y conectado.
         
     Note:
-        * Singleton: Una instancia global compartida
-        * Lazy initialization: Se crea en primera llamada
+        * Singleton: Una instancia global compartida (conexión reutilizada)
+        * Lazy initialization: Se crea en primera llamada, fuera del event loop
         * Auto-crea colección si no existe
     """
-    global _milvus_client
-
     if _milvus_client is None:
-        _milvus_client = MilvusClient(
+        await run_milvus(
+            _init_client,
+            timeout=vectorstore_config.MILVUS_WRITE_TIMEOUT,
+            forward_timeout=False,
+        )
+
+    return _milvus_client
+
+
+def _init_client() -> MilvusClient:
+    """Crea el cliente y la colección (síncrono, se ejecuta en el pool de Milvus)."""
+    global _milvus_client, _status_field_enabled, _bm25_enabled, _insert_fields, _active_index_profile, _vector_dtype
+    global _index_profile_checked_at
+
+    with _client_lock:
+        if _milvus_client is not None:
+            return _milvus_client
+
+        client = MilvusClient(
             uri=MILVUS_URI,
             token=MILVUS_TOKEN,
             db_name=MILVUS_DB_NAME,
         )
 
-        # Crear colección si no existe
-        if COLLECTION_NAME not in _milvus_client.list_collections():
-            logger.info(f"Creando colección: {COLLECTION_NAME}")
-            _milvus_client.create_collection(
-                collection_name=COLLECTION_NAME, schema=COLLECTION_SCHEMA
+        # Crear colección si no existe (has_collection también resuelve alias,
+        # ver app.vectorstore.revectorizacion)
+        created = not client.has_collection(COLLECTION_NAME)
+        if created:
+            create_collection_with_indexes(client, COLLECTION_NAME)
+        _check_embedding_model(client, created)
+
+        # Idempotente: asegura la colección cargada para búsquedas y queries
+        client.load_collection(collection_name=COLLECTION_NAME)
+
+        fields = _collection_fields(client)
+        field_names = set(fields)
+        _active_index_profile = _describe_vector_profile(client)
+        _index_profile_checked_at = time.monotonic()
+        _vector_dtype = vector_dtype_name(fields.get("embedding", {}).get("type"))
+        _insert_fields = field_names - {SPARSE_FIELD}
+
+        _status_field_enabled = "procesado" in field_names
+        if not _status_field_enabled:
+            logger.warning(
+                f"Colección {COLLECTION_NAME} sin campo 'procesado': "
+                f"se usará post-filtrado por estado en Python (recrear/migrar la colección)"
             )
 
-            # Crear índices optimizados
-            index_params = _milvus_client.prepare_index_params()
-
-            # Vector HNSW para similitud coseno
-            index_params.add_index(
-                field_name="embedding",
-                index_type="HNSW",
-                metric_type="COSINE",
-                params={"M": 16, "efConstruction": 200},
+        _bm25_enabled = SPARSE_FIELD in field_names
+        if vectorstore_config.ENABLE_BM25 and not _bm25_enabled:
+            logger.warning(
+                f"ENABLE_BM25 activo pero la colección {COLLECTION_NAME} no tiene '{SPARSE_FIELD}': "
+                f"la búsqueda híbrida usará solo vectores densos (recrear/migrar la colección)"
             )
 
-            # Índices escalares para filtros
-            for field in [
-                "id_expediente",
-                "id_documento",
-                "tipo_archivo",
-                "fecha_carga",
-            ]:
-                index_params.add_index(field_name=field, index_type="STL_SORT")
-
-            _milvus_client.create_index(
-                collection_name=COLLECTION_NAME, index_params=index_params
+        _milvus_client = client
+        return _milvus_client
+
+
+def _check_embedding_model(client: MilvusClient, created: bool) -> None:
+    """Registra o verifica el modelo de embeddings con el que se vectorizó la colección activa."""
+    try:
+        from app.vectorstore.revectorizacion import modelo_registrado, registrar_modelo, resolver_coleccion
+
+        coleccion = resolver_coleccion(client, COLLECTION_NAME)
+        registrado = modelo_registrado(coleccion)
+        if created or registrado is None:
+            registrar_modelo(coleccion, EMBEDDING_MODEL)
+        elif registrado != EMBEDDING_MODEL:
+            logger.error(
+                f"La colección {coleccion} fue vectorizada con {registrado} pero EMBEDDING_MODEL={EMBEDDING_MODEL}: "
+                f"las búsquedas no serán comparables (ver app.vectorstore.revectorizacion)"
             )
-            logger.info(f"Colección {COLLECTION_NAME} creada con índices optimizados")
+    except Exception as e:
+        logger.warning(f"No se pudo verificar el modelo de embeddings de la colección: {e}")
 
-    return _milvus_client
+
+def create_collection_with_indexes(
+    client: MilvusClient,
+    collection_name: str,
+    schema=None,
+    index_profile: Optional[str] = None,
+) -> None:
+    """
+    Crea una colección con el schema e índices del sistema.
+
+    Usada al inicializar el cliente y por la migración de colecciones
+    (app.vectorstore.migracion).
+
+    Args:
+        client: Cliente PyMilvus
+        collection_name: Nombre de la colección a crear
+        schema: CollectionSchema (None = COLLECTION_SCHEMA)
+        index_profile: Perfil del índice vectorial (None = VECTOR_INDEX_PROFILE)
+    """
+    schema = schema or COLLECTION_SCHEMA
+    field_names = {field.name for field in schema.fields}
+
+    create_kwargs = {}
+    if any(getattr(field, "is_partition_key", False) for field in schema.fields):
+        create_kwargs["num_partitions"] = vectorstore_config.NUM_PARTITIONS
+
+    logger.info(f"Creando colección: {collection_name}")
+    client.create_collection(collection_name=collection_name, schema=schema, **create_kwargs)
+
+    # Crear índices optimizados
+    index_params = client.prepare_index_params()
+
+    # Índice vectorial según el perfil configurado (HNSW por defecto)
+    _add_vector_index(index_params, get_index_profile(index_profile))
+
+    # Índices escalares para filtros
+    for field in [
+        "id_expediente",
+        "id_documento",
+        "tipo_archivo",
+        "fecha_carga",
+    ]:
+        index_params.add_index(field_name=field, index_type="STL_SORT")
+
+    # Índice invertido para filtros por expediente (complementa la partition key)
+    index_params.add_index(field_name="numero_expediente", index_type="INVERTED")
+
+    # Índice invertido para el filtro de estado
+    index_params.add_index(field_name="procesado", index_type="INVERTED")
+
+    # Índice BM25 para la búsqueda léxica (si el schema lo incluye)
+    if SPARSE_FIELD in field_names:
+        index_params.add_index(
+            field_name=SPARSE_FIELD,
+            index_type="SPARSE_INVERTED_INDEX",
+            metric_type="BM25",
+        )
+
+    client.create_index(collection_name=collection_name, index_params=index_params)
+    client.load_collection(collection_name=collection_name)
+    logger.info(f"Colección {collection_name} creada con índices optimizados")
+
+
+def _add_vector_index(index_params, profile: Dict[str, Any]) -> None:
+    """Agrega el índice del campo embedding según un perfil de index_profiles."""
+    index_params.add_index(
+        field_name="embedding",
+        index_name="embedding",
+        index_type=profile["index_type"],
+        metric_type=METRIC_TYPE,
+        params=profile["build_params"],
+    )
+
+
+def _describe_vector_profile(client: MilvusClient) -> Optional[Dict[str, Any]]:
+    """Perfil correspondiente al índice existente del campo embedding (None si no se reconoce)."""
+    try:
+        return _read_vector_profile(client)
+    except Exception as e:
+        logger.warning(f"No se pudo describir el índice vectorial de {COLLECTION_NAME}: {e}")
+        return None
+
+
+def _read_vector_profile(client: MilvusClient) -> Optional[Dict[str, Any]]:
+    """Como _describe_vector_profile, pero propaga los errores de Milvus."""
+    index_names = client.list_indexes(collection_name=COLLECTION_NAME, field_name="embedding")
+    if not index_names:
+        return None
+    description = client.describe_index(collection_name=COLLECTION_NAME, index_name=index_names[0])
+    profile = profile_for_index_type(description.get("index_type"))
+    if profile is None:
+        logger.warning(f"Índice vectorial {description.get('index_type')} sin perfil: búsqueda con parámetros por defecto")
+    return profile
+
+
+async def _index_profile() -> Optional[Dict[str, Any]]:
+    """
+    Perfil del índice vectorial activo para armar los parámetros de búsqueda.
+
+    Se relee de Milvus cada VECTOR_INDEX_REFRESH_SECONDS: una reconstrucción
+    hecha desde otro proceso (otro worker de la API, Celery) cambia el tipo de
+    índice sin reiniciar este. Si la lectura falla se conserva el perfil anterior.
+    """
+    global _active_index_profile, _index_profile_checked_at
+
+    client = await get_client()
+    now = time.monotonic()
+    if now - _index_profile_checked_at >= vectorstore_config.VECTOR_INDEX_REFRESH_SECONDS:
+        _index_profile_checked_at = now
+        try:
+            profile = await run_milvus(_read_vector_profile, client, forward_timeout=False)
+        except Exception as e:
+            logger.debug(f"No se pudo releer el índice vectorial, se conserva el perfil actual: {e}")
+        else:
+            if (profile or {}).get("name") != (_active_index_profile or {}).get("name"):
+                logger.info(
+                    f"Índice vectorial de {COLLECTION_NAME} cambió: "
+                    f"{(_active_index_profile or {}).get('name')} → {(profile or {}).get('name')}"
+                )
+            _active_index_profile = profile
+    return _active_index_profile
+
+
+def _collection_fields(client: MilvusClient) -> Dict[str, Dict[str, Any]]:
+    """Campos de la colección configurada por nombre (vacío si no se puede describir)."""
+    try:
+        description = client.describe_collection(collection_name=COLLECTION_NAME)
+        return {field.get("name"): field for field in description.get("fields", [])}
+    except Exception as e:
+        logger.warning(f"No se pudo describir la colección {COLLECTION_NAME}: {e}")
+        return {}
 
 
 async def get_langchain_vectorstore():
     """
     VectorStore LangChain para todas las operaciones vectoriales.
     """
-    global _langchain_vectorstore
-
     if _langchain_vectorstore is None:
         # Asegurar configuración inicial
         await get_client()
+        await run_milvus(_init_langchain_vectorstore, forward_timeout=False)
+
+    return _langchain_vectorstore
+
+
+def _init_langchain_vectorstore() -> Milvus:
+    """Crea el VectorStore LangChain (síncrono: abre su propia conexión)."""
+    global _langchain_vectorstore
+
+    with _client_lock:
+        if _langchain_vectorstore is not None:
+            return _langchain_vectorstore
 
         # Crear adaptador de embeddings
         from app.embeddings.langchain_adapter import LangChainEmbeddingsAdapter
@@ -190,8 +423,7 @@ async def get_langchain_vectorstore():
         )
 
         logger.info("LangChain VectorStore configurado correctamente")
-
-    return _langchain_vectorstore
+        return _langchain_vectorstore
 
 
 # ================================
@@ -202,44 +434,57 @@ async def get_langchain_vectorstore():
 # HELPERS DE FILTRADO CENTRALIZADO
 # ================================
 
-def _get_processed_document_ids(db=None) -> set:
+def _with_processed_filter(expr: str = "") -> str:
     """
-    Obtiene IDs de documentos procesados usando repository centralizado.
-    Crea sesión temporal si no se proporciona db.
+    Combina una expresión de filtro con el filtro de estado "Procesado".
+    
+    Si la colección no tiene el campo "procesado" retorna la expresión sin cambios
+    (el estado se filtra después con _filter_by_processed_status).
     
     Args:
-        db: Sesión de BD (opcional)
+        expr: Expresión booleana de Milvus (opcional)
         
     Returns:
-        Set de IDs de documentos procesados
+        Expresión combinada ("" si no hay filtros)
+    """
+    if not _status_field_enabled:
+        return expr
+    if expr:
+        return f"({expr}) and {PROCESSED_FILTER}"
+    return PROCESSED_FILTER
+
+
+def _get_processed_ids_cache(db=None):
     """
-    from app.repositories.documento_repository import DocumentoRepository
+    Obtiene el caché de IDs procesados del proceso, refrescándolo si expiró.
     
-    db_creada = False
-    if db is None:
-        try:
-            from app.db.database import get_db
-            db = next(get_db())
-            db_creada = True
-        except Exception as e:
-            logger.error(f"No se pudo crear sesión de BD para filtrar: {e}")
-            return set()
+    Evita abrir una sesión de BD y ejecutar el join completo en cada búsqueda;
+    el conjunto se mantiene al día con las notificaciones de la ingesta.
+    
+    Args:
+        db: Sesión de BD (opcional, solo se usa si hay que refrescar)
+        
+    Returns:
+        ProcessedIdsCache cargado, o None si no se pudo cargar
+    """
+    from app.vectorstore.processed_ids_cache import get_processed_ids_cache
     
     try:
-        repo = DocumentoRepository()
-        return repo.obtener_ids_procesados(db)
+        cache = get_processed_ids_cache()
+        if cache.ensure_fresh(db):
+            return cache
     except Exception as e:
         logger.error(f"Error obteniendo IDs procesados: {e}")
-        return set()
-    finally:
-        if db_creada and db:
-            db.close()
+    return None
 
 
 def _filter_by_processed_status(results: List[Dict[str, Any]], db=None) -> List[Dict[str, Any]]:
     """
     Filtra resultados para incluir solo documentos procesados.
-    Usa repository centralizado.
+    Usa el caché de IDs procesados del proceso.
+    
+    Solo aplica a colecciones sin el campo "procesado"; en las demás el filtro
+    ya se ejecutó dentro de Milvus y los resultados se devuelven sin cambios.
     
     Args:
         results: Lista de resultados de búsqueda
@@ -248,10 +493,10 @@ def _filter_by_processed_status(results: List[Dict[str, Any]], db=None) -> List[
     Returns:
         Lista filtrada de resultados
     """
-    if not results:
+    if not results or _status_field_enabled:
         return results
     
-    processed_ids = _get_processed_document_ids(db)
+    processed_ids = _get_processed_ids_cache(db)
     
     if not processed_ids:
         logger.warning("No se pudieron obtener IDs procesados, devolviendo todos los resultados")
@@ -277,7 +522,7 @@ def _filter_by_processed_status(results: List[Dict[str, Any]], db=None) -> List[
 
 
 async def search_by_vector(
-    query_vector: List[float], top_k: int = 20, score_threshold: float = 0.0
+    query_vector: List[float], top_k: int = 20, score_threshold: float = 0.0, request_type: str = "rag"
 ) -> List[Dict[str, Any]]:
     """
     Búsqueda vectorial usando LangChain CON SCORES REALES.
@@ -286,6 +531,7 @@ async def search_by_vector(
         query_vector: Vector de consulta
         top_k: Máximo de resultados
         score_threshold: Umbral de similitud mínimo
+        request_type: rag | similar (esfuerzo de búsqueda ANN)
 
     Returns:
         Lista de documentos similares formateados
@@ -298,25 +544,29 @@ async def search_by_vector(
         client = await get_client()
         
         # Realizar búsqueda vectorial directa
-        search_results = client.search(
+        profile = await _index_profile()
+        candidates = rerank_candidates(profile, top_k)
+        search_results = await run_milvus(
+            client.search,
             collection_name=COLLECTION_NAME,
-            data=[query_vector],  # Lista de vectores de consulta
+            data=[encode_vector(query_vector, _vector_dtype)],  # Lista de vectores de consulta
             anns_field="embedding",
-            limit=top_k,
+            limit=candidates,
+            search_params=build_search_params(profile, request_type, candidates),
+            filter=_with_processed_filter(),
             output_fields=["id_chunk", "numero_expediente", "nombre_archivo", "texto", "id_documento", 
                           "indice_chunk", "pagina_inicio", "pagina_fin", "tipo_documento", "meta"]
+                          + (["embedding"] if candidates > top_k else [])
         )
 
         # Formatear resultados
         formatted_results = []
         if search_results and len(search_results) > 0:
-            for hit in search_results[0]:  # search_results es una lista de listas
-                # Milvus devuelve similarity score (valores altos = más similar)
-                similarity_score = hit.score if hasattr(hit, 'score') else hit.distance
-                
+            # search_results es una lista de listas
+            for hit, similarity_score in _scored_hits(query_vector, search_results[0], top_k, candidates > top_k):
                 if similarity_score >= score_threshold:
                     # Construir documento formateado
-                    entity = hit.entity
+                    entity = hit_fields(hit)
                     meta_data = entity.get("meta", {})
                     ruta_archivo = meta_data.get("ruta_archivo", "") if isinstance(meta_data, dict) else ""
                     
@@ -346,84 +596,80 @@ async def search_by_vector(
 
 
 async def search_by_text(
-    query_text: str, top_k: int = 20, score_threshold: float = 0.0, expediente_filter: Optional[str] = None, db=None
+    query_text: str, top_k: int = 20, score_threshold: float = 0.0, expediente_filter: Optional[str] = None, db=None,
+    search_mode: Optional[str] = None, request_type: str = "rag"
 ) -> List[Dict[str, Any]]:
     """
     Búsqueda semántica directa con texto.
-    LangChain maneja automáticamente: texto → embedding → búsqueda
+    Genera el embedding de la consulta y ejecuta una búsqueda ANN en Milvus
+    con scores de similitud coseno reales, o una búsqueda híbrida densa + BM25.
     Filtra automáticamente solo documentos procesados.
 
     Args:
         query_text: Texto de consulta
         top_k: Máximo de resultados
-        score_threshold: Umbral de similitud mínimo
-        expediente_filter: Si se proporciona, filtra solo documentos de este expediente
+        score_threshold: Umbral de similitud mínimo (en modo híbrido aplica a la parte densa)
+        expediente_filter: Si se proporciona, la búsqueda se restringe a este
+            expediente (filtro escalar dentro de la búsqueda vectorial)
         db: Sesión de BD (opcional) - para filtrar solo documentos procesados
+        search_mode: "dense" o "hybrid" (None = rag_config.SEARCH_MODE)
+        request_type: rag | similar (esfuerzo de búsqueda ANN)
 
     Returns:
-        Lista de documentos similares (solo procesados)
+        Lista de documentos similares (solo procesados), ordenados por score
     """
     try:
-        vectorstore = await get_langchain_vectorstore()
+        from app.embeddings.embeddings import get_embedding
+
+        query_vector = await get_embedding(query_text)
+        mode = _resolve_search_mode(search_mode)
 
         if expediente_filter:
             logger.info(f"Búsqueda en expediente: {expediente_filter}")
-            client = await get_client()
-            
             try:
-                expediente_docs = client.query(
-                    collection_name=COLLECTION_NAME,
-                    filter=f'numero_expediente == "{expediente_filter}"',
-                    output_fields=["id_chunk", "numero_expediente", "nombre_archivo", "texto", "id_documento"],
-                    limit=100
+                formatted_results = await _search_chunks(
+                    query_vector,
+                    top_k=top_k,
+                    score_threshold=score_threshold,
+                    expr=f'numero_expediente == "{expediente_filter}"',
+                    query_text=query_text,
+                    search_mode=mode,
+                    request_type=request_type,
                 )
             except Exception as e:
+                # Colecciones antiguas con el campo "expediente_numero"
                 logger.warning(f"Error buscando con 'numero_expediente': {e}")
                 try:
-                    expediente_docs = client.query(
-                        collection_name=COLLECTION_NAME,
-                        filter=f'expediente_numero == "{expediente_filter}"',
-                        output_fields=["id_chunk", "expediente_numero", "nombre_archivo", "texto", "id_documento"],
-                        limit=100
+                    formatted_results = await _search_chunks(
+                        query_vector,
+                        top_k=top_k,
+                        score_threshold=score_threshold,
+                        expr=f'expediente_numero == "{expediente_filter}"',
+                        request_type=request_type,
                     )
                 except Exception:
-                    expediente_docs = []
+                    formatted_results = []
             
-            if not expediente_docs:
+            if not formatted_results:
                 logger.warning(f"No se encontraron documentos para expediente: {expediente_filter}")
                 return []
             
-            formatted_results = []
-            for i, doc in enumerate(expediente_docs):
-                similarity_score = 0.9 - (i * 0.01)
-                expediente_num = doc.get("numero_expediente") or doc.get("expediente_numero", "")
-                formatted_result = {
-                    "id": doc.get("id_chunk", ""),
-                    "expedient_id": expediente_num,
-                    "document_name": doc.get("nombre_archivo", ""),
-                    "content_preview": doc.get("texto", ""),
-                    "similarity_score": similarity_score,
-                    "documento_id": doc.get("id_documento"),
-                }
-                if similarity_score >= score_threshold:
-                    formatted_results.append(formatted_result)
-            
             formatted_results = _filter_by_processed_status(formatted_results, db)
-            logger.info(f"Búsqueda por expediente: {len(formatted_results)} resultados")
+            logger.info(f"Búsqueda por expediente ({mode}): {len(formatted_results)} resultados")
             return formatted_results
         
         else:
-            results_with_scores = vectorstore.similarity_search_with_score(query=query_text, k=top_k)
-
-            formatted_results = []
-            for doc, raw_score in results_with_scores:
-                similarity_score = raw_score
-                
-                if similarity_score >= score_threshold:
-                    formatted_results.append(_format_document_result(doc, similarity_score))
+            formatted_results = await _search_chunks(
+                query_vector,
+                top_k=top_k,
+                score_threshold=score_threshold,
+                query_text=query_text,
+                search_mode=mode,
+                request_type=request_type,
+            )
 
             formatted_results = _filter_by_processed_status(formatted_results, db)
-            logger.info(f"Búsqueda semántica: {len(formatted_results)} resultados")
+            logger.info(f"Búsqueda semántica ({mode}): {len(formatted_results)} resultados")
             return formatted_results
 
     except Exception as e:
@@ -431,6 +677,281 @@ async def search_by_text(
         raise
 
 
+def _resolve_search_mode(search_mode: Optional[str]) -> str:
+    """Normaliza el modo de búsqueda; "hybrid" requiere el campo BM25 en la colección."""
+    mode = (search_mode or rag_config.SEARCH_MODE).lower()
+    if mode not in ("dense", "hybrid"):
+        logger.warning(f"Modo de búsqueda '{mode}' no soportado, usando 'dense'")
+        return "dense"
+    if mode == "hybrid" and not _bm25_enabled:
+        logger.debug(f"Colección sin campo '{SPARSE_FIELD}': búsqueda densa")
+        return "dense"
+    return mode
+
+
+async def _search_chunks(
+    query_vector: List[float], top_k: int, score_threshold: float = 0.0, expr: str = "",
+    query_text: Optional[str] = None, search_mode: str = "dense", request_type: str = "rag"
+) -> List[Dict[str, Any]]:
+    """
+    Búsqueda ANN filtrada sobre la colección con el cliente PyMilvus.
+
+    Args:
+        query_vector: Embedding de la consulta
+        top_k: Máximo de resultados
+        score_threshold: Umbral mínimo de similitud coseno
+        expr: Filtro escalar adicional (se combina con el filtro de estado)
+        query_text: Texto de la consulta (requerido en modo híbrido)
+        search_mode: "dense" o "hybrid" (ya resuelto con _resolve_search_mode)
+        request_type: rag | similar (esfuerzo de búsqueda ANN)
+
+    Returns:
+        Resultados formateados con _format_hit, ordenados por score
+    """
+    if search_mode == "hybrid" and query_text:
+        return await _hybrid_search_chunks(query_vector, query_text, top_k, score_threshold, expr, request_type)
+
+    client = await get_client()
+    profile = await _index_profile()
+    candidates = rerank_candidates(profile, top_k)
+
+    search_results = await run_milvus(
+        client.search,
+        collection_name=COLLECTION_NAME,
+        data=[encode_vector(query_vector, _vector_dtype)],
+        anns_field="embedding",
+        limit=candidates,
+        search_params=build_search_params(profile, request_type, candidates),
+        filter=_with_processed_filter(expr),
+        output_fields=SEARCH_OUTPUT_FIELDS + (["embedding"] if candidates > top_k else []),
+    )
+
+    formatted_results = []
+    for hit, similarity_score in _scored_hits(
+        query_vector, search_results[0] if search_results else [], top_k, candidates > top_k
+    ):
+        if similarity_score >= score_threshold:
+            formatted_results.append(_format_hit(hit, similarity_score))
+    return formatted_results
+
+
+async def _hybrid_search_chunks(
+    query_vector: List[float], query_text: str, top_k: int, score_threshold: float, expr: str,
+    request_type: str = "rag"
+) -> List[Dict[str, Any]]:
+    """
+    Búsqueda híbrida: vectores densos (COSINE) + BM25 sobre texto, fusionados en Milvus.
+
+    El umbral se aplica a la búsqueda densa como radius (similitud mínima); los
+    resultados BM25 entran por coincidencia léxica. El score devuelto es el de la
+    fusión, normalizado a [0, 1] (RRF: 1.0 = primer lugar en ambas búsquedas).
+
+    Args:
+        query_vector: Embedding de la consulta
+        query_text: Texto de la consulta (Milvus lo tokeniza para BM25)
+        top_k: Máximo de resultados fusionados
+        score_threshold: Similitud coseno mínima de la parte densa
+        expr: Filtro escalar adicional (se combina con el filtro de estado)
+        request_type: rag | similar (esfuerzo de búsqueda ANN)
+
+    Returns:
+        Resultados formateados con _format_hit, ordenados por score fusionado
+    """
+    client = await get_client()
+    candidates = top_k * max(1, rag_config.HYBRID_CANDIDATES_MULTIPLIER)
+    filter_expr = _with_processed_filter(expr)
+
+    dense_params = build_search_params(await _index_profile(), request_type, candidates)
+    if score_threshold > 0:
+        dense_params["params"]["radius"] = score_threshold
+
+    requests = [
+        AnnSearchRequest(
+            data=[encode_vector(query_vector, _vector_dtype)], anns_field="embedding",
+            param=dense_params, limit=candidates, expr=filter_expr or None,
+        ),
+        AnnSearchRequest(
+            data=[query_text], anns_field=SPARSE_FIELD,
+            param={"metric_type": "BM25", "params": {}}, limit=candidates, expr=filter_expr or None,
+        ),
+    ]
+
+    if rag_config.HYBRID_RANKER == "weighted":
+        dense_weight = rag_config.HYBRID_DENSE_WEIGHT
+        ranker = WeightedRanker(dense_weight, 1 - dense_weight)
+        max_score = 1.0
+    else:
+        ranker = RRFRanker(rag_config.HYBRID_RRF_K)
+        max_score = len(requests) / (rag_config.HYBRID_RRF_K + 1)
+
+    search_results = await run_milvus(
+        client.hybrid_search,
+        collection_name=COLLECTION_NAME,
+        reqs=requests,
+        ranker=ranker,
+        limit=top_k,
+        output_fields=SEARCH_OUTPUT_FIELDS,
+    )
+
+    formatted_results = []
+    for hit in (search_results[0] if search_results else []):
+        formatted_results.append(_format_hit(hit, min(1.0, hit_score(hit) / max_score)))
+    return formatted_results
+
+
+def _scored_hits(query_vector, hits, limit: int, rerank: bool) -> List[tuple]:
+    """
+    Pares (hit, score) de una búsqueda densa, ordenados por score.
+
+    Con un índice cuantizado (rerank=True) la búsqueda pidió candidatos
+    adicionales con su embedding: se re-ordenan por similitud coseno exacta y
+    se recortan a limit. En el resto se usa el score de Milvus.
+    """
+    hits = list(hits or [])
+    if rerank:
+        return rerank_by_cosine(
+            query_vector, hits, lambda hit: hit_fields(hit).get("embedding"), limit, _vector_dtype
+        )
+    return [(hit, hit_score(hit)) for hit in hits]
+
+
+# ================================
+# ITERACIÓN ORDENADA DE CHUNKS
+# ================================
+
+
+async def iter_chunk_batches(
+    expr: str, output_fields: List[str], batch_size: Optional[int] = None, consistency_level: Optional[str] = None
+) -> AsyncIterator[List[Dict[str, Any]]]:
+    """
+    Recorre en lotes todos los chunks que cumplen un filtro, en orden de documento
+    (id_documento) y de indice_chunk dentro de cada documento.
+
+    query_iterator de Milvus pagina por clave primaria (id_chunk, un UUID), no por
+    indice_chunk, así que el recorrido se hace en dos pasos:
+        1. query_iterator con campos mínimos para conocer los documentos y su rango
+           de indice_chunk (memoria proporcional a la cantidad de documentos), en
+           páginas de MAX_QUERY_WINDOW filas sin importar batch_size
+        2. Queries por ventanas de indice_chunk; documentos pequeños consecutivos se
+           agrupan en una sola query para no multiplicar los round trips (sin
+           alterar el orden por id_documento)
+
+    Sin límite de tamaño: expedientes de cualquier tamaño se procesan con memoria
+    acotada a un lote.
+
+    Args:
+        expr: Filtro escalar de Milvus (ej: 'numero_expediente == "X"')
+        output_fields: Campos a devolver (siempre incluye id_documento e indice_chunk)
+        batch_size: Chunks por lote del paso 2 (None = CHUNK_ITERATOR_BATCH_SIZE)
+        consistency_level: Consistencia de las queries (None = la de la colección;
+            "Strong" para leer chunks recién insertados)
+
+    Yields:
+        Lotes de chunks (dicts) ordenados
+    """
+    client = await get_client()
+    batch_size = min(max(1, batch_size or vectorstore_config.CHUNK_ITERATOR_BATCH_SIZE), MAX_QUERY_WINDOW)
+    fields = list(dict.fromkeys([*output_fields, "id_documento", "indice_chunk"]))
+    query_kwargs = {"consistency_level": consistency_level} if consistency_level else {}
+
+    # 1. Rango de indice_chunk por documento: {id_documento: [min, max, cantidad]}
+    documents = await _collect_document_ranges(client, expr, **query_kwargs)
+
+    def sort_key(row):
+        return (row.get("id_documento") or 0, row.get("indice_chunk") or 0)
+
+    # 2. En orden de id_documento: los documentos pequeños consecutivos se agrupan
+    # hasta completar un lote; cada documento grande vacía el grupo pendiente y
+    # se recorre por ventanas de indice_chunk
+    group, group_size = [], 0
+    for doc_id in sorted(documents):
+        start, end, count = documents[doc_id]
+        if group and group_size + count > batch_size:
+            yield sorted(await _query_documents(client, expr, group, fields, group_size, **query_kwargs), key=sort_key)
+            group, group_size = [], 0
+        if count <= batch_size:
+            group.append(doc_id)
+            group_size += count
+            continue
+
+        while start <= end:
+            rows = await run_milvus(
+                client.query,
+                collection_name=COLLECTION_NAME,
+                filter=(
+                    f"({expr}) and id_documento == {doc_id} "
+                    f"and indice_chunk >= {start} and indice_chunk < {start + batch_size}"
+                ),
+                output_fields=fields,
+                limit=batch_size,
+                **query_kwargs,
+            )
+            if rows:
+                yield sorted(rows, key=sort_key)
+            start += batch_size
+
+    if group:
+        yield sorted(await _query_documents(client, expr, group, fields, group_size, **query_kwargs), key=sort_key)
+
+
+async def iter_chunks(
+    expr: str, output_fields: List[str], batch_size: Optional[int] = None, consistency_level: Optional[str] = None
+) -> AsyncIterator[Dict[str, Any]]:
+    """Versión chunk a chunk de iter_chunk_batches (mismo orden)."""
+    async for batch in iter_chunk_batches(expr, output_fields, batch_size, consistency_level):
+        for row in batch:
+            yield row
+
+
+async def _collect_document_ranges(client: MilvusClient, expr: str, **query_kwargs) -> Dict[int, List[int]]:
+    """Recorre el filtro con query_iterator y calcula [min, max, cantidad] de indice_chunk por documento."""
+    # Solo dos enteros por fila: páginas máximas (un expediente de 10k chunks
+    # es un round trip), independientes del tamaño de lote del recorrido
+    iterator = await run_milvus(
+        client.query_iterator,
+        collection_name=COLLECTION_NAME,
+        filter=expr,
+        output_fields=["id_documento", "indice_chunk"],
+        batch_size=MAX_QUERY_WINDOW,
+        **query_kwargs,
+    )
+
+    documents: Dict[int, List[int]] = {}
+    try:
+        while True:
+            rows = await run_milvus(iterator.next, forward_timeout=False)
+            if not rows:
+                break
+            for row in rows:
+                doc_id = row.get("id_documento")
+                index = row.get("indice_chunk") or 0
+                current = documents.get(doc_id)
+                if current is None:
+                    documents[doc_id] = [index, index, 1]
+                else:
+                    current[0] = min(current[0], index)
+                    current[1] = max(current[1], index)
+                    current[2] += 1
+    finally:
+        await run_milvus(iterator.close, forward_timeout=False)
+
+    return documents
+
+
+async def _query_documents(
+    client: MilvusClient, expr: str, document_ids: List[int], fields: List[str], expected: int, **query_kwargs
+) -> List[Dict[str, Any]]:
+    """Query de todos los chunks de varios documentos pequeños en una sola llamada."""
+    return await run_milvus(
+        client.query,
+        collection_name=COLLECTION_NAME,
+        filter=f"({expr}) and id_documento in {list(document_ids)}",
+        output_fields=fields,
+        limit=expected,
+        **query_kwargs,
+    )
+
+
 async def get_complete_document_by_chunks(document_id: int) -> List[Dict[str, Any]]:
     """
     Recupera todos los chunks de un documento específico, ordenados por índice.
@@ -442,35 +963,31 @@ async def get_complete_document_by_chunks(document_id: int) -> List[Dict[str, An
         Lista de chunks ordenados del documento completo
     """
     try:
-        client = await get_client()
-        
-        # Buscar todos los chunks del documento específico
-        query_results = client.query(
-            collection_name=COLLECTION_NAME,
-            filter=f'id_documento == {document_id}',
-            output_fields=[
-                "id_chunk",
-                "texto", 
-                "indice_chunk",
-                "nombre_archivo",
-                "numero_expediente",
-                "tipo_archivo",
-                "pagina_inicio",
-                "pagina_fin",
-                "tipo_documento",
-                "fecha_carga",
-                "meta"
-            ],
-            limit=1000  # Máximo chunks por documento
-        )
+        # Recorrer todos los chunks del documento específico (sin límite de cantidad)
+        sorted_chunks = [
+            chunk
+            async for chunk in iter_chunks(
+                f'id_documento == {document_id}',
+                output_fields=[
+                    "id_chunk",
+                    "texto", 
+                    "indice_chunk",
+                    "nombre_archivo",
+                    "numero_expediente",
+                    "tipo_archivo",
+                    "pagina_inicio",
+                    "pagina_fin",
+                    "tipo_documento",
+                    "fecha_carga",
+                    "meta"
+                ],
+            )
+        ]
         
-        if not query_results:
+        if not sorted_chunks:
             logger.info(f"No se encontraron chunks para el documento {document_id}")
             return []
         
-        # Ordenar por índice de chunk para mantener el orden correcto
-        sorted_chunks = sorted(query_results, key=lambda x: x.get("indice_chunk", 0))
-        
         logger.info(f"Recuperados {len(sorted_chunks)} chunks para documento {document_id}")
         return sorted_chunks
         
@@ -489,37 +1006,27 @@ async def get_expedient_summary(expedient_id: str) -> str:
         Resumen combinado del contenido de todos los documentos del expediente
     """
     try:
-        client = await get_client()
-
-        # Buscar todos los documentos del expediente usando filtro
-        query_results = client.query(
-            collection_name=COLLECTION_NAME,
-            filter=f'numero_expediente == "{expedient_id}"',
-            output_fields=[
-                "texto",
-                "nombre_archivo",
-                "numero_expediente",
-                "tipo_archivo",
-            ],
-            limit=1000,  # Máximo documentos por expediente
-        )
-
-        if not query_results:
-            logger.info(
-                f"No se encontraron documentos para el expediente {expedient_id}"
-            )
-            return f"Expediente {expedient_id} sin contenido"
-
         # Combinar contenido de todos los documentos
         texto_parts = [expedient_id]  # Incluir ID del expediente
 
-        for doc in query_results:
+        # El filtro de estado depende de la colección: inicializar el cliente antes de armarlo
+        await get_client()
+        async for doc in iter_chunks(
+            _with_processed_filter(f'numero_expediente == "{expedient_id}"'),
+            output_fields=["texto"],
+        ):
             texto_content = doc.get("texto", "")
             if texto_content and texto_content.strip():
                 # Tomar primeros 300 caracteres de cada chunk
                 preview = texto_content.strip()[:300]
                 texto_parts.append(preview)
 
+        if len(texto_parts) == 1:
+            logger.info(
+                f"No se encontraron documentos para el expediente {expedient_id}"
+            )
+            return f"Expediente {expedient_id} sin contenido"
+
         resumen_final = " ".join(texto_parts)
         return resumen_final if resumen_final else f"Expediente {expedient_id}"
 
@@ -529,11 +1036,14 @@ async def get_expedient_summary(expedient_id: str) -> str:
 
 
 async def search_similar_expedients(
-    expedient_id: str, top_k: int = 20, score_threshold: float = 0.3, db=None
+    expedient_id: str, top_k: int = 20, score_threshold: float = 0.3, db=None,
+    aggregation_mode: Optional[str] = None
 ) -> List[Dict[str, Any]]:
     """
-    Busca expedientes similares usando todos los vectores del expediente de referencia.
-    Combina múltiples búsquedas y rankea los resultados.
+    Busca expedientes similares usando los vectores del expediente de referencia
+    (hasta SIMILAR_REFERENCE_MAX_CHUNKS, recorridos en streaming).
+    Envía los vectores en lotes (varios vectores por llamada a Milvus) y combina
+    los scores por expediente según el modo de agregación configurado.
     Filtra automáticamente solo documentos procesados.
 
     Args:
@@ -541,117 +1051,131 @@ async def search_similar_expedients(
         top_k: Máximo de resultados finales
         score_threshold: Umbral mínimo de similitud
         db: Sesión de BD (opcional) - para filtrar solo documentos procesados
+        aggregation_mode: max | mean | top_n_sum (None = vectorstore_config).
+            Todos parten de la mejor coincidencia de cada chunk de referencia
+            en el expediente candidato: max toma la mayor, mean las promedia
+            sobre todos los chunks de referencia y top_n_sum suma las N mayores
 
     Returns:
         Lista de documentos similares de otros expedientes, rankeados por similitud (solo procesados)
     """
     try:
         client = await get_client()
-        vectorstore = await get_langchain_vectorstore()
 
-        # 1. Obtener todos los vectores del expediente de referencia
-        query_results = client.query(
-            collection_name=COLLECTION_NAME,
-            filter=f'numero_expediente == "{expedient_id}"',
-            output_fields=["embedding", "texto", "nombre_archivo"],
-            limit=100,  # Máximo chunks por expediente
-        )
+        mode = (aggregation_mode or vectorstore_config.SIMILAR_AGGREGATION_MODE).lower()
+        if mode not in vectorstore_config.AGGREGATION_MODES:
+            logger.warning(f"Modo de agregación '{mode}' no soportado, usando 'max'")
+            mode = "max"
 
-        if not query_results:
-            logger.info(f"No se encontraron vectores para el expediente {expedient_id}")
-            return []
+        batch_size = max(1, vectorstore_config.SIMILAR_SEARCH_BATCH_SIZE)
+        max_reference = vectorstore_config.SIMILAR_REFERENCE_MAX_CHUNKS
 
-        # 2. Buscar similares para cada vector del expediente
-        all_results = {}  # {expedient_id: {score: max_score, docs: [docs]}}
+        # {expedient_id: {"chunk_scores": {idx_referencia: [scores]}, "docs": {nombre: doc}}}
+        all_results = {}
+        reference_count = 0
+        batch_count = 0
 
-        for i, doc in enumerate(query_results):
-            embedding = doc.get("embedding", [])
-            if not embedding:
-                continue
+        # 1. Recorrer los vectores del expediente de referencia en orden (streaming)
+        # 2. Buscar similares enviando varios vectores por llamada
+        hits_per_vector = top_k * 2  # Buscar más para tener opciones
+        profile = await _index_profile()
+        candidates = rerank_candidates(profile, hits_per_vector)
 
-            # CORRECCIÓN: Usar Milvus client directamente para búsqueda vectorial
+        async for start, batch in _iter_reference_embeddings(expedient_id, batch_size, max_reference):
+            reference_count = start + len(batch)
+            batch_count += 1
             try:
-                search_results = client.search(
+                search_results = await run_milvus(
+                    client.search,
                     collection_name=COLLECTION_NAME,
-                    data=[embedding],  # Lista de vectores de consulta
+                    # Varios vectores de consulta en una sola llamada
+                    data=[encode_vector(vector, _vector_dtype) for vector in batch],
                     anns_field="embedding",
-                    limit=top_k * 2,  # Buscar más para tener opciones
+                    limit=candidates,
+                    # Búsqueda de casos similares: máximo recall (ef/nprobe alto)
+                    search_params=build_search_params(profile, "similar", candidates),
+                    # Solo otros expedientes procesados: el límite no se desperdicia
+                    filter=_with_processed_filter(f'numero_expediente != "{expedient_id}"'),
                     output_fields=["id_chunk", "numero_expediente", "nombre_archivo", "texto", 
                                   "id_documento", "indice_chunk", "pagina_inicio", "pagina_fin", 
                                   "tipo_documento", "meta"]
+                                  + (["embedding"] if candidates > hits_per_vector else [])
                 )
-                
-                # Procesar resultados de esta búsqueda
-                if not search_results or len(search_results) == 0:
-                    continue
-                    
-                for hit in search_results[0]:  # search_results es una lista de listas
-                    entity = hit.entity
+            except Exception as e:
+                logger.warning(f"Error en búsqueda vectorial para lote {start // batch_size}: {e}")
+                continue
+
+            # search_results tiene una lista de hits por cada vector del lote
+            for offset, hits in enumerate(search_results or []):
+                reference_idx = start + offset
+                # Milvus devuelve similarity directamente (COSINE)
+                for hit, similarity_score in _scored_hits(
+                    batch[offset], hits, hits_per_vector, candidates > hits_per_vector
+                ):
+                    entity = hit_fields(hit)
                     result_expedient_id = entity.get("numero_expediente", "")
-                    
+
                     # Excluir el expediente actual
                     if result_expedient_id == expedient_id or not result_expedient_id:
                         continue
 
-                    # CORRECCIÓN FINAL: Milvus devuelve similarity directamente
-                    similarity_score = hit.score if hasattr(hit, 'score') else hit.distance
-
                     if similarity_score < score_threshold:
                         continue
 
-                    # Combinar resultados por expediente
-                    if result_expedient_id not in all_results:
-                        all_results[result_expedient_id] = {
-                            "max_score": similarity_score,
-                            "docs": [],
-                        }
-                    else:
-                        # Actualizar score máximo
-                        all_results[result_expedient_id]["max_score"] = max(
-                            all_results[result_expedient_id]["max_score"], similarity_score
-                        )
-
-                    # Agregar documento si no existe
-                    doc_exists = any(
-                        d.get("document_name") == entity.get("nombre_archivo")
-                        for d in all_results[result_expedient_id]["docs"]
+                    expedient_data = all_results.setdefault(
+                        result_expedient_id, {"chunk_scores": {}, "docs": {}}
                     )
+                    expedient_data["chunk_scores"].setdefault(reference_idx, []).append(similarity_score)
 
-                    if not doc_exists:
-                        # Extraer ruta_archivo del campo meta
-                        meta_data = entity.get("meta", {})
-                        ruta_archivo = meta_data.get("ruta_archivo", "") if isinstance(meta_data, dict) else ""
-                        
-                        all_results[result_expedient_id]["docs"].append(
-                            {
-                                "id": entity.get("id_chunk", ""),
-                                "expedient_id": result_expedient_id,
-                                "document_name": entity.get("nombre_archivo", ""),
-                                "content_preview": entity.get("texto", "")[:500],
-                                "similarity_score": similarity_score,
-                                "metadata": {
-                                    "indice_chunk": entity.get("indice_chunk", 0),
-                                    "pagina_inicio": entity.get("pagina_inicio", 1),
-                                    "pagina_fin": entity.get("pagina_fin", 1),
-                                    "tipo_documento": entity.get("tipo_documento", ""),
-                                    "ruta_archivo": ruta_archivo
-                                },
-                                "documento_id": entity.get("id_documento"),  # Para filtrado
-                            }
-                        )
-                        
-            except Exception as e:
-                logger.warning(f"Error en búsqueda vectorial para chunk {i}: {e}")
-                continue
+                    # Conservar el mejor chunk por documento
+                    document_name = entity.get("nombre_archivo", "")
+                    existing = expedient_data["docs"].get(document_name)
+                    if existing and existing["similarity_score"] >= similarity_score:
+                        continue
+
+                    # Extraer ruta_archivo del campo meta
+                    meta_data = entity.get("meta", {})
+                    ruta_archivo = meta_data.get("ruta_archivo", "") if isinstance(meta_data, dict) else ""
+
+                    expedient_data["docs"][document_name] = {
+                        "id": entity.get("id_chunk", ""),
+                        "expedient_id": result_expedient_id,
+                        "document_name": document_name,
+                        "content_preview": entity.get("texto", "")[:500],
+                        "similarity_score": similarity_score,
+                        "metadata": {
+                            "indice_chunk": entity.get("indice_chunk", 0),
+                            "pagina_inicio": entity.get("pagina_inicio", 1),
+                            "pagina_fin": entity.get("pagina_fin", 1),
+                            "tipo_documento": entity.get("tipo_documento", ""),
+                            "ruta_archivo": ruta_archivo
+                        },
+                        "documento_id": entity.get("id_documento"),  # Para filtrado
+                    }
 
-        # 3. Rankear expedientes por score máximo y convertir a formato final
+        if reference_count == 0:
+            logger.info(f"No se encontraron vectores para el expediente {expedient_id}")
+            return []
+
+        logger.info(
+            f"Búsqueda similares {expedient_id}: {reference_count} vectores en "
+            f"{batch_count} lotes, "
+            f"{len(all_results)} expedientes candidatos (agregación={mode})"
+        )
+
+        # 3. Rankear expedientes por score agregado y convertir a formato final
         final_results = []
         for exp_id, data in all_results.items():
-            for doc in data["docs"]:
+            expedient_score = _aggregate_expedient_score(data["chunk_scores"], mode, reference_count)
+            for doc in data["docs"].values():
+                doc["expedient_score"] = expedient_score
                 final_results.append(doc)
 
-        # Ordenar por similarity_score descendente
-        final_results.sort(key=lambda x: x.get("similarity_score", 0), reverse=True)
+        # Ordenar por score del expediente y luego por score del documento
+        final_results.sort(
+            key=lambda x: (x.get("expedient_score", 0), x.get("similarity_score", 0)),
+            reverse=True
+        )
 
         # Filtrar por estado "Procesado"
         final_results = _filter_by_processed_status(final_results, db)
@@ -666,6 +1190,80 @@ async def search_similar_expedients(
         return []
 
 
+def _aggregate_expedient_score(
+    chunk_scores: Dict[int, List[float]], mode: str, reference_count: Optional[int] = None
+) -> float:
+    """
+    Combina los scores de un expediente candidato en un único valor.
+
+    Args:
+        chunk_scores: {índice del chunk de referencia: [scores de hits del expediente]}
+        mode: max | mean | top_n_sum
+        reference_count: Chunks de referencia consultados (mean: los que no
+            tuvieron coincidencia cuentan como 0; None = solo los que la tuvieron)
+
+    Returns:
+        Score agregado en el rango [0, 1]
+    """
+    # Mejor coincidencia del candidato para cada chunk de referencia
+    best_per_chunk = sorted((max(scores) for scores in chunk_scores.values() if scores), reverse=True)
+    if not best_per_chunk:
+        return 0.0
+
+    if mode == "mean":
+        # Un candidato con una sola coincidencia fuerte no supera a uno que
+        # coincide moderadamente con todo el expediente de referencia
+        return sum(best_per_chunk) / max(reference_count or 0, len(best_per_chunk))
+
+    if mode == "top_n_sum":
+        top_n = max(1, vectorstore_config.SIMILAR_AGGREGATION_TOP_N)
+        # Normalizado entre N: mismo orden que la suma y rango comparable con max
+        return sum(best_per_chunk[:top_n]) / top_n
+
+    return best_per_chunk[0]
+
+
+async def _iter_reference_embeddings(
+    expedient_id: str, batch_size: int, max_chunks: int
+) -> AsyncIterator[tuple]:
+    """
+    Recorre los embeddings del expediente de referencia en lotes de búsqueda.
+
+    Args:
+        expedient_id: Expediente de referencia
+        batch_size: Vectores por lote
+        max_chunks: Máximo de vectores a usar (0 = sin límite)
+
+    Yields:
+        (índice del primer vector del lote, lista de vectores np.float32)
+    """
+    batch, start, total = [], 0, 0
+    truncated = False
+
+    async for row in iter_chunks(f'numero_expediente == "{expedient_id}"', output_fields=["embedding"]):
+        embedding = decode_vector(row.get("embedding"), _vector_dtype)
+        if embedding.size == 0:
+            continue
+        if max_chunks and total >= max_chunks:
+            truncated = True
+            break
+        batch.append(embedding)
+        total += 1
+        if len(batch) >= batch_size:
+            yield start, batch
+            start += len(batch)
+            batch = []
+
+    if batch:
+        yield start, batch
+
+    if truncated:
+        logger.warning(
+            f"Expediente de referencia {expedient_id}: se usaron los primeros {max_chunks} "
+            f"chunks (SIMILAR_REFERENCE_MAX_CHUNKS), el resto no participa en la búsqueda"
+        )
+
+
 # ================================
 # INTERFAZ PRINCIPAL - ALMACENAMIENTO
 # ================================
@@ -673,27 +1271,234 @@ async def search_similar_expedients(
 
 async def add_documents(documents: List[Document]) -> List[str]:
     """
-    Almacena documentos con embeddings automáticos.
+    Almacena documentos generando sus embeddings.
+
+    Inserta directamente con el cliente PyMilvus: la metadata de cada documento
+    se mapea a los campos de la colección y los campos calculados por Milvus
+    (texto_sparse, Function BM25) no se envían.
+
+    Los chunks se vectorizan en lotes de longitud similar
+    (app.embeddings.document_batcher) y cada lote se inserta antes de codificar
+    el siguiente: la memoria del worker queda acotada por el lote, no por el
+    tamaño del documento.
 
     Args:
-        documents: Lista de documentos LangChain
+        documents: Lista de documentos LangChain (metadata con los campos del schema)
 
     Returns:
-        Lista de IDs asignados
+        Lista de IDs asignados (id_chunk), en el orden de documents
+
+    Note:
+        Si un lote falla se eliminan los chunks ya insertados en esta llamada
+        (mejor esfuerzo) para que el reintento de la ingesta no los duplique.
     """
-    try:
-        vectorstore = await get_langchain_vectorstore()
+    from app.embeddings.embeddings import get_embeddings
+    from app.embeddings.document_batcher import length_bucketed_batches
 
-        # LangChain maneja automáticamente embeddings + inserción
-        doc_ids = vectorstore.add_documents(documents)
+    if not documents:
+        return []
 
-        logger.info(f"Almacenados {len(doc_ids)} documentos")
-        return doc_ids
+    client = await get_client()
+    embeddings = await get_embeddings()
+    texts = [doc.page_content for doc in documents]
+    batches = length_bucketed_batches(texts)
+    inserted_ids: List[str] = []
+
+    try:
+        for batch in batches:
+            vectors = await embeddings.aembed_documents([texts[i] for i in batch])
+
+            rows = []
+            for i, vector in zip(batch, vectors):
+                doc = documents[i]
+                row = {**doc.metadata, "texto": doc.page_content, "embedding": encode_vector(vector, _vector_dtype)}
+                if _insert_fields:
+                    row = {key: value for key, value in row.items() if key in _insert_fields}
+                rows.append(row)
+
+            await run_milvus(
+                client.insert,
+                collection_name=COLLECTION_NAME,
+                data=rows,
+                timeout=vectorstore_config.MILVUS_WRITE_TIMEOUT,
+            )
+            inserted_ids.extend(row.get("id_chunk") for row in rows)
 
     except Exception as e:
-        logger.error(f"Error almacenando documentos: {e}")
+        logger.error(f"Error almacenando documentos ({len(inserted_ids)}/{len(documents)} insertados): {e}")
+        if inserted_ids:
+            try:
+                await run_milvus(
+                    client.delete,
+                    collection_name=COLLECTION_NAME,
+                    ids=inserted_ids,
+                    timeout=vectorstore_config.MILVUS_WRITE_TIMEOUT,
+                )
+            except Exception as cleanup_error:
+                logger.error(f"No se pudieron eliminar {len(inserted_ids)} chunks parciales: {cleanup_error}")
         raise
 
+    doc_ids = [doc.metadata.get("id_chunk") for doc in documents]
+    logger.info(f"Almacenados {len(doc_ids)} documentos en {len(batches)} lotes")
+    return doc_ids
+
+
+async def actualizar_estado_procesado(documento_id: int, procesado: bool) -> int:
+    """
+    Sincroniza el campo "procesado" de todos los chunks de un documento.
+    
+    Lo invoca la ingesta después del commit en que el documento entra o sale
+    del estado "Procesado" (ExpedienteService.propagar_cambios_estado). Milvus
+    no admite actualizar un solo campo, por lo que se reescriben las entidades
+    completas con upsert.
+    
+    La lectura usa consistencia Strong (la ingesta inserta los chunks justo
+    antes y una lectura Bounded puede no verlos) y recorre el documento por
+    lotes con iter_chunk_batches: no hay tope de chunks por documento.
+    
+    Al terminar confirma con una query Strong que ningún chunk conserva el
+    estado anterior: cuando retorna, el cambio ya es visible para las
+    búsquedas y el llamador puede invalidar los cachés de resultados.
+    
+    Args:
+        documento_id: ID del documento en T_Documento
+        procesado: True si el documento quedó en estado "Procesado"
+        
+    Returns:
+        Cantidad de chunks actualizados
+        
+    Raises:
+        RuntimeError: Si después del upsert quedan chunks con el estado anterior
+    """
+    client = await get_client()
+    
+    if not _status_field_enabled:
+        logger.debug(f"Colección sin campo 'procesado': documento {documento_id} no sincronizado")
+        return 0
+    
+    total = 0
+    async for chunks in iter_chunk_batches(
+        f"id_documento == {documento_id}", output_fields=["*"], consistency_level="Strong"
+    ):
+        for chunk in chunks:
+            chunk["procesado"] = procesado
+            # Salida de la Function BM25: Milvus la recalcula, no se puede escribir
+            chunk.pop(SPARSE_FIELD, None)
+            # Vectores de 16 bits: query los devuelve como bytes
+            chunk["embedding"] = encode_vector(decode_vector(chunk.get("embedding"), _vector_dtype), _vector_dtype)
+        
+        await run_milvus(
+            client.upsert,
+            collection_name=COLLECTION_NAME,
+            data=chunks,
+            timeout=vectorstore_config.MILVUS_WRITE_TIMEOUT,
+        )
+        total += len(chunks)
+    
+    if not total:
+        logger.debug(f"Documento {documento_id}: sin chunks en Milvus")
+        return 0
+    
+    # Confirmar que el upsert es visible (Strong espera a que Milvus lo aplique)
+    desactualizados = await run_milvus(
+        client.query,
+        collection_name=COLLECTION_NAME,
+        filter=f"id_documento == {documento_id} and procesado != {str(procesado).lower()}",
+        output_fields=["id_chunk"],
+        limit=1,
+        consistency_level="Strong",
+    )
+    if desactualizados:
+        raise RuntimeError(f"Documento {documento_id}: el upsert de procesado={procesado} no es visible en Milvus")
+    
+    logger.info(f"Documento {documento_id}: {total} chunks con procesado={procesado}")
+    return total
+
+
+async def reconciliar_estado_procesado(db=None) -> Dict[str, int]:
+    """
+    Corrige los documentos cuyo campo "procesado" en Milvus no coincide con la BD.
+    
+    Red de seguridad de la sincronización de la ingesta: reintentos agotados,
+    Milvus no disponible o un proceso interrumpido entre el commit y el upsert.
+    La ejecuta periódicamente Celery beat (PROCESSED_RECONCILE_INTERVAL_SECONDS).
+    
+    Flujo:
+        1. IDs procesados en la BD (_load_processed_ids)
+        2. query_iterator sobre id_documento y procesado de todos los chunks
+        3. Documentos con algún chunk distinto al estado de la BD
+        4. Se releen los IDs de la BD y solo se corrigen los documentos cuyo
+           estado no cambió durante el recorrido (evita pisar una ingesta en curso)
+    
+    Args:
+        db: Sesión de BD (opcional, se crea una temporal)
+        
+    Returns:
+        Dict con documentos recorridos, desincronizados y corregidos
+    """
+    from app.vectorstore.processed_ids_cache import _load_processed_ids
+    
+    client = await get_client()
+    if not _status_field_enabled:
+        logger.debug("Colección sin campo 'procesado': no hay estado que reconciliar")
+        return {"documentos": 0, "desincronizados": 0, "corregidos": 0}
+    
+    procesados = {int(doc_id) for doc_id in await asyncio.to_thread(_load_processed_ids, db)}
+    
+    # {id_documento: estado esperado} de los documentos con chunks desincronizados
+    documentos = set()
+    desincronizados: Dict[int, bool] = {}
+    iterator = await run_milvus(
+        client.query_iterator,
+        collection_name=COLLECTION_NAME,
+        filter="id_documento >= 0",
+        output_fields=["id_documento", "procesado"],
+        batch_size=min(MAX_QUERY_WINDOW, vectorstore_config.CHUNK_ITERATOR_BATCH_SIZE * 8),
+    )
+    try:
+        while True:
+            rows = await run_milvus(iterator.next, forward_timeout=False)
+            if not rows:
+                break
+            for row in rows:
+                doc_id = int(row.get("id_documento") or 0)
+                documentos.add(doc_id)
+                esperado = doc_id in procesados
+                if bool(row.get("procesado")) != esperado:
+                    desincronizados[doc_id] = esperado
+    finally:
+        await run_milvus(iterator.close, forward_timeout=False)
+    
+    if desincronizados:
+        procesados_actuales = {int(doc_id) for doc_id in await asyncio.to_thread(_load_processed_ids, db)}
+        desincronizados = {
+            doc_id: esperado for doc_id, esperado in desincronizados.items()
+            if (doc_id in procesados_actuales) == esperado
+        }
+    
+    corregidos = 0
+    for doc_id, esperado in sorted(desincronizados.items()):
+        try:
+            await actualizar_estado_procesado(doc_id, esperado)
+            corregidos += 1
+        except Exception as e:
+            logger.error(f"Reconciliación: no se pudo corregir el documento {doc_id}: {e}")
+    
+    if corregidos:
+        # Los resultados cacheados se calcularon con el estado desincronizado
+        from app.services.RAG.retrieval_cache import bump_corpus_version
+        bump_corpus_version()
+    
+    if desincronizados:
+        logger.warning(
+            f"Reconciliación de estado: {len(desincronizados)} documentos desincronizados, "
+            f"{corregidos} corregidos (de {len(documentos)})"
+        )
+    else:
+        logger.info(f"Reconciliación de estado: {len(documentos)} documentos sincronizados")
+    
+    return {"documentos": len(documentos), "desincronizados": len(desincronizados), "corregidos": corregidos}
+
 
 async def get_stats() -> Dict[str, Any]:
     """
@@ -701,7 +1506,7 @@ async def get_stats() -> Dict[str, Any]:
     """
     try:
         client = await get_client()
-        stats = client.get_collection_stats(collection_name=COLLECTION_NAME)
+        stats = await run_milvus(client.get_collection_stats, collection_name=COLLECTION_NAME)
 
         return {
             "collection_name": COLLECTION_NAME,
@@ -714,39 +1519,236 @@ async def get_stats() -> Dict[str, Any]:
         return {"error": str(e)}
 
 
-async def get_expedient_documents(expedient_id: str) -> List[Document]:
+async def get_index_info() -> Dict[str, Any]:
+    """
+    Perfil del índice vectorial activo y perfiles disponibles.
+    """
+    from app.vectorstore.index_profiles import INDEX_PROFILES, REQUEST_LEVELS
+
+    return {
+        "collection_name": COLLECTION_NAME,
+        "active_profile": await _index_profile(),
+        "configured_profile": vectorstore_config.VECTOR_INDEX_PROFILE,
+        "vector_dtype": _vector_dtype,
+        "available_profiles": list(INDEX_PROFILES),
+        "request_levels": REQUEST_LEVELS,
+    }
+
+
+async def start_vector_index_rebuild(profile_name: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Inicia en segundo plano la reconstrucción del índice del campo embedding con otro perfil.
+
+    Milvus no admite dos índices sobre el mismo campo: la colección se libera,
+    se reemplaza el índice y se vuelve a cargar. Las búsquedas fallan mientras
+    dura la reconstrucción (minutos en colecciones grandes), por eso no corre
+    dentro de la petición: el estado queda en Redis (get_vector_index_rebuild_status)
+    y los demás procesos toman el índice nuevo en la siguiente relectura
+    (VECTOR_INDEX_REFRESH_SECONDS).
+
+    Args:
+        profile_name: hnsw | ivf_flat | ivf_sq8 | ivf_pq | diskann (None = VECTOR_INDEX_PROFILE)
+
+    Returns:
+        Estado inicial de la reconstrucción
+
+    Raises:
+        ValueError: Si el perfil no existe
+        RuntimeError: Si ya hay una reconstrucción en curso (en este u otro proceso)
+        redis.RedisError: Si no se puede registrar el estado (la reconstrucción no se inicia:
+            sin Redis no hay control de concurrencia entre procesos)
+    """
+    profile = get_index_profile(profile_name)
+    client = await get_client()
+
+    current = await asyncio.to_thread(_read_rebuild_status, True)
+    if current.get("estado") == "en_curso" and not _rebuild_status_expired(current):
+        raise RuntimeError(
+            f"Ya hay una reconstrucción del índice vectorial en curso (perfil '{current.get('profile')}')"
+        )
+    # Se libera en el hilo de la reconstrucción al terminar, aunque la espera haya vencido
+    if not _rebuild_lock.acquire(blocking=False):
+        raise RuntimeError("Ya hay una reconstrucción del índice vectorial en curso")
+
+    status = {
+        "estado": "en_curso",
+        "collection_name": COLLECTION_NAME,
+        "profile": profile["name"],
+        "index_type": profile["index_type"],
+        "build_params": profile["build_params"],
+        "inicio_ms": int(time.time() * 1000),
+    }
+    try:
+        await asyncio.to_thread(_save_rebuild_status, replace=True, required=True, **status)
+    except Exception:
+        _rebuild_lock.release()
+        raise
+
+    logger.warning(f"Reconstruyendo índice vectorial de {COLLECTION_NAME} con perfil '{profile['name']}'")
+    task = asyncio.create_task(_run_vector_index_rebuild(client, profile))
+    _rebuild_tasks.add(task)
+    task.add_done_callback(_rebuild_tasks.discard)
+    return status
+
+
+async def get_vector_index_rebuild_status() -> Dict[str, Any]:
+    """
+    Estado de la última reconstrucción del índice ({} si no hay ninguna registrada).
+
+    Returns:
+        Dict con estado (en_curso | completado | error), perfil, tipo de índice,
+        inicio_ms / fin_ms, duration_seconds y error
+    """
+    return await asyncio.to_thread(_read_rebuild_status)
+
+
+async def _run_vector_index_rebuild(client: MilvusClient, profile: Dict[str, Any]) -> None:
+    """Ejecuta la reconstrucción y registra el resultado en Redis."""
+    global _active_index_profile, _index_profile_checked_at
+
+    timeout = vectorstore_config.VECTOR_INDEX_REBUILD_TIMEOUT
+    try:
+        # Hilo propio: no ocupa durante horas un lugar del pool de búsquedas (run_milvus)
+        elapsed = await asyncio.wait_for(
+            asyncio.to_thread(_rebuild_vector_index_locked, client, profile), timeout=timeout
+        )
+    except asyncio.TimeoutError:
+        logger.error(f"La reconstrucción del índice vectorial superó {timeout}s")
+        await asyncio.to_thread(
+            _save_rebuild_status,
+            estado="error",
+            error=f"Superó VECTOR_INDEX_REBUILD_TIMEOUT ({timeout}s); verificar el índice con GET /vectorstore/index",
+            fin_ms=int(time.time() * 1000),
+        )
+        return
+    except Exception as e:
+        logger.error(f"Error reconstruyendo índice vectorial: {e}", exc_info=True)
+        await asyncio.to_thread(_save_rebuild_status, estado="error", error=str(e), fin_ms=int(time.time() * 1000))
+        return
+
+    _active_index_profile = profile
+    _index_profile_checked_at = time.monotonic()
+    logger.info(f"Índice vectorial reconstruido ({profile['index_type']}) en {elapsed:.1f}s")
+    await asyncio.to_thread(
+        _save_rebuild_status,
+        estado="completado",
+        duration_seconds=round(elapsed, 2),
+        fin_ms=int(time.time() * 1000),
+    )
+
+
+def _rebuild_status_expired(status: Dict[str, Any]) -> bool:
+    """Un estado en_curso más viejo que el timeout es de un proceso que terminó sin registrarlo."""
+    limit_ms = (vectorstore_config.VECTOR_INDEX_REBUILD_TIMEOUT + 60) * 1000
+    return int(time.time() * 1000) - status.get("inicio_ms", 0) > limit_ms
+
+
+def _read_rebuild_status(required: bool = False) -> Dict[str, Any]:
+    """Estado guardado en Redis (required=True propaga los errores de Redis)."""
+    from app.db.redis_client import get_redis_client
+
+    try:
+        status = get_redis_client().hgetall(_REBUILD_STATUS_KEY)
+    except Exception as e:
+        if required:
+            raise
+        logger.warning(f"No se pudo leer el estado de la reconstrucción del índice: {e}")
+        return {}
+    for key in ("inicio_ms", "fin_ms"):
+        if key in status:
+            status[key] = int(status[key])
+    if "duration_seconds" in status:
+        status["duration_seconds"] = float(status["duration_seconds"])
+    if "build_params" in status:
+        status["build_params"] = json.loads(status["build_params"])
+    return status
+
+
+def _save_rebuild_status(replace: bool = False, required: bool = False, **fields) -> None:
+    """
+    Guarda campos del estado en Redis.
+
+    replace=True descarta el de la reconstrucción anterior; required=True
+    propaga los errores de Redis en lugar de solo registrarlos.
+    """
+    from app.db.redis_client import get_redis_client
+
+    try:
+        redis = get_redis_client()
+        if replace:
+            redis.delete(_REBUILD_STATUS_KEY)
+        redis.hset(
+            _REBUILD_STATUS_KEY,
+            mapping={key: value if isinstance(value, (str, int, float)) else json.dumps(value) for key, value in fields.items()},
+        )
+    except Exception as e:
+        if required:
+            raise
+        logger.warning(f"No se pudo guardar el estado de la reconstrucción del índice: {e}")
+
+
+def _rebuild_vector_index_locked(client: MilvusClient, profile: Dict[str, Any]) -> float:
+    """Reconstrucción que libera _rebuild_lock al terminar (en el hilo que la ejecuta)."""
+    try:
+        return _rebuild_vector_index_sync(client, profile)
+    finally:
+        _rebuild_lock.release()
+
+
+def _rebuild_vector_index_sync(client: MilvusClient, profile: Dict[str, Any]) -> float:
+    """Libera la colección, reemplaza el índice de embedding y la vuelve a cargar."""
+    start = time.perf_counter()
+
+    client.release_collection(collection_name=COLLECTION_NAME)
+    try:
+        for index_name in client.list_indexes(collection_name=COLLECTION_NAME, field_name="embedding"):
+            client.drop_index(collection_name=COLLECTION_NAME, index_name=index_name)
+
+        index_params = client.prepare_index_params()
+        _add_vector_index(index_params, profile)
+        client.create_index(collection_name=COLLECTION_NAME, index_params=index_params)
+    finally:
+        # Volver a cargar aunque falle la creación (con el índice que haya quedado)
+        try:
+            client.load_collection(collection_name=COLLECTION_NAME)
+        except Exception as e:
+            logger.error(f"No se pudo cargar {COLLECTION_NAME} después de reconstruir el índice: {e}")
+
+    return time.perf_counter() - start
+
+
+async def get_expedient_documents(expedient_id: str, max_chunks: Optional[int] = None) -> List[Document]:
     """
     Obtiene todos los documentos de un expediente específico usando query directa a Milvus.
+    Sin límite de chunks: recorre el expediente por lotes con iter_chunks.
     
     Args:
         expedient_id: ID del expediente a buscar
+        max_chunks: Detiene el recorrido al reunir esta cantidad de chunks con
+            contenido (None = expediente completo). Solo se leen los textos
+            necesarios; id_documento / indice_chunk del expediente completo se
+            recorren igual para respetar el orden
         
     Returns:
-        Lista de objetos Document del expediente ordenados por indice_chunk
+        Lista de objetos Document del expediente ordenados por documento e indice_chunk
     """
     try:
         logger.info(f"Buscando expediente: {expedient_id}")
         
-        client = await get_client()
-        
-        # Query directa a Milvus con filtro (más eficiente que búsqueda vectorial)
-        query_results = client.query(
-            collection_name=COLLECTION_NAME,
-            filter=f'numero_expediente == "{expedient_id}"',
-            output_fields=["id_chunk", "numero_expediente", "nombre_archivo", "texto", "indice_chunk", "tipo_documento", "meta"],
-            limit=1000  # Límite alto para expedientes grandes
-        )
-        
-        if not query_results:
-            logger.warning(f"Expediente {expedient_id}: sin documentos")
-            return []
-        
-        # Ordenar por indice_chunk para mantener secuencia
-        sorted_results = sorted(query_results, key=lambda x: x.get("indice_chunk", 0))
-        
-        # Convertir a LangChain Documents
+        # Recorrer el expediente completo en orden (query directa, sin búsqueda vectorial)
+        # y convertir a LangChain Documents. El filtro de estado depende de la
+        # colección: inicializar el cliente antes de armarlo
+        await get_client()
         langchain_docs = []
-        for doc in sorted_results:
+        async for doc in iter_chunks(
+            _with_processed_filter(f'numero_expediente == "{expedient_id}"'),
+            output_fields=["id_chunk", "numero_expediente", "nombre_archivo", "texto", "indice_chunk", "tipo_documento", "meta"],
+            # Con tope, los lotes de texto no traen más chunks de los necesarios
+            # (el recorrido de rangos usa páginas propias)
+            batch_size=min(max_chunks, vectorstore_config.CHUNK_ITERATOR_BATCH_SIZE) if max_chunks else None,
+        ):
+            if max_chunks and len(langchain_docs) >= max_chunks:
+                break
             try:
                 content = doc.get("texto", "")
                 if content.strip():
@@ -772,6 +1774,10 @@ async def get_expedient_documents(expedient_id: str) -> List[Document]:
                 logger.warning(f"Error procesando chunk: {e}")
                 continue
         
+        if not langchain_docs:
+            logger.warning(f"Expediente {expedient_id}: sin documentos")
+            return []
+        
         logger.info(f"Expediente {expedient_id}: {len(langchain_docs)} documentos recuperados")
         return langchain_docs
         
@@ -799,6 +1805,23 @@ def _calculate_similarity_score(doc: Document, index: int, total: int) -> float:
     return estimated_score
 
 
+def _format_hit(hit, similarity_score: float) -> Dict[str, Any]:
+    """Formatea un hit de client.search al formato esperado por el sistema."""
+    entity = hit_fields(hit)
+    texto = entity.pop("texto", "") or ""
+    entity.pop("embedding", None)
+
+    return {
+        "id": entity.get("id_chunk"),
+        "expedient_id": entity.get("numero_expediente") or entity.get("expediente_numero"),
+        "document_name": entity.get("nombre_archivo"),
+        "content_preview": texto,
+        "similarity_score": similarity_score,
+        "metadata": entity,
+        "documento_id": entity.get("id_documento"),  # Para filtrado por estado
+    }
+
+
 def _format_document_result(doc: Document, similarity_score: float) -> Dict[str, Any]:
     """Formatea documento LangChain al formato esperado por el sistema."""
     metadata = doc.metadata if hasattr(doc, "metadata") else {}
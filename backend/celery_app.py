@@ -23,10 +23,11 @@ Tareas soportadas:
     * Transcripción de audio (Faster-Whisper)
     * Generación de embeddings (BGE-M3)
     * Almacenamiento vectorial (Milvus)
+    * Reconciliación periódica del estado "procesado" en Milvus (beat)
 
 Ejecución de workers:
-    Desarrollo:
-        celery -A celery_app worker --loglevel=info --concurrency=2
+    Desarrollo (-B ejecuta beat dentro del worker; un solo worker con -B):
+        celery -A celery_app worker -B --loglevel=info --concurrency=2
     
     Producción:
         celery -A celery_app worker --loglevel=info --concurrency=4 \
@@ -84,6 +85,7 @@ Version:
 """
 from celery import Celery
 from app.config.config import REDIS_URL
+from app.config.vectorstore_config import vectorstore_config
 
 # Crear instancia de Celery
 celery_app = Celery(
@@ -125,6 +127,17 @@ celery_app.conf.update(
     task_soft_time_limit=6600,  # 1h50m soft limit
 )
 
+# Tareas periódicas (Celery beat)
+if vectorstore_config.PROCESSED_RECONCILE_INTERVAL_SECONDS > 0:
+    celery_app.conf.beat_schedule = {
+        'reconciliar-estado-procesado': {
+            'task': 'reconciliar_estado_procesado',
+            'schedule': vectorstore_config.PROCESSED_RECONCILE_INTERVAL_SECONDS,
+            # Sin acumular ejecuciones si el worker estuvo ocupado
+            'options': {'expires': vectorstore_config.PROCESSED_RECONCILE_INTERVAL_SECONDS},
+        },
+    }
+
 # Importar las tareas para registrarlas en el worker
 # IMPORTANTE: Esta importación debe estar DESPUÉS de la configuración de celery_app
 from app.services.ingesta.async_processing import celery_tasks
\ No newline at end of file
@@ -25,6 +25,7 @@ Routers incluidos:
     * /similarity: Búsqueda de casos similares
     * /rag: Consultas inteligentes con RAG
     * /bitacora: Historial de actividades
+    * /vectorstore: Administración del índice vectorial (administradores)
 
 Middleware:
     * CORS: Permite solicitudes desde frontend (Next.js)
@@ -76,17 +77,19 @@ Version:
     1.0.0
 """
 import os
+import time
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from pathlib import Path
 from app.vectorstore.vectorstore import get_client
-from app.routes import ingesta, usuarios, archivos, email, auth, similarity, rag, bitacora
+from app.routes import ingesta, usuarios, archivos, email, auth, similarity, rag, bitacora, vectorstore
 from app.db import database
 import asyncio
 import logging
 from app.utils.hf_model import ensure_model_available
 from app.embeddings.embeddings import get_embeddings
+from app.config.embeddings_config import embeddings_config
 from app.services.RAG.session_store import conversation_store
 
 logger = logging.getLogger(__name__)
@@ -109,6 +112,9 @@ async def startup_event():
     2. Pre-carga el modelo en memoria con inferencia de prueba (warm-up)
     3. Establece conexión con Milvus y verifica colección
     
+    La duración de cada fase (descarga, pesos, warm_up, milvus, total) se
+    registra en el log y queda en app.state.startup_timings.
+    
     Raises:
         RuntimeError: Si falla la descarga del modelo, carga de embeddings o
                      conexión a Milvus. La aplicación NO iniciará si hay error.
@@ -118,26 +124,47 @@ async def startup_event():
         * El warm-up evita latencia en la primera consulta
         * Si falla, la aplicación no iniciará (fail-fast)
     """
+    timings = {}
+    start = time.perf_counter()
+    
     # 1. Asegurar y cargar modelo de embeddings
+    # (con servicio compartido el modelo vive en app.embeddings.embedding_server)
     model_id = os.environ.get("EMBEDDING_MODEL")
-    if model_id:
+    if model_id and not embeddings_config.EMBEDDING_SERVICE_URL:
         ok = await asyncio.to_thread(ensure_model_available, model_id)
         if not ok:
             raise RuntimeError(f"No se pudo asegurar el modelo: {model_id}")
+    timings["descarga"] = _lap(start)
     
     # 2. Pre-cargar modelo en memoria (warm-up)
     try:
+        phase = time.perf_counter()
         embeddings = await get_embeddings()
-        await embeddings.aembed_query("test")  # Inferencia de prueba
+        timings["pesos"] = _lap(phase)
+        
+        phase = time.perf_counter()
+        await embeddings.warm_up()  # Inferencia de prueba (sin caché de consultas)
+        timings["warm_up"] = _lap(phase)
     except Exception as e:
         raise RuntimeError(f"Error cargando embeddings: {e}")
     
     # 3. Inicializar Milvus
     try:
+        phase = time.perf_counter()
         await get_client()
+        timings["milvus"] = _lap(phase)
         print("Milvus configurado correctamente")
     except Exception as e:
         raise RuntimeError(f"Error inicializando Milvus: {e}")
+    
+    timings["total"] = _lap(start)
+    app.state.startup_timings = timings
+    logger.info("Arranque completado: " + ", ".join(f"{fase}={segundos}s" for fase, segundos in timings.items()))
+
+
+def _lap(start: float) -> float:
+    """Segundos transcurridos desde start (redondeado para logs)."""
+    return round(time.perf_counter() - start, 2)
 
 
 @app.on_event("shutdown")
@@ -181,6 +208,7 @@ app.include_router(auth.router, prefix="/auth", tags=["auth"])
 app.include_router(similarity.router, prefix="/similarity", tags=["similarity"])
 app.include_router(rag.router, tags=["rag"])
 app.include_router(bitacora.router, prefix="/bitacora", tags=["bitacora"])
+app.include_router(vectorstore.router, prefix="/vectorstore", tags=["vectorstore"])
 
 # Servir archivos estáticos para avatares
 uploads_path = Path("uploads")